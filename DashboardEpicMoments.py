@@ -0,0 +1,68 @@
+import streamlit as st
+import plotly.express as px
+
+from PagedSelectbox import PagedSelectbox
+from service.DataService import DataService
+from service.EpicMomentAnalyzer import EpicMomentAnalyzer
+from service.MakeNice4UIMapper import MakeNice4UIMapper
+
+
+class DashboardEpicMoments:
+
+    def __init__(self, data_service: DataService):
+        self.data_service: DataService = data_service
+        self.make_nice_util = MakeNice4UIMapper()
+
+    def refresh(self):
+        st.title("Epic Moments")
+        st.markdown("""
+            How does the chat react to the In-Game-Events of the streamer?
+            For every event type the mean chat rate in the seconds after the event is compared to the mean chat rate during the match.
+            All matches of the selected streamer are analyzed.
+        """)
+
+        l_selectbox, r_selectbox = st.columns(2)
+        selected_streamer = PagedSelectbox().select(l_selectbox, "Select a Streamer", search=self.data_service.catalog.search_streamers)
+        if selected_streamer is None:
+            st.info("No streamer found")
+            return
+        window_seconds = r_selectbox.slider("Seconds after the event", min_value=5, max_value=120, value=30, step=5)
+
+        analyzer = EpicMomentAnalyzer(self.data_service, window_seconds=window_seconds)
+        if not analyzer.has_chat(selected_streamer):
+            st.markdown("**No chat was collected for the selected streamer**")
+            return
+
+        if st.button("Analyze all matches"):
+            self.draw_stats(analyzer, selected_streamer)
+
+    def draw_stats(self, analyzer, selected_streamer):
+        progress = st.progress(0)
+        table_placeholder = st.empty()
+        caption_placeholder = st.empty()
+
+        stats = None
+        for stats in analyzer.iter_stats(selected_streamer):
+            progress.progress(stats.get_finished_matches() / max(stats.total_matches, 1))
+            stats_df = stats.to_df()
+            stats_df['event_type'] = self.make_nice_util.events_to_nice(stats_df['event_type'])
+            table_placeholder.dataframe(stats_df)
+            stage_times = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stats.stage_seconds.items())
+            caption_placeholder.caption(f"{stats.analyzed_matches} of {stats.total_matches} matches analyzed "
+                                        f"({stats.matches_with_events} with chat and events of the streamer) in {stats.wall_seconds:.1f}s wall time "
+                                        f"on {analyzer.workers} workers. Summed stage times: {stage_times}")
+
+        if stats is not None and len(stats.failed_matches) > 0:
+            failed = "\n".join(f"- {match_id}: {error}" for match_id, error in stats.failed_matches.items())
+            st.warning(f"{len(stats.failed_matches)} of {stats.total_matches} matches could not be analyzed and are left out:\n{failed}")
+
+        if stats is None or len(stats.totals) == 0:
+            return
+
+        stats_df = stats.to_df()
+        stats_df = stats_df[stats_df['events'] >= 5]
+        stats_df['event_type'] = self.make_nice_util.events_to_nice(stats_df['event_type'])
+        fig = px.bar(stats_df, x='uplift_pct', y='event_type', orientation='h',
+                     title=f"Chat uplift in the {analyzer.window_seconds}s after an In-Game-Event (event types with at least 5 occurences)",
+                     labels={"uplift_pct": "Chat uplift (%)", "event_type": "In-Game-Event"})
+        st.plotly_chart(fig)
@@ -1,14 +1,21 @@
+from typing import TYPE_CHECKING
+
 import streamlit as st
+import plotly.express as px
 
-from ml.LanguageDetector import LanguageDetector
+from PagedSelectbox import PagedSelectbox
 from service.DataService import DataService
 
+if TYPE_CHECKING:
+    # importing the detector pulls in torch and transformers
+    from ml.LanguageDetector import LanguageDetector
+
 
 class DashboardLanguageClassifier:
 
-    def __init__(self, data_service: DataService, language_detector: LanguageDetector):
+    def __init__(self, data_service: DataService, language_detector: 'LanguageDetector'):
         self.data_service: DataService = data_service
-        self.language_detector: LanguageDetector = language_detector
+        self.language_detector: 'LanguageDetector' = language_detector
 
     def refresh(self):
         st.title("Language Classification Application UI")
@@ -18,3 +25,43 @@ class DashboardLanguageClassifier:
         if user_input:
             df = self.language_detector.evaluate_scores(user_input)
             st.dataframe(data=df)
+
+        self.draw_chat_classification()
+
+    def draw_chat_classification(self):
+        st.subheader("Language of the chat of a match")
+
+        l_selectbox, r_selectbox = st.columns(2)
+        selected_streamer = PagedSelectbox().select(l_selectbox, "Select a Streamer", search=self.data_service.catalog.search_streamers)
+        if selected_streamer is None:
+            st.info("No streamer found")
+            return
+        streamer_matches = self.data_service.get_streamer_match_aggregates(selected_streamer).history
+        selected_match = r_selectbox.selectbox(label="Select a Match", options=streamer_matches.index,
+                                               format_func=lambda idx: streamer_matches.loc[idx, 'matchSelectbox'])
+
+        if st.button("Classify chat"):
+            match_id = streamer_matches.loc[selected_match, 'matchId']
+            chat_of_match = self.data_service.get_chat_of_match_df(selected_streamer, match_id)
+            if len(chat_of_match) == 0:
+                st.markdown("**No chat was collected for the selected match**")
+                return
+
+            predictions = self.language_detector.evaluate_batch(chat_of_match['text'])
+            language_counts = predictions['label'].value_counts().rename_axis('language').reset_index(name='count')
+            language_counts = language_counts[language_counts['count'] > 0]
+            fig = px.bar(language_counts, x='language', y='count', title=f"Languages of {len(predictions)} chat messages",
+                         labels={"language": "Language", "count": "Messages"})
+            st.plotly_chart(fig)
+
+            prediction_cache = self.language_detector.prediction_cache
+            if prediction_cache is not None:
+                stats = prediction_cache.get_stats()
+                st.caption(f"Prediction cache: {stats['hits']} hits, {stats['misses']} misses, {stats['deduplicated']} duplicate messages "
+                           f"(hit rate {stats['hit_rate'] * 100:.1f} %)")
+
+            if hasattr(self.language_detector, 'get_server_stats'):
+                stats = self.language_detector.get_server_stats()
+                st.caption(f"Inference server: {stats['requests']} requests in {stats['batches']} batches "
+                           f"(mean batch size {stats['batch_size_mean']}), {stats['queue_requests']} queued, "
+                           f"latency p50 {stats['latency_ms']['p50']} ms, p95 {stats['latency_ms']['p95']} ms, p99 {stats['latency_ms']['p99']} ms")
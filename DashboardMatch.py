@@ -1,3 +1,5 @@
+import io
+import uuid
 from typing import Optional
 
 import streamlit as st
@@ -6,23 +8,41 @@ import pandas as pd
 import numpy as np
 
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
-from ml.LanguageDetector import LanguageDetector
+from PagedSelectbox import PagedSelectbox
 from service.ChatTransformerUtil import ChatTransformerUtil
 from service.DataService import DataService
+from service.LruCache import LruCache
 from service.MakeNice4UIMapper import MakeNice4UIMapper
+from service.MatchContext import MatchContext
+from service.MatchEventCube import MatchEventCube
+from service.MatchPrefetcher import MatchPrefetcher
+from service.StageGraph import StageGraph
+from service.Telemetry import Telemetry
 from service.TimelineTransformerUtil import TimelineTransformerUtil
 
+MAX_TICK_LABELS = 100
+
+
+def get_reference_size(value):
+    # the stage only holds objects that are owned and counted by the data cache
+    return 1024
+
 
 class DashboardMatch:
+    # rendered figures, shared by all sessions
+    event_graph_cache = LruCache(16 * 1024 * 1024)
+
     # data
     streamer_matches: pd.DataFrame
-    match_timeline_dict: dict
     match_summary_array: []
-    match_summoner_dict: dict
+    match_context: MatchContext
     match_timeline_df: pd.DataFrame
+    match_event_cube: MatchEventCube
     events_by_team: pd.DataFrame
     chat_of_match: pd.DataFrame
     messages_per_sec_df: pd.DataFrame
@@ -37,13 +57,39 @@ class DashboardMatch:
     selected_summoner_of_match: str
     selected_summoner_event_types: [str]
 
-    def __init__(self, data_service: DataService, language_detector: LanguageDetector):
+    def __init__(self, data_service: DataService, stage_state: dict = None):
         self.data_service: DataService = data_service
-        self.language_detector: LanguageDetector = language_detector
         self.timeline_converter_service: TimelineTransformerUtil = TimelineTransformerUtil()
         self.chat_transformer_util: ChatTransformerUtil = ChatTransformerUtil()
         self.make_nice_util: MakeNice4UIMapper = MakeNice4UIMapper()
 
+        # the results of the stages survive reruns of the session, a widget change recomputes only its downstream stages
+        if stage_state is None:
+            stage_state = st.session_state.setdefault('match_dashboard_stages', {})
+        # the prefetches of a session are cancelled by its own selections only
+        self.session_id = stage_state.setdefault('session_id', uuid.uuid4().hex)
+        self.stages: StageGraph = self.create_stage_graph(stage_state)
+        self.selections = {}
+
+    def create_stage_graph(self, stage_state):
+        stages = StageGraph(self.data_service.data_cache, self.session_id, stage_state)
+        stages.add('history', self.load_history, selections=['streamer', 'data_version'], size_of=get_reference_size)
+        stages.add('streamer_figures', self.create_streamer_figures, selections=['streamer'], upstream=['history'])
+        stages.add('match', self.load_match, selections=['streamer', 'match_id'], upstream=['history'], size_of=get_reference_size)
+        stages.add('match_event_figures', self.create_match_event_figures, selections=['match_event_type'], upstream=['match'])
+        stages.add('summoner_events', self.load_summoner_events, selections=['summoner'], upstream=['match'])
+        stages.add('summoner_view', self.create_summoner_view, selections=['summoner_event_types'], upstream=['summoner_events'])
+        stages.add('chat', self.load_chat, upstream=['match'])
+        stages.add('chat_resample', self.resample_chat, upstream=['summoner_events', 'chat'])
+        stages.add('event_graph', self.render_event_graph, upstream=['match', 'summoner_view', 'chat_resample'])
+        stages.add('gold_lead_figure', self.create_gold_lead_figure, selections=['summoner'], upstream=['match', 'chat'])
+        stages.add('chat_window', self.filter_chat_window, selections=['chat_start', 'chat_end'], upstream=['chat'])
+        return stages
+
+    def get_stage(self, name):
+        return self.stages.get(name, self.selections)
+
+    @Telemetry.timed()
     def refresh(self):
         st.header("Match Dashboard")
         st.subheader("LoL Match and Twitch Chat Data")
@@ -61,7 +107,7 @@ class DashboardMatch:
         self.draw_summoner_event_area()
 
         # read chat
-        self.chat_of_match = self.data_service.get_chat_of_match_df(self.selected_streamer, self.selected_match_id)
+        self.chat_of_match = self.get_stage('chat')['chat_of_match']
         if len(self.chat_of_match) > 0:
             self.draw_chat_histogram_and_chat()
         else:
@@ -69,6 +115,7 @@ class DashboardMatch:
                 **No chat was collected for the selected match** 
             """)
 
+    @Telemetry.timed()
     def draw_streamer_area(self):
         st.markdown("""
             #### Select a streamer
@@ -77,49 +124,25 @@ class DashboardMatch:
             This section shows how many matches the selected streamer played per day and how many matches the streamer played on average per weekday.
         """)
 
-        all_streamers = self.data_service.get_available_streamers()
-        self.selected_streamer = st.selectbox(label="Select a Streamer", options=all_streamers)
+        self.selected_streamer = PagedSelectbox().select(st, "Select a Streamer", search=self.data_service.catalog.search_streamers)
+        if self.selected_streamer is None:
+            st.info("No streamer found")
+            st.stop()
+        # changed files of the streamer invalidate all stages
+        self.selections.update(streamer=self.selected_streamer, data_version=self.data_service.catalog.get_version(self.selected_streamer))
 
-        self.streamer_matches = self.data_service.get_df_match_history_of_streamer(self.selected_streamer)
+        streamer_aggregates = self.get_stage('history')
+        self.streamer_matches = streamer_aggregates.history
         st.caption(f"Found {len(self.streamer_matches)} Matches. This app does not contain the whole dataset!")
 
-        # left graph
-        day_range = pd.date_range(self.streamer_matches['start_date'].dt.date.min(), self.streamer_matches['start_date'].dt.date.max())
-
-        matches_per_day = self.streamer_matches['start_date'] \
-            .dt.floor('d') \
-            .value_counts()
-
-        matches_per_day.index = pd.DatetimeIndex(matches_per_day.index)
-        matches_per_day = matches_per_day.reindex(day_range, fill_value=0)
-        matches_per_day = matches_per_day.reset_index()
-        matches_per_day.rename(columns={"index": "date", "start_date": "count"}, inplace=True)
-
-        fig_per_day = px.bar(matches_per_day, x="date", y='count',
-                             title=f'Total matches per day of streamer {self.selected_streamer}',
-                             labels={"date": "Date", "count": "Total matches"})
-
-        # right graph
-        matches_by_weekday = matches_per_day.groupby(matches_per_day[matches_per_day['count'] > 0]['date'].dt.day_name()) \
-            .mean() \
-            .rename_axis('dayname') \
-            .reset_index()
-
-        fig_by_weekday = px.histogram(matches_by_weekday, x="dayname", y='count', title=f'Average matches by weekday of streamer {self.selected_streamer}',
-                                      labels= {"dayname": "", "count": "games per weekday"},
-                                      category_orders={
-                               "dayname": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-                           })
-
-        mean_matches = matches_by_weekday['count'].mean()
-        fig_by_weekday.add_shape(type="line", line_color="blue", line_width=3, opacity=1, line_dash="dot",
-                      x0=0, x1=1, y0=mean_matches, xref="paper", y1=mean_matches, yref="y")
+        fig_per_day, fig_by_weekday = self.get_stage('streamer_figures')
 
         # make 2 columns
         col1, col2 = st.columns(2)
         col2.plotly_chart(fig_by_weekday)
         col1.plotly_chart(fig_per_day)
 
+    @Telemetry.timed()
     def draw_match_event_area(self):
         st.markdown("""
               #### Choose a match
@@ -130,20 +153,26 @@ class DashboardMatch:
         l_selectbox, r_selectbox = st.columns(2)
 
         # match selectbox
-        selected_match = l_selectbox.selectbox(label="Select a Match", options=self.streamer_matches['matchSelectbox'])
+        selected_match = PagedSelectbox().select(l_selectbox, "Select a Match", options=list(self.streamer_matches['matchSelectbox']))
+        if selected_match is None:
+            st.info("No match found")
+            st.stop()
         self.selected_match_id = selected_match[selected_match.index('|') + 2 : selected_match.index(' (')]
-        self.match_summary_array = self.data_service.get_match_summary_array(self.selected_streamer, self.selected_match_id)
+        self.selections.update(match_id=self.selected_match_id)
 
-        # load data for event and further
-        self.match_timeline_dict = self.data_service.get_match_timeline_dict(self.selected_streamer, self.selected_match_id)
-        self.match_summoner_dict = self.timeline_converter_service.create_match_summoner_dict(self.match_timeline_dict, self.match_summary_array)
-        self.match_timeline_df = self.timeline_converter_service.create_match_timeline_df(self.match_timeline_dict, self.match_summary_array)
+        # load data for event and further, the timeline and its event counts are built once per match
+        match = self.get_stage('match')
+        self.match_summary_array = match['summary_array']
+        self.match_context = match['context']
+        self.match_timeline_df = match['timeline_df']
+        self.match_event_cube = match['event_cube']
 
         # event type selectbox
-        match_event_types_upper = self.timeline_converter_service.get_event_types_of_timeline(self.match_timeline_df)
+        match_event_types_upper = self.match_event_cube.get_event_types()
         nice_match_event_types = self.make_nice_util.events_to_nice(match_event_types_upper)
         nice_match_evt_type = r_selectbox.selectbox(label="Select an In-Game Event-Type", options=nice_match_event_types)
         self.selected_match_event_type = self.make_nice_util.nice_to_event(nice_match_evt_type)
+        self.selections.update(match_event_type=self.selected_match_event_type)
 
         st.markdown("""
             :bulb: You can choose an In-Game Event-Type.  
@@ -151,38 +180,13 @@ class DashboardMatch:
             The winning team is displayed in greens and the loosing team is colored in red. If you choose the In-Game Event-Type all, then all different Events will be aggregated.
         """)
 
-        self.events_by_team = self.timeline_converter_service.get_events_by_player_desc_df(self.match_timeline_df, self.match_summary_array, self.selected_match_event_type)
-
-        # plot event type per team member
-        if self.selected_match_event_type is None:
-            title_label = "Total occurences of ALL In-Game-Events by summoner"
-            count_label = "ALL In-Game-Events"
-        else:
-            title_label = f"Total occurences of In-Game-Event '{self.make_nice_util.format_event(self.selected_match_event_type)}' by summoner"
-            count_label = f"occurences of '{self.make_nice_util.format_event(self.selected_match_event_type)}'"
-
-        fig_barplot = px.bar(self.events_by_team, x="count", y='event_summoner', color="win",
-                             title=title_label,
-                             labels={"event_summoner": "Summoner", "count": count_label, "win": "Match won?"},
-                             category_orders={
-                                 "win": [True, False]
-                             },
-                             color_discrete_map={ # replaces default color mapping by value
-                                 True: "#3CBC8D", False: "#E9422E"
-                             },)
-
-        # plot event by team
-        pie_df = self.events_by_team.groupby(['win']).sum('count').reset_index()
-        fig_pie = px.pie(pie_df, names='win', values='count', color="win",
-                         title="relative by team",
-                         color_discrete_map={ # replaces default color mapping by value
-                             True: "#3CBC8D", False: "#E9422E"
-                         })
+        self.events_by_team, fig_barplot, fig_pie = self.get_stage('match_event_figures')
 
         left_match_fig, right_match_fig = st.columns([2, 1])
         left_match_fig.plotly_chart(fig_barplot)
         right_match_fig.plotly_chart(fig_pie)
 
+    @Telemetry.timed()
     def draw_summoner_event_area(self):
         st.markdown("""
               #### Choose a summoner
@@ -194,11 +198,10 @@ class DashboardMatch:
         l_selectbox, r_selectbox = st.columns(2)
 
         # summoner selectbox
-        match_summoners = self.data_service.get_df_summoners_of_streamer(self.selected_streamer)
         nice_summoners = []
         default_idx = 0
-        for i, summoner in enumerate([match['summonerName'] for match in self.match_summary_array]):
-            if len(match_summoners[match_summoners['summoner_name'] == summoner]) > 0:
+        for i, summoner in enumerate(self.match_context.summoner_names):
+            if self.match_context.is_streamer_summoner(summoner):
                 nice_summoners.append(f"{summoner} ({self.selected_streamer})")
                 default_idx = i
             else:
@@ -211,7 +214,7 @@ class DashboardMatch:
 
 
         # event type selectbox
-        summoner_event_types_upper = self.timeline_converter_service.get_event_types_of_timeline_for_summoner(self.match_timeline_df, self.selected_summoner_of_match)
+        summoner_event_types_upper = self.match_event_cube.get_event_types_for_summoner(self.selected_summoner_of_match)
         nice_summoner_event_types = self.make_nice_util.events_to_nice(summoner_event_types_upper)
         default_summoner_events = [evt for evt in nice_summoner_event_types if 'Kill' in evt and not 'Ward' in evt]
         nice_summoner_evt_type_lst = r_selectbox.multiselect(label="Select an In-Game Event-Type",
@@ -221,9 +224,10 @@ class DashboardMatch:
         for selected_type in nice_summoner_evt_type_lst:
             nice = self.make_nice_util.nice_to_event(selected_type)
             self.selected_summoner_event_types.append(nice)
+        self.selections.update(summoner=self.selected_summoner_of_match, summoner_event_types=tuple(self.selected_summoner_event_types))
 
         # draw summoner metrics
-        summoner_summary_dict = [summ_summ for summ_summ in self.match_summary_array if summ_summ['summonerName'] == self.selected_summoner_of_match][0]
+        summoner_summary_dict = self.match_context.get_summary(self.selected_summoner_of_match)
         m1, m2, m3, m4, m5, m6 = st.columns(6)
         m1.metric("Team Position", summoner_summary_dict['teamPosition'].title())
         m2.metric("Champion", summoner_summary_dict['championName'])
@@ -233,60 +237,80 @@ class DashboardMatch:
         m6.metric("Minions Killed", summoner_summary_dict['totalMinionsKilled'])
 
         m7, m8, m9, m10, m11, m12 = st.columns(6)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'physicalDamageDealt')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'physicalDamageDealt')
         m7.metric("Physical Damage Dealt", value, delta)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'magicDamageDealt')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'magicDamageDealt')
         m8.metric("Magic Damage Dealt", value, delta)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'physicalDamageDealtToChampions')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'physicalDamageDealtToChampions')
         m9.metric("Physical Damage Dealt Champions", value, delta)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'magicDamageDealtToChampions')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'magicDamageDealtToChampions')
         m10.metric("Magic Damage Dealt To Champions", value, delta)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'physicalDamageTaken')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'physicalDamageTaken')
         m11.metric("Physical Damage Taken", value, delta)
-        value, delta = self.make_nice_util.calc_metric_value_pct(summoner_summary_dict, self.match_summary_array, 'magicDamageTaken')
+        value, delta = self.match_context.get_metric_value_pct(self.selected_summoner_of_match, 'magicDamageTaken')
         m12.metric("Magic Damage Taken", value, delta)
 
         st.markdown("""
-            The next section shows how the selected In-Game-Event-Type of the summoner relate to chat messages.  
-            It takes some time - rendering is a uniquely matplotlib graph
+            The next section shows how the selected In-Game-Event-Type of the summoner relate to chat messages.
         """)
 
+    @Telemetry.timed()
     def draw_game_event_text_graph(self):
-        # prepare active and passive summoner events
-        active_summoner = self.match_timeline_df.loc[self.match_timeline_df['event_summoner'] == self.selected_summoner_of_match][['event_types', 'rounded']]
-        passive_summoner = self.match_timeline_df.loc[self.match_timeline_df['event_opponents'] == self.selected_summoner_of_match][['rounded']]
-        passive_summoner['event_types'] = self.match_timeline_df.loc[self.match_timeline_df['event_opponents'] == self.selected_summoner_of_match]['event_types'] + '_PASSIVE'
+        summoner_view = self.get_stage('summoner_view')
+        self.timeline_summoner_filtered = summoner_view['timeline_summoner_filtered']
+        self.messages_per_sec_df = self.get_stage('chat_resample')
 
-        timeline_summoner = active_summoner.append(passive_summoner)
-        timeline_summoner.set_index('rounded', inplace=True)
-        timeline_summoner = timeline_summoner.sort_values('rounded')
+        st.image(self.get_stage('event_graph'))
 
-        # reindex to same size ! R E I N D E X!
-        aligned_datetime_index = pd.date_range(timeline_summoner.index.min(), timeline_summoner.index.max(), freq='1S').round('S')
-        self.messages_per_sec_df = self.messages_per_sec_df.reindex(index=aligned_datetime_index)
-        self.messages_per_sec_df['count_messages'] = self.messages_per_sec_df['count_messages'].fillna(0)
-        if len(self.selected_summoner_event_types) > 0:
-            event_filter = timeline_summoner["event_types"].isin(self.selected_summoner_event_types)
-            self.timeline_summoner_filtered = timeline_summoner[event_filter]
-        else:
-            self.timeline_summoner_filtered = timeline_summoner
+        before_cnt, during_cnt, after_cnt = self.get_stage('chat')['timecategory_counts']
+        st.caption(
+            f"{len(self.chat_of_match)} Messages have been captured. {before_cnt} before, {during_cnt} during, {after_cnt} after the match")
+
+    @Telemetry.timed()
+    def draw_gold_diff_chat_rate_graph(self):
+        fig = self.get_stage('gold_lead_figure')
+        if fig is None:
+            return
+
+        st.markdown("""
+            #### Gold lead and chat
+            Does the chat get louder when the team of the selected summoner gets ahead or falls behind?  
+            The lines show the gold and experience lead of the team per minute, the bars the chat messages per second within that minute.
+        """)
+        st.plotly_chart(fig, use_container_width=True)
+
+    @Telemetry.timed()
+    def create_game_event_text_figure(self, timeline_summoner_filtered, messages_per_sec_df):
         plot_title = f'In-Game-Events and Chat-Histogram per Second'
 
-        f, ax = plt.subplots(2, 1, figsize = (20,7), gridspec_kw={'height_ratios': [5, 1]}, sharex=True)
+        # a plain Figure is not registered in pyplot and does not leak into its global state
+        fig = Figure(figsize=(20, 7))
+        ax = fig.subplots(2, 1, gridspec_kw={'height_ratios': [5, 1]}, sharex=True)
 
         # events unique of event timeline
-        events_unique = self.timeline_summoner_filtered['event_types'].unique()
+        events_unique = timeline_summoner_filtered['event_types'].unique()
         events_unique = np.sort(events_unique)[::-1] # reverse
 
-        # plot chat histogram at bottom
-        plotting_series = self.messages_per_sec_df['count_messages']
-        before_cnt, during_cnt, after_cnt = self.chat_transformer_util.get_timecategory_counts(self.messages_per_sec_df)
-        colors = np.repeat(['#0DA9FF', '#0000FF', '#0DA9FF'], [before_cnt, during_cnt, after_cnt])
-        plotting_series.plot.bar(ax=ax[1], xticks=[], log=True, legend=False, **{'color':colors})
-
-        # set X axis labels
-        x_ticks = [self.messages_per_sec_df.index.get_loc(summoner_idx) for summoner_idx in self.timeline_summoner_filtered.index]
-        x_tick_labels = [str(self.messages_per_sec_df.index[idx].time()) for idx in x_ticks]
+        # plot chat histogram at bottom, one step artist per time category instead of a bar per second
+        counts = messages_per_sec_df['count_messages'].to_numpy()
+        x = np.arange(len(counts))
+        during_match = (messages_per_sec_df['timecategory'] == 'DURING_MATCH').to_numpy()
+        ax[1].fill_between(x, counts, where=~during_match, step='mid', color='#0DA9FF', linewidth=0)
+        ax[1].fill_between(x, counts, where=during_match, step='mid', color='#0000FF', linewidth=0)
+        ax[1].set_yscale('log')
+        ax[1].set_ylim(bottom=0.8)
+        ax[1].set_xlim(-0.5, len(counts) - 0.5)
+
+        # set X axis labels, all event times are part of the aligned index
+        event_positions = messages_per_sec_df.index.searchsorted(timeline_summoner_filtered.index)
+
+        # labels are thinned out, overlapping labels are unreadable and expensive to render
+        min_tick_distance = max(1, len(counts) // MAX_TICK_LABELS)
+        x_ticks = []
+        for position in np.unique(event_positions):
+            if len(x_ticks) == 0 or position - x_ticks[-1] >= min_tick_distance:
+                x_ticks.append(position)
+        x_tick_labels = messages_per_sec_df.index[x_ticks].strftime('%H:%M:%S')
 
         ax[1].set_xticks(x_ticks)
         ax[1].set_xticklabels(labels=x_tick_labels, rotation=90)
@@ -295,9 +319,8 @@ class DashboardMatch:
         num_events = len(events_unique)
         offsets = list(range(10, num_events * 10 + 1, 10))
         colors = sns.color_palette("bright", num_events).as_hex()
-        positions = []
-        for i, col in enumerate(events_unique):
-            positions.append([self.messages_per_sec_df.index.get_loc(idx) for idx in self.timeline_summoner_filtered[self.timeline_summoner_filtered['event_types'] == col].index])
+        event_types = timeline_summoner_filtered['event_types'].to_numpy()
+        positions = [event_positions[event_types == col] for col in events_unique]
 
         ax[0].eventplot(positions, colors=colors, lineoffsets=offsets, linelengths=10)
 
@@ -308,20 +331,15 @@ class DashboardMatch:
 
         ax[0].set_facecolor((.95, .95, .95, 0.95))
         ax[1].set_facecolor((.95, .95, .95, 0.95))
-        plt.subplots_adjust(wspace=0, hspace=0)
+        fig.subplots_adjust(wspace=0, hspace=0)
 
         ax[0].set_title(plot_title)
+        return fig
 
-        st.pyplot(plt)
-
-        before_cnt, during_cnt, after_cnt = self.chat_transformer_util.get_timecategory_counts(self.chat_of_match)
-        st.caption(
-            f"{len(self.chat_of_match)} Messages have been captured. {before_cnt} before, {during_cnt} during, {after_cnt} after the match")
-
+    @Telemetry.timed()
     def draw_chat_histogram_and_chat(self):
-        # filter and transform chat of that match
-        self.messages_per_sec_df = self.chat_transformer_util.create_resampled_messages_per_sec_df(self.chat_of_match)
         self.draw_game_event_text_graph()
+        self.draw_gold_diff_chat_rate_graph()
 
         st.markdown("""
             #### Filter Chat
@@ -329,10 +347,7 @@ class DashboardMatch:
         """)
 
         # Chat event type select box
-        evt_df = self.timeline_summoner_filtered.copy()
-        evt_df.sort_values('event_types', inplace=True)
-        evt_df['evt_num'] = evt_df.groupby('event_types').cumcount() + 1
-        evt_df['selectBox'] = evt_df['evt_num'].astype(str) + ' | ' + evt_df['event_types']
+        evt_df = self.get_stage('summoner_view')['event_select_df']
 
         # selectbox
         nice_selected_match_event = st.selectbox(label="Select an Event", options=evt_df['selectBox'])
@@ -341,7 +356,7 @@ class DashboardMatch:
         selected_match_event = evt_df[(evt_df['evt_num'] == sel_evt_num) & (evt_df['event_types'] == self_evt_type)]
 
         # start end slider
-        chat_range = pd.date_range(self.chat_of_match.index.min(), self.chat_of_match.index.max(), freq='1S').round('S')
+        chat_range = self.get_stage('chat')['chat_range']
         chat_start_idx = selected_match_event.index[0]
         chat_end_idx = chat_start_idx + pd.to_timedelta(15, unit='S')
 
@@ -351,14 +366,11 @@ class DashboardMatch:
             value=(chat_start_idx, chat_end_idx),
             format_func=lambda x: x.strftime("%H:%M:%S"))
         st.write('You selected chat between', start_chat_selection, 'and', end_chat_selection)
+        self.selections.update(chat_start=start_chat_selection, chat_end=end_chat_selection)
 
-        start_idx = self.chat_transformer_util.nearest_idx(self.chat_of_match.index, start_chat_selection)
-        end_idx = self.chat_transformer_util.nearest_idx(self.chat_of_match.index, end_chat_selection)
-
-        filtered_chat = self.chat_of_match[start_idx:end_idx]
-        mask = (filtered_chat['chatbot'] == False) & (filtered_chat['personal_msg'] == False) & (filtered_chat['command'] == False)
+        filtered_chat = self.get_stage('chat_window')
         col1, col2 = st.columns([1, 2])
-        col1.dataframe(data=filtered_chat[mask][['author_name', 'text']])
+        col1.dataframe(data=filtered_chat[['author_name', 'text']])
 
         with col2.container():
             import streamlit.components.v1 as components
@@ -367,4 +379,156 @@ class DashboardMatch:
                 # embed streamlit docs in a streamlit app
                 components.iframe(f"https://www.slanglang.net/emotes/{entered}/", height=600, scrolling=True)
 
+    # stages, they only read their arguments and never draw
+
+    def load_history(self, streamer, data_version):
+        return self.data_service.get_streamer_match_aggregates(streamer)
+
+    def create_streamer_figures(self, streamer_aggregates, streamer):
+        # left graph
+        matches_per_day = streamer_aggregates.matches_per_day
+        fig_per_day = px.bar(matches_per_day, x="date", y='count',
+                             title=f'Total matches per day of streamer {streamer}',
+                             labels={"date": "Date", "count": "Total matches"})
+
+        # right graph
+        matches_by_weekday = streamer_aggregates.matches_by_weekday
+        fig_by_weekday = px.histogram(matches_by_weekday, x="dayname", y='count', title=f'Average matches by weekday of streamer {streamer}',
+                                      labels= {"dayname": "", "count": "games per weekday"},
+                                      category_orders={
+                               "dayname": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+                           })
+
+        mean_matches = streamer_aggregates.mean_matches
+        fig_by_weekday.add_shape(type="line", line_color="blue", line_width=3, opacity=1, line_dash="dot",
+                      x0=0, x1=1, y0=mean_matches, xref="paper", y1=mean_matches, yref="y")
+        return fig_per_day, fig_by_weekday
+
+    def load_match(self, streamer_aggregates, streamer, match_id):
+        match = {
+            'streamer': streamer,
+            'match_id': match_id,
+            'summary_array': self.data_service.get_match_summary_array(streamer, match_id),
+            'context': self.data_service.get_match_context(streamer, match_id),
+            'timeline_df': self.data_service.get_match_timeline_df(streamer, match_id),
+            'event_cube': self.data_service.get_match_event_cube(streamer, match_id)
+        }
+
+        # the user will most likely step to an adjacent match next, load those in the background
+        match_ids = streamer_aggregates.history['matchId']
+        selected_match_idx = int(np.flatnonzero(match_ids.to_numpy() == match_id)[0])
+        MatchPrefetcher.get(self.data_service).prefetch(streamer, match_ids, selected_match_idx, self.session_id)
+        return match
+
+    def create_match_event_figures(self, match, match_event_type):
+        match_event_cube = match['event_cube']
+        events_by_team = match_event_cube.get_events_by_player_desc_df(match_event_type)
+
+        # plot event type per team member
+        if match_event_type is None:
+            title_label = "Total occurences of ALL In-Game-Events by summoner"
+            count_label = "ALL In-Game-Events"
+        else:
+            title_label = f"Total occurences of In-Game-Event '{self.make_nice_util.format_event(match_event_type)}' by summoner"
+            count_label = f"occurences of '{self.make_nice_util.format_event(match_event_type)}'"
+
+        fig_barplot = px.bar(events_by_team, x="count", y='event_summoner', color="win",
+                             title=title_label,
+                             labels={"event_summoner": "Summoner", "count": count_label, "win": "Match won?"},
+                             category_orders={
+                                 "win": [True, False]
+                             },
+                             color_discrete_map={ # replaces default color mapping by value
+                                 True: "#3CBC8D", False: "#E9422E"
+                             },)
+
+        # plot event by team
+        pie_df = match_event_cube.get_team_counts_df(match_event_type)
+        fig_pie = px.pie(pie_df, names='win', values='count', color="win",
+                         title="relative by team",
+                         color_discrete_map={ # replaces default color mapping by value
+                             True: "#3CBC8D", False: "#E9422E"
+                         })
+        return events_by_team, fig_barplot, fig_pie
+
+    def load_summoner_events(self, match, summoner):
+        # prepare active and passive summoner events
+        timeline_summoner = self.timeline_converter_service.get_summoner_events_df(match['timeline_df'], summoner)
+        return {'summoner': summoner, 'timeline_summoner': timeline_summoner}
+
+    def create_summoner_view(self, summoner_events, summoner_event_types):
+        timeline_summoner = summoner_events['timeline_summoner']
+        if len(summoner_event_types) > 0:
+            event_filter = timeline_summoner["event_types"].isin(summoner_event_types)
+            timeline_summoner_filtered = timeline_summoner[event_filter]
+        else:
+            timeline_summoner_filtered = timeline_summoner
 
+        evt_df = timeline_summoner_filtered.copy()
+        evt_df.sort_values('event_types', inplace=True)
+        evt_df['evt_num'] = evt_df.groupby('event_types').cumcount() + 1
+        evt_df['selectBox'] = evt_df['evt_num'].astype(str) + ' | ' + evt_df['event_types']
+        return {'summoner': summoner_events['summoner'], 'summoner_event_types': summoner_event_types,
+                'timeline_summoner_filtered': timeline_summoner_filtered, 'event_select_df': evt_df}
+
+    def load_chat(self, match):
+        streamer, match_id = match['streamer'], match['match_id']
+        chat_of_match = self.data_service.get_chat_of_match_df(streamer, match_id)
+        chat = {'chat_of_match': chat_of_match}
+        if len(chat_of_match) > 0:
+            chat['chat_rate_pyramid'] = self.data_service.get_chat_rate_pyramid(streamer, match_id, chat_of_match)
+            chat['chat_window_index'] = self.data_service.get_chat_window_index(streamer, match_id, chat_of_match)
+            chat['chat_range'] = pd.date_range(chat_of_match.index.min(), chat_of_match.index.max(), freq='1S').round('S')
+            chat['timecategory_counts'] = self.chat_transformer_util.get_timecategory_counts(chat_of_match)
+        return chat
+
+    def resample_chat(self, summoner_events, chat):
+        # reindex to same size ! R E I N D E X!
+        timeline_summoner = summoner_events['timeline_summoner']
+        aligned_datetime_index = pd.date_range(timeline_summoner.index.min(), timeline_summoner.index.max(), freq='1S').round('S')
+        messages_per_sec_df = chat['chat_rate_pyramid'].to_messages_per_sec_df().reindex(index=aligned_datetime_index)
+        messages_per_sec_df['count_messages'] = messages_per_sec_df['count_messages'].fillna(0)
+        return messages_per_sec_df
+
+    def render_event_graph(self, match, summoner_view, messages_per_sec_df):
+        # the rendered png is cached, drawing the figure again costs as much as creating it.
+        # Rewritten timeline or chat files get a new version and with it a new figure
+        streamer, match_id = match['streamer'], match['match_id']
+        data_version = (self.data_service.get_match_data_version(streamer, match_id), self.data_service.get_chat_data_version(streamer, match_id))
+        figure_key = (streamer, match_id, data_version, summoner_view['summoner'], tuple(sorted(summoner_view['summoner_event_types'])))
+        png = self.event_graph_cache.get(figure_key)
+        if png is None:
+            buffer = io.BytesIO()
+            self.create_game_event_text_figure(summoner_view['timeline_summoner_filtered'], messages_per_sec_df).savefig(buffer, format='png', bbox_inches='tight')
+            png = buffer.getvalue()
+            self.event_graph_cache.put(figure_key, png, len(png))
+        return png
+
+    def create_gold_lead_figure(self, match, chat, summoner):
+        # per minute stats come from the cached participant frames, the timeline dicts are not walked on a rerun
+        participant_frames = self.data_service.get_match_participant_frames(match['streamer'], match['match_id'])
+        if len(participant_frames.timestamps) < 2:
+            return None
+
+        match_context = match['context']
+        team_id = match_context.get_summary(summoner).get('teamId')
+        team_mask = np.array([match_context.by_participant_id.get(int(participant_id), {}).get('teamId') == team_id
+                              for participant_id in participant_frames.participant_ids])
+        frame_datetimes = participant_frames.get_datetimes()
+        frame_seconds = frame_datetimes.values.astype('datetime64[s]').astype(np.int64)
+        chat_rates = chat['chat_rate_pyramid'].get_window_rates(frame_seconds[:-1], frame_seconds[1:])
+        minute_centers = frame_datetimes[:-1] + (frame_datetimes[1:] - frame_datetimes[:-1]) / 2
+
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Bar(x=minute_centers, y=chat_rates, name="Chat messages per second", marker_color="#0DA9FF", opacity=0.5), secondary_y=True)
+        fig.add_trace(go.Scatter(x=frame_datetimes, y=participant_frames.get_team_diff('totalGold', team_mask), name="Gold lead",
+                                 line_color="#E5A50A"), secondary_y=False)
+        fig.add_trace(go.Scatter(x=frame_datetimes, y=participant_frames.get_team_diff('xp', team_mask), name="XP lead",
+                                 line_color="#3CBC8D", line_dash="dot"), secondary_y=False)
+        fig.update_layout(title=f"Lead of the team of {summoner} and chat rate per minute")
+        fig.update_yaxes(title_text="Lead", secondary_y=False)
+        fig.update_yaxes(title_text="Messages per second", secondary_y=True)
+        return fig
+
+    def filter_chat_window(self, chat, chat_start, chat_end):
+        return chat['chat_window_index'].get_window(chat_start, chat_end)
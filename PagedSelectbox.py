@@ -0,0 +1,33 @@
+import math
+
+from service.DataCatalog import DataCatalog
+
+PAGE_SIZE = 100
+
+
+class PagedSelectbox:
+    # a plain selectbox for short lists, long lists get a search field and pages.
+    # select returns None if there is nothing to select, callers show a message instead of the dashboard
+
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+
+    def select(self, container, label, options=None, search=None):
+        if search is None:
+            search = lambda query, offset, limit: DataCatalog.page(options, query, offset, limit)
+
+        first_page, total = search('', 0, self.page_size)
+        if total == 0:
+            return None
+        if total <= self.page_size:
+            return container.selectbox(label=label, options=first_page)
+
+        query = container.text_input(label=f"Search ({total} options)", key=f"{label}_search")
+        _, found = search(query, 0, 0)
+        if found == 0:
+            return None
+        pages = math.ceil(found / self.page_size)
+        # a new query starts on its first page, the page of the previous query could be beyond the last one
+        page = container.number_input(label=f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{label}_page_{query}") if pages > 1 else 1
+        options, _ = search(query, (int(page) - 1) * self.page_size, self.page_size)
+        return container.selectbox(label=label, options=options)
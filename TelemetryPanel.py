@@ -0,0 +1,22 @@
+import streamlit as st
+
+from service.DataService import DataService
+from service.Telemetry import ROLLING_WINDOW, Telemetry
+
+
+class TelemetryPanel:
+
+    def draw(self):
+        with st.sidebar.expander("Performance"):
+            rerun_df = Telemetry.get_rerun_df()
+            if len(rerun_df) > 0:
+                total_ms = rerun_df.loc[~rerun_df['span'].str.startswith(' '), 'ms'].sum()
+                st.caption(f"This rerun: {total_ms:.0f} ms in instrumented sections")
+                st.dataframe(rerun_df)
+
+            st.caption(f"Rolling p50/p95 of the last {ROLLING_WINDOW} calls per span")
+            st.dataframe(Telemetry.get_rolling_stats_df())
+
+            cache_stats = DataService.data_cache.get_stats()
+            st.caption(f"Data cache (all sessions): {cache_stats['current_bytes'] / 1024 ** 2:.0f} of {cache_stats['max_bytes'] / 1024 ** 2:.0f} MB")
+            st.json(cache_stats)
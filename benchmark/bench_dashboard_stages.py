@@ -0,0 +1,41 @@
+import argparse
+import os
+import tempfile
+
+from benchmark.synthetic_data import write_streamer
+from DashboardMatch import DashboardMatch
+from service.DataService import DataService
+from tests.dashboard_interactions import get_interactions, rerun
+
+PLAYER_NAME = 'synthetic_streamer'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage executions of the match dashboard per simulated interaction")
+    parser.add_argument('--matches', type=int, default=5)
+    args = parser.parse_args()
+
+    repo_dir = os.getcwd()
+    os.environ['PICKLE_PW'] = 'synthetic'
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        try:
+            data_service = DataService()
+            write_streamer(data_service, PLAYER_NAME, args.matches)
+            match_ids = list(data_service.get_df_match_history_of_streamer(PLAYER_NAME)['matchId'])
+            DataService.data_cache.clear()
+
+            dashboard = DashboardMatch(data_service, stage_state={})
+            for label, interact, expected in get_interactions(dashboard, data_service, PLAYER_NAME, match_ids):
+                executions, elapsed = rerun(dashboard, interact)
+                print(f"{label:>22}: {elapsed * 1000:7.1f} ms, {sum(executions.values())} stages executed {sorted(executions)}")
+                assert set(executions) == expected, f"{label}: executed {sorted(executions)}, expected {sorted(expected)}"
+                assert all(count == 1 for count in executions.values()), f"{label}: a stage ran more than once {executions}"
+            print(dashboard.stages.get_executions())
+        finally:
+            os.chdir(repo_dir)
+            DataService.data_cache.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark.bench_language_detector import SAMPLE_MESSAGES
+from ml.InferenceServer import get_percentiles
+from ml.LanguageDetectorClient import LanguageDetectorClient
+from tests.fake_language_detector import SimulatedLanguageDetector, start_server
+
+
+def create_language_detector(simulate):
+    if not simulate and os.path.exists(os.path.join('models', 'config.json')):
+        from ml.LanguageDetector import LanguageDetector
+        return LanguageDetector()
+    print("no model in models/, the model is simulated")
+    return SimulatedLanguageDetector()
+
+
+def run_clients(client, clients, requests_per_client):
+    # every client sends single texts, like a user of the dashboard classifying one message at a time
+    def run_client(client_idx):
+        latencies = []
+        for i in range(requests_per_client):
+            text = f"{SAMPLE_MESSAGES[(client_idx + i) % len(SAMPLE_MESSAGES)]} {client_idx} {i}"
+            start = time.perf_counter()
+            client.predict_probabilities([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(run_client, range(clients)) for latency in result]
+    return len(latencies) / (time.perf_counter() - start), get_percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the language detector server with concurrent clients")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=50, help="requests per client")
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--simulate', action='store_true', help="simulate the model even if it was downloaded")
+    args = parser.parse_args()
+
+    language_detector = create_language_detector(args.simulate)
+    with tempfile.TemporaryDirectory() as socket_dir:
+        # without batching every request is a forward pass of its own
+        configurations = [('no batching', 1, 0), ('micro-batching', args.max_batch_size, args.max_wait_ms)]
+        for idx, (label, max_batch_size, max_wait_ms) in enumerate(configurations):
+            address = f"unix:{os.path.join(socket_dir, f'server_{idx}.sock')}"
+            inference_server = start_server(language_detector, address, max_batch_size, max_wait_ms)
+            client = LanguageDetectorClient(address)
+            for clients in args.clients:
+                batches_before = inference_server.batches
+                requests_per_sec, latency_ms = run_clients(client, clients, args.requests)
+                batches = inference_server.batches - batches_before
+                print(f"{label:>15}, {clients:>3} clients: {requests_per_sec:8.1f} requests/sec, {batches} batches "
+                      f"(mean size {clients * args.requests / max(batches, 1):.1f}), latency p50 {latency_ms['p50']} ms, "
+                      f"p95 {latency_ms['p95']} ms, p99 {latency_ms['p99']} ms")
+            print(client.get_server_stats())
+
+
+if __name__ == '__main__':
+    main()
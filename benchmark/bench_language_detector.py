@@ -0,0 +1,49 @@
+import sys
+import time
+
+from ml.LanguageDetector import LanguageDetector
+from service.DataService import DataService
+
+SAMPLE_MESSAGES = [
+    "kekw", "this is an example text", "gg wp", "das war ein sehr guter kill", "lul what was that",
+    "@noway4u_sir wie viele games heute noch?", "pog", "He is so bad at this game, unbelievable", "hallo zusammen",
+    "bonjour à tous", "jajaja que malo", "that flash was insane 5head"
+]
+
+
+def get_sample_messages(count):
+    data_service = DataService()
+    try:
+        for player_name in data_service.get_available_streamers():
+            if data_service.exists_prepared_file(player_name, 'chat_df'):
+                texts = data_service.read_prepared_df_file(player_name, 'chat_df')['text'].dropna().astype(str)
+                return list(texts[:count])
+    except Exception as e:
+        print(f"could not read chat data ({e}), using sample messages")
+    return (SAMPLE_MESSAGES * (count // len(SAMPLE_MESSAGES) + 1))[:count]
+
+
+def bench_single(language_detector, messages):
+    start = time.perf_counter()
+    for message in messages:
+        language_detector.predict_probabilities([message])
+    return len(messages) / (time.perf_counter() - start)
+
+
+def bench_batch(language_detector, messages, batch_size):
+    start = time.perf_counter()
+    language_detector.evaluate_batch(messages, batch_size=batch_size)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main(count=2000, single_count=200):
+    language_detector = LanguageDetector()
+    messages = get_sample_messages(count)
+
+    print(f"single (one message per call): {bench_single(language_detector, messages[:single_count]):.1f} messages/sec")
+    for batch_size in [8, 32, 64, 128]:
+        print(f"evaluate_batch, batch_size={batch_size}: {bench_batch(language_detector, messages, batch_size):.1f} messages/sec")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,66 @@
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from benchmark.bench_language_detector import get_sample_messages
+
+
+def get_rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def bench_mode(mode, messages, single_count, num_threads):
+    from ml.LanguageDetector import LanguageDetector
+
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    language_detector = LanguageDetector(mode=mode, num_threads=num_threads)
+    load_s = time.perf_counter() - start
+    rss_model = get_rss_mb() - rss_before
+
+    latencies = []
+    for message in messages[:single_count]:
+        start = time.perf_counter()
+        language_detector.infer_probabilities([message])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    probabilities = language_detector.infer_probabilities(messages)
+    throughput = len(messages) / (time.perf_counter() - start)
+
+    return {
+        'mode': mode,
+        'load_s': load_s,
+        'rss_model_mb': rss_model,
+        'latency_p50_ms': np.percentile(latencies, 50) * 1000,
+        'latency_p95_ms': np.percentile(latencies, 95) * 1000,
+        'throughput_msgs_per_s': throughput,
+        'top1': probabilities.argmax(axis=1)
+    }
+
+
+def main(count=1000, single_count=100, num_threads=None):
+    messages = get_sample_messages(count)
+
+    # every mode runs in a fresh process, so the RSS of one model does not include the other
+    results = {}
+    for mode in ['fp32', 'quantized']:
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            results[mode] = pool.apply(bench_mode, (mode, messages, single_count, num_threads))
+
+    for mode, result in results.items():
+        print(f"{mode}: load {result['load_s']:.1f} s, model RSS {result['rss_model_mb']:.0f} MB, "
+              f"latency p50 {result['latency_p50_ms']:.1f} ms / p95 {result['latency_p95_ms']:.1f} ms, "
+              f"throughput {result['throughput_msgs_per_s']:.1f} messages/sec")
+    agreement = (results['fp32']['top1'] == results['quantized']['top1']).mean()
+    print(f"top-1 agreement of quantized with fp32 on {len(messages)} messages: {agreement * 100:.2f} %")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
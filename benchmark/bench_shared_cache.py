@@ -0,0 +1,81 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark.synthetic_data import write_streamer
+from service.DataService import DataService
+
+PLAYER_NAME = 'synthetic_streamer'
+
+
+class CountingDataService(DataService):
+
+    decrypted = Counter()
+    _lock = threading.Lock()
+
+    def decrypt_file(self, player_name, file):
+        with CountingDataService._lock:
+            CountingDataService.decrypted[file] += 1
+        return super().decrypt_file(player_name, file)
+
+
+def simulate_session(match_ids):
+    # every streamlit session creates its own DataService, the data cache is shared by the class
+    data_service = CountingDataService()
+    data_service.get_df_match_history_of_streamer(PLAYER_NAME)
+    data_service.get_df_summoners_of_streamer(PLAYER_NAME)
+    for match_id in match_ids:
+        data_service.get_match_summary_array(PLAYER_NAME, match_id)
+        data_service.get_match_timeline_df(PLAYER_NAME, match_id)
+        data_service.get_chat_of_match_df(PLAYER_NAME, match_id)
+
+
+def run_sessions(sessions, match_ids):
+    CountingDataService.decrypted.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for future in [pool.submit(simulate_session, match_ids) for _ in range(sessions)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    decrypts = sum(CountingDataService.decrypted.values())
+    duplicates = sum(count - 1 for count in CountingDataService.decrypted.values())
+    print(f"{sessions} sessions: {elapsed * 1000:.0f} ms, {decrypts} decrypts of {len(CountingDataService.decrypted)} files, {duplicates} duplicates")
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent sessions against the shared data cache")
+    parser.add_argument('--matches', type=int, default=5)
+    parser.add_argument('--sessions', type=int, default=8)
+    args = parser.parse_args()
+
+    repo_dir = os.getcwd()
+    os.environ['PICKLE_PW'] = 'synthetic'
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        try:
+            data_service = DataService()
+            write_streamer(data_service, PLAYER_NAME, args.matches)
+            match_ids = list(data_service.get_df_match_history_of_streamer(PLAYER_NAME)['matchId'])
+
+            DataService.data_cache.clear()
+            cold_duplicates = run_sessions(args.sessions, match_ids)
+            run_sessions(args.sessions, match_ids)
+
+            # a rewritten file gets a new version, only that file is decrypted again
+            data_service.write_prepared_file(data_service.read_prepared_file(PLAYER_NAME, 'match_summaries'), PLAYER_NAME, 'match_summaries')
+            run_sessions(args.sessions, match_ids)
+            assert set(CountingDataService.decrypted) == {'match_summaries'}, CountingDataService.decrypted
+            assert cold_duplicates == 0, "concurrent misses of the same file were not coalesced"
+            print(DataService.data_cache.get_stats())
+        finally:
+            os.chdir(repo_dir)
+            DataService.data_cache.clear()
+
+
+if __name__ == '__main__':
+    main()
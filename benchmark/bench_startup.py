@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+
+MODE_SCRIPTS = {
+    "Match Dashboard": """
+from DashboardMatch import DashboardMatch
+from service.DataService import DataService
+import_done = time.perf_counter()
+DashboardMatch(DataService()).refresh()
+""",
+    "Language Classification": """
+from DashboardLanguageClassifier import DashboardLanguageClassifier
+from ml.LanguageDetectorProvider import LanguageDetectorProvider
+from service.DataService import DataService
+import_done = time.perf_counter()
+DashboardLanguageClassifier(DataService(), LanguageDetectorProvider.get()).refresh()
+"""
+}
+
+CHILD_TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+{script}
+render_done = time.perf_counter()
+print(json.dumps({{'import_s': import_done - start, 'first_render_s': render_done - import_done, 'torch_imported': 'torch' in sys.modules}}))
+"""
+
+
+def measure_mode(mode):
+    # every mode gets a fresh interpreter, so nothing is imported yet (streamlit runs in bare mode)
+    result = subprocess.run([sys.executable, '-c', CHILD_TEMPLATE.format(script=MODE_SCRIPTS[mode])], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    for mode in MODE_SCRIPTS:
+        result = measure_mode(mode)
+        if 'error' in result:
+            print(f"{mode}: failed with {result['error']}")
+        else:
+            print(f"{mode}: import {result['import_s']:.2f} s, first render {result['first_render_s']:.2f} s, torch imported: {result['torch_imported']}")
+
+
+if __name__ == '__main__':
+    main()
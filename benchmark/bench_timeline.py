@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+
+from benchmark.synthetic_data import create_synthetic_match
+from service.DataService import DataService
+from service.ParticipantFrames import ParticipantFrames
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+from tests.timeline_reference import (assert_context_equivalent, assert_cube_equivalent, assert_equivalent, assert_frames_equivalent,
+                                      legacy_create_match_timeline_df, legacy_get_gold_diff)
+
+
+def time_call(func, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def get_largest_timelines(data_service, player_name, count):
+    player_path = data_service.get_player_file_path(player_name)
+    files = [f for f in os.listdir(player_path) if f.startswith('match_timeline_')]
+    files.sort(key=lambda f: os.path.getsize(player_path.joinpath(f)), reverse=True)
+    return [f[len('match_timeline_'):-len('.pkl.aes')] for f in files[:count]]
+
+
+def iter_matches(count):
+    # the largest matches of the real data, generated matches without PICKLE_PW or dsc_data
+    data_service = DataService()
+    if data_service.get_password() is not None and os.path.isdir(data_service.get_dsc_data_file_path()):
+        for player_name in data_service.get_available_streamers():
+            for match_id in get_largest_timelines(data_service, player_name, count):
+                yield player_name, match_id, data_service.get_match_timeline_dict(player_name, match_id), \
+                    data_service.get_raw_match_summary_array(player_name, match_id)
+        return
+    print("no dsc_data or PICKLE_PW, using generated matches")
+    for seed in range(count):
+        yield ('synthetic', *create_synthetic_match(seed))
+
+
+def main(count=5, repeat=5):
+    for player_name, match_id, timeline_dict, summary_array in iter_matches(count):
+        expected, actual = assert_equivalent(timeline_dict, summary_array)
+        assert_cube_equivalent(actual, summary_array)
+        assert_context_equivalent(timeline_dict, summary_array)
+        assert_frames_equivalent(timeline_dict)
+        print(f"{player_name} {match_id}: {len(actual)} rows, legacy {TimelineTransformerUtil.get_memory_usage(expected) / 1024:.0f} KiB, "
+              f"compact {TimelineTransformerUtil.get_memory_usage(actual) / 1024:.0f} KiB")
+        legacy_s = time_call(legacy_create_match_timeline_df, repeat, timeline_dict, summary_array)
+        vectorized_s = time_call(TimelineTransformerUtil.create_match_timeline_df, repeat, timeline_dict, summary_array)
+        print(f"{player_name} {match_id}: legacy {legacy_s * 1000:.1f} ms, vectorized {vectorized_s * 1000:.1f} ms ({legacy_s / vectorized_s:.1f}x)")
+        participant_frames = ParticipantFrames.from_timeline(timeline_dict)
+        team_mask = participant_frames.participant_ids <= 5
+        legacy_s = time_call(legacy_get_gold_diff, repeat, timeline_dict, set(range(1, 6)))
+        extract_s = time_call(ParticipantFrames.from_timeline, repeat, timeline_dict)
+        cached_s = time_call(participant_frames.get_team_diff, repeat, 'totalGold', team_mask)
+        print(f"{player_name} {match_id}: gold diff by dict walk {legacy_s * 1000:.2f} ms, extraction once {extract_s * 1000:.2f} ms, "
+              f"from the cached frames {cached_s * 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
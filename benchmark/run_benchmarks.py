@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmark.synthetic_data import CHAT_TEXTS, write_streamer
+from service.ChatRatePyramid import ChatRatePyramid
+from service.ChatStore import ChatStore
+from service.ChatTransformerUtil import ChatTransformerUtil
+from service.ChatWindowIndex import ChatWindowIndex
+from service.DataService import DataService
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+
+PLAYER_NAME = 'synthetic_streamer'
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(func, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'min_ms': min(timings) * 1000, 'median_ms': float(np.median(timings)) * 1000, 'repeat': repeat}
+
+
+def clear_caches():
+    DataService.data_cache.clear()
+
+
+def run_data_benchmarks(data_service, repeat):
+    match_ids = list(data_service.get_df_match_history_of_streamer(PLAYER_NAME)['matchId'])
+    match_id = match_ids[len(match_ids) // 2]
+    timeline_dict = data_service.get_match_timeline_dict(PLAYER_NAME, match_id)
+    summary_array = data_service.get_match_summary_array(PLAYER_NAME, match_id)
+    timeline_df = TimelineTransformerUtil.create_match_timeline_df(timeline_dict, summary_array)
+    chat_of_match = data_service.get_chat_of_match_df(PLAYER_NAME, match_id)
+    window_index = ChatWindowIndex(chat_of_match)
+
+    rng = np.random.default_rng(0)
+    first, last = chat_of_match.index[0].value, chat_of_match.index[-1].value
+    window_starts = pd.to_datetime(rng.integers(first, last, 1000))
+    window_ends = window_starts + pd.Timedelta(seconds=30)
+
+    results = {
+        'aes_decrypt_timeline': measure(lambda: data_service.decrypt_file(PLAYER_NAME, f'match_timeline_{match_id}'), repeat, clear_caches),
+        'read_timeline_dict_cold': measure(lambda: data_service.get_match_timeline_dict(PLAYER_NAME, match_id), repeat, clear_caches),
+        'read_timeline_dict_cached': measure(lambda: data_service.get_match_timeline_dict(PLAYER_NAME, match_id), repeat),
+        'read_summary_array_cold': measure(lambda: data_service.get_match_summary_array(PLAYER_NAME, match_id), repeat, clear_caches),
+        'read_chat_df_cold': measure(lambda: data_service.read_prepared_df_file(PLAYER_NAME, 'chat_df'), repeat, clear_caches),
+        'read_chat_of_match_cold': measure(lambda: data_service.get_chat_of_match_df(PLAYER_NAME, match_id), repeat, clear_caches),
+        'get_match_timeline_events_cold': measure(lambda: data_service.get_match_timeline_events(PLAYER_NAME, match_id), repeat, clear_caches),
+        'create_match_timeline_df': measure(lambda: TimelineTransformerUtil.create_match_timeline_df(timeline_dict, summary_array), repeat),
+        'get_events_by_player_desc_df': measure(lambda: TimelineTransformerUtil.get_events_by_player_desc_df(timeline_df, summary_array), repeat),
+        'get_events_by_player_desc_df_kills': measure(lambda: TimelineTransformerUtil.get_events_by_player_desc_df(timeline_df, summary_array, 'CHAMPION_KILL'), repeat),
+        'chat_rate_pyramid': measure(lambda: ChatRatePyramid.from_chat(chat_of_match), repeat),
+        'resample_messages_per_sec': measure(lambda: ChatTransformerUtil.create_resampled_messages_per_sec_df(chat_of_match), repeat),
+        'chat_window_index': measure(lambda: ChatWindowIndex(chat_of_match), repeat),
+        'chat_window_queries_1000': measure(lambda: [window_index.get_window(start, end) for start, end in zip(window_starts, window_ends)], repeat),
+        'chat_windows_batch_1000': measure(lambda: window_index.get_windows(window_starts, '0s', '30s'), repeat),
+    }
+    # the chat store is built after the chat_df benchmarks, reading a partition is a different read path
+    ChatStore(data_service).build(PLAYER_NAME)
+    results['read_chat_partition_cold'] = measure(lambda: data_service.get_chat_of_match_df(PLAYER_NAME, match_id), repeat, clear_caches)
+    return results
+
+
+def run_language_detector_benchmarks(repeat, count=2000):
+    if not os.path.isdir('models'):
+        print("no models directory found, skipping the language detector")
+        return {}
+
+    from ml.LanguageDetector import LanguageDetector
+
+    language_detector = LanguageDetector()
+    messages = pd.Series((CHAT_TEXTS * (count // len(CHAT_TEXTS) + 1))[:count])
+    # distinct texts, so batching is measured instead of deduplication
+    messages = messages + ' ' + pd.Series(np.arange(count)).astype(str)
+    return {
+        'language_detector_batch_2000': measure(lambda: language_detector.evaluate_batch(messages), repeat),
+        'language_detector_single_100': measure(lambda: [language_detector.predict_probabilities([text]) for text in messages[:100]], repeat)
+    }
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_file):
+    with open(baseline_file) as baseline:
+        baseline_results = json.load(baseline)['results']
+    for name, result in results.items():
+        if name not in baseline_results:
+            continue
+        ratio = result['median_ms'] / max(baseline_results[name]['median_ms'], 1e-9)
+        marker = " REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        print(f"{name}: {baseline_results[name]['median_ms']:.2f} ms -> {result['median_ms']:.2f} ms ({ratio:.2f}x){marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths on synthetic data")
+    parser.add_argument('--matches', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=35)
+    parser.add_argument('--events-per-frame', type=int, default=60)
+    parser.add_argument('--messages-per-sec', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=f"benchmark_results_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument('--compare', help="results of an earlier run, regressions are marked")
+    args = parser.parse_args()
+
+    repo_dir = os.getcwd()
+    # the generated data is encrypted with its own password and lives in a temporary dsc_data
+    os.environ['PICKLE_PW'] = 'synthetic'
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        try:
+            data_service = DataService()
+            start = time.perf_counter()
+            write_streamer(data_service, PLAYER_NAME, args.matches, args.frames, args.events_per_frame, args.messages_per_sec)
+            print(f"generated {args.matches} synthetic matches in {time.perf_counter() - start:.1f}s")
+            results = run_data_benchmarks(data_service, args.repeat)
+        finally:
+            os.chdir(repo_dir)
+            clear_caches()
+    results.update(run_language_detector_benchmarks(args.repeat))
+
+    for name, result in results.items():
+        print(f"{name}: median {result['median_ms']:.2f} ms, min {result['min_ms']:.2f} ms")
+
+    report = {
+        'meta': {'created': datetime.now().isoformat(), 'commit': get_git_commit(), 'python': sys.version.split()[0],
+                 'pandas': pd.__version__, 'numpy': np.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                 'scale': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}},
+        'results': results
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
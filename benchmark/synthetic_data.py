@@ -0,0 +1,158 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyAesCrypt
+
+from service.DataCatalog import DataCatalog
+from service.DataService import AES_BUFFER_SIZE, DataService
+
+# relative frequency of the event types in a real match timeline
+EVENT_TYPE_WEIGHTS = {
+    "ITEM_PURCHASED": 30, "SKILL_LEVEL_UP": 18, "LEVEL_UP": 18, "WARD_PLACED": 14, "ITEM_DESTROYED": 8, "WARD_KILL": 3,
+    "CHAMPION_KILL": 4, "ITEM_SOLD": 1, "ITEM_UNDO": 1, "ELITE_MONSTER_KILL": 1, "BUILDING_KILL": 1, "TURRET_PLATE_DESTROYED": 1,
+    "CHAMPION_SPECIAL_KILL": 1
+}
+TEAM_POSITIONS = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+CHAMPIONS = ['Ahri', 'Garen', 'LeeSin', 'Jinx', 'Thresh', 'Darius', 'Lux', 'Vayne', 'Leona', 'Zed', 'Ezreal', 'Nami']
+CHAT_TEXTS = ['kekw', 'gg', 'pog', 'lul what was that', 'that flash was insane', '!uptime', '@someone hi there', 'hello chat',
+              'omegalul', 'wie viele games noch?', 'so bad', 'nice kill', 'ff15']
+CHAT_BOTS = ['nightbot', 'streamelements']
+MATCH_GAP = pd.Timedelta(minutes=10)
+
+
+def create_timeline_dict(rng, match_id, start_millis, frames=35, events_per_frame=60):
+    participants = [{'participantId': i, 'puuid': f'{match_id}-puuid-{i}'} for i in range(1, 11)]
+    event_types = list(EVENT_TYPE_WEIGHTS)
+    weights = np.array(list(EVENT_TYPE_WEIGHTS.values()), dtype=float)
+    weights /= weights.sum()
+
+    timeline_frames = []
+    for frame_idx in range(frames):
+        frame_events = []
+        if frame_idx == 0:
+            frame_events.append({'type': 'PAUSE_END', 'timestamp': 0, 'realTimestamp': start_millis})
+        timestamps = np.sort(rng.integers(frame_idx * 60000, (frame_idx + 1) * 60000, events_per_frame))
+        for timestamp, event_type in zip(timestamps, rng.choice(event_types, events_per_frame, p=weights)):
+            event = {'type': str(event_type), 'timestamp': int(timestamp)}
+            if event_type in ('ITEM_PURCHASED', 'ITEM_DESTROYED', 'ITEM_SOLD', 'ITEM_UNDO'):
+                event.update(participantId=int(rng.integers(1, 11)), itemId=int(rng.integers(1000, 7000)))
+            elif event_type in ('SKILL_LEVEL_UP', 'LEVEL_UP'):
+                event.update(participantId=int(rng.integers(1, 11)), level=int(rng.integers(1, 19)))
+            elif event_type == 'WARD_PLACED':
+                event.update(creatorId=int(rng.integers(0, 11)), wardType='YELLOW_TRINKET')
+            else:
+                # kills by minions and towers have the killer 0
+                event.update(killerId=int(rng.integers(0, 11)), position={'x': int(rng.integers(0, 15000)), 'y': int(rng.integers(0, 15000))})
+            if event_type == 'CHAMPION_KILL':
+                event.update(victimId=int(rng.integers(1, 11)), bounty=300,
+                             assistingParticipantIds=[int(p) for p in rng.choice(np.arange(1, 11), int(rng.integers(0, 5)), replace=False)])
+            frame_events.append(event)
+        if frame_idx == frames - 1:
+            frame_events.append({'type': 'GAME_END', 'timestamp': frames * 60000, 'realTimestamp': start_millis + frames * 60000, 'winningTeam': 100})
+
+        participant_frames = {}
+        for participant_id in range(1, 11):
+            total_gold = 500 + frame_idx * int(rng.integers(250, 450))
+            participant_frames[str(participant_id)] = {
+                'participantId': participant_id, 'currentGold': int(rng.integers(0, 1500)), 'totalGold': total_gold,
+                'goldPerSecond': 0, 'xp': frame_idx * int(rng.integers(300, 500)), 'level': min(1 + frame_idx // 2, 18),
+                'minionsKilled': frame_idx * int(rng.integers(4, 9)), 'jungleMinionsKilled': frame_idx * int(rng.integers(0, 5)),
+                'timeEnemySpentControlled': 0, 'position': {'x': int(rng.integers(0, 15000)), 'y': int(rng.integers(0, 15000))},
+                'championStats': {'health': 1000, 'healthMax': 1500, 'armor': 50, 'attackDamage': 80, 'abilityPower': 40},
+                'damageStats': {'totalDamageDone': frame_idx * 3000, 'totalDamageDoneToChampions': frame_idx * 500,
+                                'totalDamageTaken': frame_idx * 800}
+            }
+        timeline_frames.append({'timestamp': frame_idx * 60000, 'events': frame_events, 'participantFrames': participant_frames})
+
+    return {'metadata': {'matchId': match_id, 'participants': [p['puuid'] for p in participants]},
+            'info': {'frameInterval': 60000, 'participants': participants, 'frames': timeline_frames}}
+
+
+def create_participant_summaries(rng, match_id, summoner_names):
+    summaries = []
+    for i, summoner_name in enumerate(summoner_names):
+        summaries.append({
+            'puuid': f'{match_id}-puuid-{i + 1}', 'summonerName': summoner_name, 'participantId': i + 1,
+            'teamId': 100 if i < 5 else 200, 'win': i < 5, 'teamPosition': TEAM_POSITIONS[i % 5],
+            'championName': CHAMPIONS[int(rng.integers(0, len(CHAMPIONS)))], 'champLevel': int(rng.integers(10, 19)),
+            'kills': int(rng.integers(0, 15)), 'deaths': int(rng.integers(0, 12)), 'assists': int(rng.integers(0, 20)),
+            'totalMinionsKilled': int(rng.integers(0, 300)),
+            **{metric: int(rng.integers(1000, 200000)) for metric in
+               ['physicalDamageDealt', 'magicDamageDealt', 'physicalDamageDealtToChampions', 'magicDamageDealtToChampions',
+                'physicalDamageTaken', 'magicDamageTaken']}
+        })
+    return summaries
+
+
+def create_chat_df(rng, player_name, match_id, start, end, messages_per_sec=2.0):
+    # 60s before until 60s after the match, like the exporter notebook
+    first = start - pd.Timedelta(seconds=60)
+    span_nanos = (end + pd.Timedelta(seconds=60) - first).value
+    count = int(span_nanos / 1e9 * messages_per_sec)
+    datetimes = first + pd.to_timedelta(np.sort(rng.integers(0, span_nanos, count)), unit='ns')
+    authors = np.where(rng.random(count) < 0.05, rng.choice(CHAT_BOTS, count), np.char.add('viewer_', rng.integers(0, 2000, count).astype(str)))
+    texts = rng.choice(CHAT_TEXTS, count)
+    chat_df = pd.DataFrame({
+        'datetime': datetimes, 'channel': player_name, 'author_name': authors, 'text': texts, 'matchId': match_id,
+        'timecategory': np.where(datetimes < start, 'BEFORE_MATCH', np.where(datetimes < end, 'DURING_MATCH', 'AFTER_MATCH'))
+    })
+    chat_df['chatbot'] = np.isin(authors, CHAT_BOTS)
+    chat_df['personal_msg'] = chat_df['text'].str.startswith('@') & chat_df['text'].str.contains(' ', regex=False)
+    chat_df['command'] = chat_df['text'].str.startswith('!')
+    return chat_df
+
+
+def write_csv_file(df, data_service, player_name, file):
+    # the exporter stores data frames as encrypted csv, see DataService.read_prepared_df_file
+    _, aes_file = data_service.get_file_path(player_name, file)
+    with open(aes_file, "wb") as dst:
+        pyAesCrypt.encryptStream(io.BytesIO(df.to_csv(index=False).encode()), dst, data_service.get_password(), AES_BUFFER_SIZE)
+    DataCatalog.mark_changed(player_name)
+
+
+def create_synthetic_match(seed, frames=35, events_per_frame=60):
+    # a generated timeline and summaries of the same shape as the exported files
+    rng = np.random.default_rng(seed)
+    match_id = f'NA1_{4200000000 + seed}'
+    timeline_dict = create_timeline_dict(rng, match_id, pd.Timestamp('2022-01-10 18:00:00').value // 1000000, frames, events_per_frame)
+    summary_array = create_participant_summaries(rng, match_id, [f'summoner_{seed}_{i}' for i in range(10)])
+    return match_id, timeline_dict, summary_array
+
+
+def write_streamer(data_service, player_name, matches=20, frames=35, events_per_frame=60, messages_per_sec=2.0, seed=0):
+    # writes a streamer into dsc_data of the working directory, PICKLE_PW has to be set
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_service.get_player_file_path(player_name), exist_ok=True)
+    streamer_summoner = f'{player_name}_smurf'
+
+    match_summaries = []
+    chat_dfs = []
+    start = pd.Timestamp('2022-01-10 18:00:00')
+    for i in range(matches):
+        match_id = f'NA1_{4100000000 + seed * 100000 + i}'
+        duration = pd.Timedelta(minutes=frames)
+        timeline_dict = create_timeline_dict(rng, match_id, start.value // 1000000, frames, events_per_frame)
+        summoner_names = [f'summoner_{int(name)}' for name in rng.integers(0, 100000, 10)]
+        summoner_names[int(rng.integers(0, 10))] = streamer_summoner
+        data_service.write_prepared_file(timeline_dict, player_name, f'match_timeline_{match_id}')
+        data_service.write_prepared_file(create_participant_summaries(rng, match_id, summoner_names), player_name, f'match_participant_summaries_{match_id}')
+        match_summaries.append({'matchId': match_id, 'gameStartTimestamp_date': start, 'gameDuration_ms': int(duration.total_seconds() * 1000),
+                                'gameMode': 'CLASSIC', 'queueId': 420})
+        chat_dfs.append(create_chat_df(rng, player_name, match_id, start, start + duration, messages_per_sec))
+        start = start + duration + MATCH_GAP
+
+    data_service.write_prepared_file(match_summaries, player_name, 'match_summaries')
+    write_csv_file(pd.concat(chat_dfs, ignore_index=True), data_service, player_name, 'chat_df')
+    write_csv_file(pd.DataFrame({'summoner_name': [streamer_summoner]}), data_service, player_name, 'summoner_mapping')
+
+
+if __name__ == '__main__':
+    # python -m benchmark.synthetic_data <target dir> [streamer] [matches], the target dir gets a dsc_data folder
+    os.makedirs(sys.argv[1], exist_ok=True)
+    os.chdir(sys.argv[1])
+    os.environ.setdefault('PICKLE_PW', 'synthetic')
+    write_streamer(DataService(), sys.argv[2] if len(sys.argv) > 2 else 'synthetic_streamer',
+                   int(sys.argv[3]) if len(sys.argv) > 3 else 20)
@@ -1,20 +1,18 @@
+import os
+
 import streamlit as st
-import tokenizers
 
+from DashboardEpicMoments import DashboardEpicMoments
 from DashboardLanguageClassifier import DashboardLanguageClassifier
 from DashboardMatch import DashboardMatch
-from ml.LanguageDetector import LanguageDetector
+from ml.LanguageDetectorProvider import LanguageDetectorProvider
 from service.DataService import DataService
+from service.Telemetry import Telemetry
+from TelemetryPanel import TelemetryPanel
 
 
-@st.cache(suppress_st_warning=True,
-          hash_funcs= {
-              tokenizers.Tokenizer: lambda _: None,
-              tokenizers.AddedToken: lambda _: None
-          },
-          allow_output_mutation=True)
 def get_language_detector():
-    return LanguageDetector()
+    return LanguageDetectorProvider.get()
 
 
 def get_data_service():
@@ -23,10 +21,18 @@ def get_data_service():
 
 st.set_page_config("EPIC | dashboard", layout='wide')
 
-mode = st.sidebar.selectbox(label="Mode", options=("Match Dashboard", "Language Classification"))
+if os.environ.get('LANGUAGE_DETECTOR_WARM_UP', '0') == '1':
+    LanguageDetectorProvider.warm_up()
+
+Telemetry.start_rerun()
+
+mode = st.sidebar.selectbox(label="Mode", options=("Match Dashboard", "Epic Moments", "Language Classification"))
 
 if mode == "Match Dashboard":
-    dashboard = DashboardMatch(get_data_service(), get_language_detector())
+    dashboard = DashboardMatch(get_data_service())
+    dashboard.refresh()
+elif mode == "Epic Moments":
+    dashboard = DashboardEpicMoments(get_data_service())
     dashboard.refresh()
 elif mode == "Language Classification":
     dashboard = DashboardLanguageClassifier(get_data_service(), get_language_detector())
@@ -34,6 +40,5 @@ elif mode == "Language Classification":
 else:
     st.title("Invalid Dashboard Mode selected!")
 
-
-
-
+if Telemetry.enabled:
+    TelemetryPanel().draw()
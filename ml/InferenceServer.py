@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from service.Telemetry import Telemetry
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+# a message is a header of json and a payload of raw bytes, both prefixed by their length
+FRAME_PREFIX = struct.Struct('>II')
+STATS_WINDOW = 1000
+
+
+def parse_address(address):
+    # 'unix:/path/to/socket' or 'host:port'
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, port = address.rsplit(':', 1)
+    return 'tcp', (host, int(port))
+
+
+def encode_message(header, payload=b''):
+    header_bytes = json.dumps(header).encode('utf-8')
+    return FRAME_PREFIX.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+
+async def read_message(reader):
+    header_size, payload_size = FRAME_PREFIX.unpack(await reader.readexactly(FRAME_PREFIX.size))
+    header = json.loads(await reader.readexactly(header_size))
+    payload = await reader.readexactly(payload_size) if payload_size > 0 else b''
+    return header, payload
+
+
+def get_percentiles(values):
+    if len(values) == 0:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99])
+    return {'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2)}
+
+
+class PendingRequest:
+    __slots__ = ('texts', 'max_length', 'future', 'connection_id', 'enqueued_at')
+
+    def __init__(self, texts, max_length, future, connection_id=None):
+        self.texts = texts
+        self.max_length = max_length
+        self.future = future
+        self.connection_id = connection_id
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceServer:
+    # owns the one model of all dashboard processes. Requests of all connections are queued and collected into
+    # micro-batches of at most max_batch_size texts, a batch waits at most max_wait_ms for more requests.
+    # The model runs in a single thread, requests that arrive meanwhile are batched together
+
+    def __init__(self, language_detector, max_batch_size=None, max_wait_ms=None):
+        if max_batch_size is None:
+            max_batch_size = int(os.environ.get('LANGUAGE_SERVER_MAX_BATCH_SIZE', 32))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.environ.get('LANGUAGE_SERVER_MAX_WAIT_MS', 5))
+        self.language_detector = language_detector
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='language-detector')
+        self._queue = None
+        self._queued_texts = 0
+        self._request_event = None
+        # connection id -> time until the connection is waited for: while its request is in flight, and for max_wait_ms
+        # after its answer, a client usually sends its next request right away
+        self._active_until = {}
+        self._connection_ids = itertools.count()
+
+        self.connections = 0
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.errors = 0
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._latencies_ms = deque(maxlen=STATS_WINDOW)
+        self._queue_waits_ms = deque(maxlen=STATS_WINDOW)
+        self._model_ms = deque(maxlen=STATS_WINDOW)
+
+    def get_info(self):
+        language_detector = self.language_detector
+        return {'labels': list(language_detector.labels), 'model_revision': language_detector.model_revision,
+                'mode': language_detector.mode, 'max_length': language_detector.max_length,
+                'model_max_length': language_detector.model_max_length,
+                'max_batch_size': self.max_batch_size, 'max_wait_ms': self.max_wait_seconds * 1000}
+
+    def get_stats(self):
+        stats = {
+            'connections': self.connections,
+            'requests': self.requests,
+            'texts': self.texts,
+            'batches': self.batches,
+            'errors': self.errors,
+            'queue_requests': self._queue.qsize() if self._queue is not None else 0,
+            'queue_texts': self._queued_texts,
+            'batch_size_mean': round(float(np.mean(self._batch_sizes)), 2) if len(self._batch_sizes) > 0 else 0.0,
+            'batch_size_max': max(self._batch_sizes, default=0),
+            'latency_ms': get_percentiles(self._latencies_ms),
+            'queue_wait_ms': get_percentiles(self._queue_waits_ms),
+            'model_ms': get_percentiles(self._model_ms)
+        }
+        if self.language_detector.prediction_cache is not None:
+            stats['prediction_cache'] = self.language_detector.prediction_cache.get_stats()
+        return stats
+
+    async def predict(self, texts, max_length, connection_id=None):
+        future = asyncio.get_running_loop().create_future()
+        self._queued_texts += len(texts)
+        self._queue.put_nowait(PendingRequest(texts, max_length, future, connection_id))
+        self._request_event.set()
+        return await future
+
+    def get_wait_until(self, batch):
+        # a connection sends one request at a time, connections with a request in the batch are not waited for
+        batch_connections = {request.connection_id for request in batch}
+        return max((until for connection_id, until in self._active_until.items() if connection_id not in batch_connections), default=0)
+
+    async def collect_batch(self):
+        # the first request is awaited without limit, then queued requests are taken until the batch is full. The batch waits
+        # at most max_wait_ms for active connections, idle connections are not waited for and a single client is answered
+        # right away
+        batch = [await self._queue.get()]
+        batch_texts = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while batch_texts < self.max_batch_size:
+            if not self._queue.empty():
+                request = self._queue.get_nowait()
+                batch.append(request)
+                batch_texts += len(request.texts)
+                continue
+            timeout = min(deadline, self.get_wait_until(batch)) - time.perf_counter()
+            if timeout <= 0:
+                break
+            # waiting for the event instead of the queue, a timed out get could lose its request before Python 3.12
+            self._request_event.clear()
+            try:
+                await asyncio.wait_for(self._request_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        self._queued_texts -= batch_texts
+        return batch
+
+    def infer_batch(self, batch):
+        # requests with a different max_length can not share a forward pass
+        results = []
+        with Telemetry.span('InferenceServer.infer_batch', requests=len(batch)):
+            for max_length in {request.max_length for request in batch}:
+                group = [request for request in batch if request.max_length == max_length]
+                texts = [text for request in group for text in request.texts]
+                probabilities = self.language_detector.predict_probabilities(texts, max_length=max_length)
+                offsets = np.cumsum([0] + [len(request.texts) for request in group])
+                results.extend((request, probabilities[start:stop]) for request, start, stop in zip(group, offsets[:-1], offsets[1:]))
+        return results
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect_batch()
+            started_at = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._model_executor, self.infer_batch, batch)
+            except Exception as e:
+                print(f"inference of {len(batch)} requests failed: {e}")
+                self.errors += len(batch)
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            finished_at = time.perf_counter()
+
+            self.batches += 1
+            self._batch_sizes.append(sum(len(request.texts) for request in batch))
+            self._model_ms.append((finished_at - started_at) * 1000)
+            for request, probabilities in results:
+                self._queue_waits_ms.append((started_at - request.enqueued_at) * 1000)
+                self._latencies_ms.append((finished_at - request.enqueued_at) * 1000)
+                if not request.future.done():
+                    request.future.set_result(probabilities)
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        connection_id = next(self._connection_ids)
+        try:
+            while True:
+                try:
+                    header, _ = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                op = header.get('op')
+                if op == 'predict':
+                    self.requests += 1
+                    self.texts += len(header['texts'])
+                    self._active_until[connection_id] = math.inf
+                    try:
+                        probabilities = await self.predict(header['texts'], header.get('max_length'), connection_id)
+                    except Exception as e:
+                        writer.write(encode_message({'error': str(e)}))
+                    else:
+                        probabilities = np.ascontiguousarray(probabilities, dtype=np.float32)
+                        writer.write(encode_message({'shape': probabilities.shape}, probabilities.tobytes()))
+                elif op == 'info':
+                    writer.write(encode_message(self.get_info()))
+                elif op == 'stats':
+                    writer.write(encode_message(self.get_stats()))
+                else:
+                    writer.write(encode_message({'error': f"unknown op '{op}'"}))
+                await writer.drain()
+                if op == 'predict':
+                    self._active_until[connection_id] = time.perf_counter() + self.max_wait_seconds
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            self._active_until.pop(connection_id, None)
+            writer.close()
+
+    async def start(self, address):
+        self._queue = asyncio.Queue()
+        self._request_event = asyncio.Event()
+        family, target = parse_address(address)
+        if family == 'unix':
+            if os.path.exists(target):
+                os.remove(target)
+            server = await asyncio.start_unix_server(self.handle_connection, path=target)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=target[0], port=target[1])
+        batches = asyncio.get_running_loop().create_task(self.run_batches())
+        print(f"language detector server listening on {address} (max batch size {self.max_batch_size}, "
+              f"max wait {self.max_wait_seconds * 1000:.1f} ms)")
+        return server, batches
+
+    async def serve(self, address, stats_interval=None):
+        server, batches = await self.start(address)
+        async with server:
+            while True:
+                await asyncio.sleep(stats_interval or 3600)
+                if stats_interval:
+                    print(f"language detector server: {self.get_stats()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Language detector shared by all dashboard processes")
+    parser.add_argument('--address', default=os.environ.get('LANGUAGE_DETECTOR_SERVER', DEFAULT_ADDRESS),
+                        help="host:port or unix:/path/to/socket")
+    parser.add_argument('--max-batch-size', type=int, default=None)
+    parser.add_argument('--max-wait-ms', type=float, default=None)
+    parser.add_argument('--stats-interval', type=float, default=60, help="seconds between the printed stats, 0 disables them")
+    args = parser.parse_args()
+
+    from ml.LanguageDetector import LanguageDetector
+    from ml.PredictionCache import PredictionCache
+
+    inference_server = InferenceServer(LanguageDetector(prediction_cache=PredictionCache()), args.max_batch_size, args.max_wait_ms)
+    asyncio.run(inference_server.serve(args.address, args.stats_interval))
@@ -1,30 +1,97 @@
+import hashlib
+import os
+
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from transformers import TextClassificationPipeline
 from iso639 import languages
-import pandas as pd
-
-
-class LanguageDetector:
-
-    def __init__(self):
-        print("init Language Detector")
-        self.tokenizer = AutoTokenizer.from_pretrained("models/", local_files_only=True)
-        self.model = AutoModelForSequenceClassification.from_pretrained("models/", local_files_only=True)
-        self.pipeline = TextClassificationPipeline(
-            model=self.model,
-            tokenizer=self.tokenizer,
-            return_all_scores=True
-        )
-
-    def evaluate_scores(self, text):
-        scores = self.pipeline(text)
-        print(f"evaluated '{text}'")
-
-        df = pd.DataFrame(scores[0])
-        df.sort_values(by='score', ascending=False, inplace=True)
-        df = df.reset_index(drop=True)
-        df['label'] = df['label'].apply(lambda x: languages.get(alpha2=x).name)
-        df['score'] = df['score'] * 100
-        for idx, row in df[0:5].iterrows():
-            print(f"Pobability of {row['label']} is {round(row['score'], 2)} %")
-        return df
+import numpy as np
+import torch
+
+from ml.LanguageDetectorBase import LanguageDetectorBase
+from ml.PredictionCache import PredictionCache
+from service.Telemetry import Telemetry
+
+MODEL_PATH = "models/"
+MODES = ['fp32', 'quantized']
+
+
+class LanguageDetector(LanguageDetectorBase):
+
+    def __init__(self, batch_size=32, max_length=128, prediction_cache: PredictionCache = None, mode=None, num_threads=None):
+        if mode is None:
+            mode = os.environ.get('LANGUAGE_DETECTOR_MODE', 'fp32')
+        if mode not in MODES:
+            raise ValueError(f"invalid language detector mode '{mode}', expected one of {MODES}")
+        if num_threads is None and 'LANGUAGE_DETECTOR_THREADS' in os.environ:
+            num_threads = int(os.environ['LANGUAGE_DETECTOR_THREADS'])
+        print(f"init Language Detector ({mode})")
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH, local_files_only=True)
+        self.model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH, local_files_only=True)
+        self.model.eval()
+        if mode == 'quantized':
+            # int8 weights for all linear layers, activations are quantized on the fly
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.model_max_length = self.tokenizer.model_max_length
+        self.labels = [languages.get(alpha2=self.model.config.id2label[i]).name for i in range(self.model.config.num_labels)]
+        self.prediction_cache = prediction_cache
+        self.model_revision = f"{self.get_model_revision()}:{mode}"
+
+    @staticmethod
+    def get_model_revision():
+        # the weights are too big to hash on every start, their size identifies a revision good enough
+        digest = hashlib.sha1()
+        for file in sorted(os.listdir(MODEL_PATH)):
+            path = os.path.join(MODEL_PATH, file)
+            if os.path.isfile(path):
+                digest.update(f"{file}:{os.path.getsize(path)}".encode('utf-8'))
+                if file.endswith('.json'):
+                    with open(path, "rb") as src:
+                        digest.update(src.read())
+        return digest.hexdigest()
+
+    def predict_probabilities(self, texts, batch_size=None, max_length=None):
+        max_length = max_length or self.max_length
+        if self.prediction_cache is None:
+            return self.infer_probabilities(texts, batch_size, max_length)
+
+        # identical messages (emote spam, copypastas) are looked up and classified only once
+        revision = f"{self.model_revision}:{max_length}"
+        keys = [PredictionCache.create_key(text, revision) for text in texts]
+        unique_texts = dict(zip(keys, texts))
+        self.prediction_cache.add_deduplicated(len(keys) - len(unique_texts))
+
+        cached = self.prediction_cache.get_many(list(unique_texts))
+        missing_keys = [key for key in unique_texts if key not in cached]
+        if len(missing_keys) > 0:
+            inferred = self.infer_probabilities([unique_texts[key] for key in missing_keys], batch_size, max_length)
+            inferred = dict(zip(missing_keys, inferred))
+            self.prediction_cache.put_many(inferred)
+            cached.update(inferred)
+
+        probabilities = np.empty((len(texts), len(self.labels)), dtype=np.float32)
+        for i, key in enumerate(keys):
+            probabilities[i] = cached[key]
+        return probabilities
+
+    @Telemetry.timed()
+    def infer_probabilities(self, texts, batch_size=None, max_length=None):
+        batch_size = batch_size or self.batch_size
+        max_length = max_length or self.max_length
+        Telemetry.current_span().set(rows=len(texts))
+
+        # batches of texts with similar length need (almost) no padding
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        probabilities = np.empty((len(texts), len(self.labels)), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch_idx = order[start:start + batch_size]
+                batch = self.tokenizer([texts[i] for i in batch_idx], padding=True, truncation=True,
+                                       max_length=max_length, return_tensors='pt')
+                logits = self.model(**batch).logits
+                probabilities[batch_idx] = torch.softmax(logits, dim=-1).numpy()
+        return probabilities
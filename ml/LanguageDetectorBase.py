@@ -0,0 +1,65 @@
+import abc
+
+import numpy as np
+import pandas as pd
+
+from service.Telemetry import Telemetry
+
+
+class LanguageDetectorBase(abc.ABC):
+    # the evaluations on top of predict_probabilities, shared by the local model and the client of the inference server.
+    # Subclasses set labels, model_max_length and prediction_cache
+    labels: [str]
+    model_max_length: int
+    prediction_cache = None
+
+    @abc.abstractmethod
+    def predict_probabilities(self, texts, batch_size=None, max_length=None):
+        pass
+
+    @Telemetry.timed()
+    def evaluate_scores(self, text):
+        scores = self.predict_probabilities([text], max_length=self.model_max_length)[0]
+        print(f"evaluated '{text}'")
+
+        df = pd.DataFrame({'label': self.labels, 'score': scores})
+        df.sort_values(by='score', ascending=False, inplace=True)
+        df = df.reset_index(drop=True)
+        df['score'] = df['score'] * 100
+        for idx, row in df[0:5].iterrows():
+            print(f"Pobability of {row['label']} is {round(row['score'], 2)} %")
+        return df
+
+    def iter_evaluate_batch(self, messages, batch_size=None, max_length=None, chunk_size=4096):
+        chunk = []
+        for message in messages:
+            chunk.append(message if isinstance(message, str) else '')
+            if len(chunk) == chunk_size:
+                yield self.evaluate_top1(chunk, batch_size, max_length)
+                chunk = []
+        if len(chunk) > 0:
+            yield self.evaluate_top1(chunk, batch_size, max_length)
+
+    def evaluate_top1(self, texts, batch_size=None, max_length=None):
+        probabilities = self.predict_probabilities(texts, batch_size, max_length)
+        label_ids = probabilities.argmax(axis=1).astype(np.int16)
+        return label_ids, probabilities[np.arange(len(texts)), label_ids]
+
+    @Telemetry.timed()
+    def evaluate_batch(self, messages, batch_size=None, max_length=None):
+        index = messages.index if isinstance(messages, pd.Series) else None
+        label_ids = []
+        top1_probabilities = []
+        for chunk_label_ids, chunk_probabilities in self.iter_evaluate_batch(messages, batch_size, max_length):
+            label_ids.append(chunk_label_ids)
+            top1_probabilities.append(chunk_probabilities)
+
+        label_ids = np.concatenate(label_ids) if len(label_ids) > 0 else np.empty(0, dtype=np.int16)
+        top1_probabilities = np.concatenate(top1_probabilities) if len(top1_probabilities) > 0 else np.empty(0, dtype=np.float32)
+        print(f"evaluated {len(label_ids)} messages")
+        if self.prediction_cache is not None:
+            print(f"prediction cache: {self.prediction_cache.get_stats()}")
+        return pd.DataFrame({
+            'label': pd.Categorical.from_codes(label_ids, categories=self.labels),
+            'probability': top1_probabilities
+        }, index=index)
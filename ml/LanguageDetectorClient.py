@@ -0,0 +1,108 @@
+import json
+import socket
+import threading
+
+import numpy as np
+
+from ml.InferenceServer import FRAME_PREFIX, encode_message, parse_address
+from ml.LanguageDetectorBase import LanguageDetectorBase
+from service.Telemetry import Telemetry
+
+
+class LanguageDetectorClient(LanguageDetectorBase):
+    # the API of LanguageDetector, the predictions are made by the inference server. A request takes a connection of the
+    # pool, so requests of concurrent sessions reach the server at the same time and are batched together. Streamlit runs
+    # every rerun in a new thread, connections are therefore returned to the pool instead of being bound to a thread.
+    # An idle connection makes the server wait up to its max. wait for another request, so only a few are kept
+
+    def __init__(self, address, timeout=60, max_idle_connections=4):
+        self.address = address
+        self.timeout = timeout
+        self.max_idle_connections = max_idle_connections
+        self._idle_connections = []
+        self._lock = threading.Lock()
+        try:
+            info = self.request({'op': 'info'})[0]
+            # an idle connection makes the server wait for its request before a batch is run
+            self.close()
+        except OSError as e:
+            raise ConnectionError(f"language detector server at {address} is not reachable, start it with "
+                                  f"'python -m ml.InferenceServer --address {address}': {e}") from e
+        print(f"init Language Detector Client ({address}, {info['mode']})")
+        self.labels = info['labels']
+        self.model_revision = info['model_revision']
+        self.mode = info['mode']
+        self.max_length = info['max_length']
+        self.model_max_length = info['model_max_length']
+
+    def connect(self):
+        family, target = parse_address(self.address)
+        if family == 'unix':
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection.settimeout(self.timeout)
+        connection.connect(target)
+        return connection
+
+    def acquire(self):
+        with self._lock:
+            if self._idle_connections:
+                return self._idle_connections.pop()
+        return self.connect()
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle_connections) < self.max_idle_connections:
+                self._idle_connections.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            connections, self._idle_connections = self._idle_connections, []
+        for connection in connections:
+            connection.close()
+
+    def get_idle_connections(self):
+        with self._lock:
+            return len(self._idle_connections)
+
+    def receive_exactly(self, connection, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = connection.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError(f"language detector server at {self.address} closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def request(self, header):
+        connection = self.acquire()
+        try:
+            connection.sendall(encode_message(header))
+            header_size, payload_size = FRAME_PREFIX.unpack(self.receive_exactly(connection, FRAME_PREFIX.size))
+            response = self.receive_exactly(connection, header_size)
+            payload = self.receive_exactly(connection, payload_size) if payload_size > 0 else b''
+        except OSError:
+            # a restarted server needs a new connection, the broken one is not returned to the pool
+            connection.close()
+            raise
+        self.release(connection)
+
+        response = json.loads(response)
+        if 'error' in response:
+            raise RuntimeError(f"language detector server: {response['error']}")
+        return response, payload
+
+    @Telemetry.timed()
+    def predict_probabilities(self, texts, batch_size=None, max_length=None):
+        # the server decides about the batch size, it batches the texts of all clients
+        response, payload = self.request({'op': 'predict', 'texts': list(texts), 'max_length': max_length})
+        return np.frombuffer(payload, dtype=np.float32).reshape(response['shape'])
+
+    def get_server_stats(self):
+        return self.request({'op': 'stats'})[0]
@@ -0,0 +1,35 @@
+import os
+import threading
+
+
+class LanguageDetectorProvider:
+    # one model per process, shared by all sessions. With LANGUAGE_DETECTOR_SERVER set, the processes share the model
+    # of the inference server instead
+    _language_detector = None
+    _lock = threading.Lock()
+    _warm_up_thread = None
+
+    @staticmethod
+    def get():
+        with LanguageDetectorProvider._lock:
+            if LanguageDetectorProvider._language_detector is None and 'LANGUAGE_DETECTOR_SERVER' in os.environ:
+                from ml.LanguageDetectorClient import LanguageDetectorClient
+                LanguageDetectorProvider._language_detector = LanguageDetectorClient(os.environ['LANGUAGE_DETECTOR_SERVER'])
+            if LanguageDetectorProvider._language_detector is None:
+                # torch and transformers are imported when the first prediction is needed, not at startup
+                from ml.LanguageDetector import LanguageDetector
+                from ml.PredictionCache import PredictionCache
+                LanguageDetectorProvider._language_detector = LanguageDetector(prediction_cache=PredictionCache())
+            return LanguageDetectorProvider._language_detector
+
+    @staticmethod
+    def is_loaded():
+        return LanguageDetectorProvider._language_detector is not None
+
+    @staticmethod
+    def warm_up():
+        with LanguageDetectorProvider._lock:
+            if LanguageDetectorProvider._warm_up_thread is None and LanguageDetectorProvider._language_detector is None:
+                LanguageDetectorProvider._warm_up_thread = threading.Thread(target=LanguageDetectorProvider.get,
+                                                                            name="language-detector-warm-up", daemon=True)
+                LanguageDetectorProvider._warm_up_thread.start()
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# sqlite allows at most 999 variables per statement in older versions
+SQLITE_CHUNK_SIZE = 900
+
+
+class PredictionCache:
+
+    def __init__(self, db_path=None, max_entries=None):
+        if db_path is None:
+            db_path = os.environ.get('LANGUAGE_CACHE_PATH', Path(os.getcwd()).joinpath('cache', 'language_predictions.sqlite'))
+        if max_entries is None:
+            max_entries = int(os.environ.get('LANGUAGE_CACHE_MAX_ENTRIES', 1000000))
+        print(f"init PredictionCache {db_path}")
+
+        os.makedirs(Path(db_path).parent, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, probabilities BLOB NOT NULL, last_used INTEGER NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.split())
+
+    @staticmethod
+    def create_key(text, model_revision):
+        return hashlib.sha1(f"{model_revision}\0{PredictionCache.normalize(text)}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        now = time.time_ns()
+        with self._lock, self._connection:
+            for start in range(0, len(keys), SQLITE_CHUNK_SIZE):
+                chunk = keys[start:start + SQLITE_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._connection.execute(f"SELECT key, probabilities FROM predictions WHERE key IN ({placeholders})", chunk)
+                for key, probabilities in rows:
+                    found[key] = np.frombuffer(probabilities, dtype=np.float32)
+                self._connection.execute(f"UPDATE predictions SET last_used = ? WHERE key IN ({placeholders})", [now, *chunk])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, predictions):
+        now = time.time_ns()
+        rows = [(key, np.asarray(probabilities, dtype=np.float32).tobytes(), now) for key, probabilities in predictions.items()]
+        with self._lock, self._connection:
+            # a key that is already stored was put by a concurrent miss of the same text, with the same probabilities.
+            # Only the inserted rows are counted
+            changes_before = self._connection.total_changes
+            self._connection.executemany("INSERT OR IGNORE INTO predictions (key, probabilities, last_used) VALUES (?, ?, ?)", rows)
+            self._entries += self._connection.total_changes - changes_before
+            if self._entries > self.max_entries:
+                # evict the least recently used entries, keep some headroom to not evict on every insert
+                evict_count = self._entries - int(self.max_entries * 0.9)
+                self._connection.execute("DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)", (evict_count,))
+                self._entries = self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def add_deduplicated(self, count):
+        with self._lock:
+            self.deduplicated += count
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'deduplicated': self.deduplicated,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+            }
@@ -0,0 +1,162 @@
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from service.ChatStore import ChatStore
+
+# [2022-01-31 18:04:11] #channel user: text, the time may contain fractions and be separated by a T
+CHAT_LINE_PATTERN = re.compile(r'\[(\d{4}-\d{2}-\d{2})[ T]([0-9:.]+)\] #(\S+) (\S+?): (.*)')
+DEFAULT_BOTS = ['nightbot', 'streamelements', 'streamlabs', 'moobot', 'fossabot', 'wizebot', 'soundalerts', 'sery_bot',
+                'commanderroot', 'anotherttvviewer', 'lurxx', 'stay_hydrated_bot']
+MATCH_MARGIN = pd.Timedelta(seconds=60)
+
+
+class ChatLogIngestor:
+
+    def __init__(self, data_service, bots=None, chunk_bytes=4 * 1024 * 1024):
+        self.data_service = data_service
+        self.chat_store = ChatStore(data_service)
+        self.bots = {bot.lower() for bot in (bots if bots is not None else DEFAULT_BOTS)}
+        self.chunk_bytes = chunk_bytes
+
+    @staticmethod
+    def to_naive_utc(dates):
+        # the chat logs have no time zone
+        dates = pd.to_datetime(dates)
+        return dates.dt.tz_convert(None) if dates.dt.tz is not None else dates
+
+    @staticmethod
+    def create_match_windows(history):
+        # same boundaries as the exporter notebook: 60s before the start until 60s after the end of a match
+        start_dates = ChatLogIngestor.to_naive_utc(history['start_date'])
+        end_dates = ChatLogIngestor.to_naive_utc(history['end_date'])
+        windows = pd.DataFrame({'matchId': history['matchId'].to_numpy()})
+        windows['start'] = start_dates.dt.round('1s').to_numpy()
+        windows['end'] = (end_dates + pd.Timedelta(seconds=1)).dt.round('1s').to_numpy()
+        windows['pre_start'] = windows['start'] - MATCH_MARGIN
+        windows['post_end'] = windows['end'] + MATCH_MARGIN
+        return windows.sort_values('pre_start', kind='mergesort').reset_index(drop=True)
+
+    @staticmethod
+    def get_log_files(log_dir, windows):
+        # logs are written per day, only the days of a match are read
+        patterns = set(windows['start'].dt.strftime("%y_%m_%d.log")) | set(windows['end'].dt.strftime("%y_%m_%d.log"))
+        return sorted(Path(log_dir).joinpath(file) for file in os.listdir(log_dir) if any(pattern in file for pattern in patterns))
+
+    def iter_line_chunks(self, log_files):
+        for log_file in log_files:
+            with open(log_file, 'r', encoding='utf-8', errors='replace') as log:
+                while True:
+                    lines = log.readlines(self.chunk_bytes)
+                    if not lines:
+                        break
+                    yield lines
+
+    @staticmethod
+    def parse_lines(lines):
+        rows = [match.groups() for match in map(CHAT_LINE_PATTERN.match, lines) if match is not None]
+        if len(rows) == 0:
+            return None
+        dates, times, channels, authors, texts = zip(*rows)
+        chunk_df = pd.DataFrame({
+            'datetime': pd.to_datetime(pd.Series(dates) + ' ' + pd.Series(times)),
+            'channel': pd.Series(channels).str.lower(),
+            'author_name': pd.Series(authors).str.lower(),
+            'text': pd.Series(texts).str.strip().str.lower()
+        })
+        return chunk_df.sort_values('datetime', kind='mergesort').reset_index(drop=True)
+
+    def add_features(self, chunk_df, player_name):
+        texts = chunk_df['text']
+        chunk_df['chatbot'] = chunk_df['author_name'].isin(self.bots)
+        chunk_df['personal_msg'] = texts.str.startswith('@') & ~texts.str.startswith(f'@{player_name}') & texts.str.contains(' ', regex=False)
+        chunk_df['command'] = texts.str.startswith('!')
+        return chunk_df
+
+    @staticmethod
+    def assign_matches(chunk_df, windows):
+        # sorted messages against sorted windows: the latest window that started before a message owns it,
+        # so the pre match margin of a match wins over the post match margin of the previous one
+        nanos = chunk_df['datetime'].to_numpy().view(np.int64)
+        window_idx = np.searchsorted(windows['pre_start'].to_numpy().view(np.int64), nanos, side='right') - 1
+        in_window = window_idx >= 0
+        in_window[in_window] = nanos[in_window] < windows['post_end'].to_numpy().view(np.int64)[window_idx[in_window]]
+
+        chunk_df = chunk_df[in_window].copy()
+        window_idx = window_idx[in_window]
+        nanos = nanos[in_window]
+        chunk_df['matchId'] = windows['matchId'].to_numpy()[window_idx]
+        chunk_df['timecategory'] = np.where(nanos < windows['start'].to_numpy().view(np.int64)[window_idx], 'BEFORE_MATCH',
+                                            np.where(nanos < windows['end'].to_numpy().view(np.int64)[window_idx], 'DURING_MATCH', 'AFTER_MATCH'))
+        return chunk_df, window_idx
+
+    def flush_match(self, player_name, match_id, parts):
+        match_chat = pd.concat(parts, ignore_index=True) if len(parts) > 0 else ChatStore.create_empty_chat_df()
+        self.chat_store.write_partition(ChatStore.to_typed_chat_df(match_chat), player_name, match_id)
+
+    def ingest(self, player_name, log_dir):
+        windows = self.create_match_windows(self.data_service.get_df_match_history_of_streamer(player_name))
+        post_ends = windows['post_end'].to_numpy().view(np.int64)
+        pending = {}
+        next_flush = 0
+        lines_read = 0
+        messages = 0
+        late_messages = 0
+        start = time.perf_counter()
+
+        for lines in self.iter_line_chunks(self.get_log_files(log_dir, windows)):
+            lines_read += len(lines)
+            chunk_df = self.parse_lines(lines)
+            if chunk_df is None:
+                continue
+            last_nanos = chunk_df['datetime'].iloc[-1].value
+            chunk_df, window_idx = self.assign_matches(chunk_df, windows)
+
+            # messages of already written matches are out of order across log files
+            late = window_idx < next_flush
+            late_messages += int(late.sum())
+            chunk_df = self.add_features(chunk_df[~late], player_name)
+            messages += len(chunk_df)
+            for match_id, match_chat in chunk_df.groupby('matchId', sort=False):
+                pending.setdefault(match_id, []).append(match_chat)
+
+            # windows the sweep has passed are complete, write them and free their memory
+            while next_flush < len(windows) and post_ends[next_flush] <= last_nanos:
+                match_id = windows['matchId'].iloc[next_flush]
+                self.flush_match(player_name, match_id, pending.pop(match_id, []))
+                next_flush += 1
+
+            elapsed = time.perf_counter() - start
+            print(f"{player_name}: {lines_read} lines, {messages} messages, {lines_read / max(elapsed, 1e-9):.0f} lines/sec")
+
+        # matches without chat get an empty partition, like in ChatStore.build
+        for match_id in windows['matchId'].iloc[next_flush:]:
+            self.flush_match(player_name, match_id, pending.pop(match_id, []))
+
+        elapsed = time.perf_counter() - start
+        stats = {'lines': lines_read, 'messages': messages, 'late_messages': late_messages, 'matches': len(windows),
+                 'seconds': elapsed, 'lines_per_sec': lines_read / max(elapsed, 1e-9)}
+        print(f"ingested chat of {player_name}: {stats}")
+        return stats
+
+
+if __name__ == '__main__':
+    from service.DataService import DataService
+
+    parser = argparse.ArgumentParser(description="Ingests raw twitch chat logs into the chat store of a streamer")
+    parser.add_argument('streamer')
+    parser.add_argument('log_dir', help="directory with the daily log files (*yy_mm_dd.log) of the streamer's channel")
+    parser.add_argument('--bots-file', help="file with one bot name per line, replaces the default bot list")
+    parser.add_argument('--chunk-mb', type=int, default=4)
+    args = parser.parse_args()
+
+    bots = None
+    if args.bots_file is not None:
+        with open(args.bots_file) as bots_file:
+            bots = [line.strip() for line in bots_file if line.strip()]
+    ChatLogIngestor(DataService(), bots, args.chunk_mb * 1024 * 1024).ingest(args.streamer, args.log_dir)
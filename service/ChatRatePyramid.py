@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+TIMECATEGORIES = ['BEFORE_MATCH', 'DURING_MATCH', 'AFTER_MATCH']
+LEVELS = [1, 5, 15, 60, 300]
+NANOS_PER_SECOND = 1000000000
+
+
+class ChatRatePyramid:
+
+    def __init__(self, origin, counts_by_level, timecategories_by_level):
+        # origin: epoch second of the first 1s bin, every level is aligned to multiples of its bin width
+        self.origin = origin
+        self.counts_by_level = counts_by_level
+        self.timecategories_by_level = timecategories_by_level
+
+    @staticmethod
+    def get_visible_mask(chat_df):
+        return ~(chat_df['chatbot'].to_numpy(dtype=bool) | chat_df['personal_msg'].to_numpy(dtype=bool) | chat_df['command'].to_numpy(dtype=bool))
+
+    @staticmethod
+    def fill_missing_codes(codes):
+        # forward fill, then backward fill the leading gap; -1 marks a missing code
+        positions = np.arange(len(codes))
+        forward = np.maximum.accumulate(np.where(codes >= 0, positions, 0))
+        codes = codes[forward]
+        backward = np.minimum.accumulate(np.where(codes >= 0, positions, len(codes) - 1)[::-1])[::-1]
+        return codes[backward]
+
+    @staticmethod
+    def from_chat(chat_df, levels=LEVELS):
+        nanos = chat_df.index.values.astype('datetime64[ns]').view(np.int64)
+        visible_seconds = nanos[ChatRatePyramid.get_visible_mask(chat_df)] // NANOS_PER_SECOND
+        if len(visible_seconds) == 0:
+            return ChatRatePyramid(0, {level: np.zeros(0, dtype=np.int32) for level in levels},
+                                   {level: np.zeros(0, dtype=np.int8) for level in levels})
+
+        origin = int(visible_seconds.min())
+        counts = np.bincount(visible_seconds - origin).astype(np.int32)
+
+        # time category of a second comes from the first message (bots included) that ends in that second
+        codes = pd.Categorical(chat_df['timecategory'], categories=TIMECATEGORIES).codes.astype(np.int8)
+        ceil_positions = -((-nanos) // NANOS_PER_SECOND) - origin
+        in_range = (ceil_positions >= 0) & (ceil_positions < len(counts))
+        unique_positions, first_idx = np.unique(ceil_positions[in_range], return_index=True)
+        timecategories = np.full(len(counts), -1, dtype=np.int8)
+        timecategories[unique_positions] = codes[in_range][first_idx]
+        timecategories = ChatRatePyramid.fill_missing_codes(timecategories)
+
+        counts_by_level = {}
+        timecategories_by_level = {}
+        for level in levels:
+            # pad the front, so bins start at multiples of the level
+            offset = origin % level
+            padded_counts = np.concatenate([np.zeros(offset, dtype=np.int32), counts])
+            padded_timecategories = np.concatenate([np.full(offset, timecategories[0], dtype=np.int8), timecategories])
+            bin_starts = np.arange(0, len(padded_counts), level)
+            counts_by_level[level] = np.add.reduceat(padded_counts, bin_starts).astype(np.int32)
+            timecategories_by_level[level] = padded_timecategories[bin_starts]
+        return ChatRatePyramid(origin, counts_by_level, timecategories_by_level)
+
+    def get_levels(self):
+        return sorted(self.counts_by_level)
+
+    def choose_level(self, start_second, end_second, pixel_width):
+        # the finest level that does not draw more bins than pixels
+        window = max(end_second - start_second, 1)
+        for level in self.get_levels():
+            if window / level <= pixel_width:
+                return level
+        return self.get_levels()[-1]
+
+    def to_df(self, level, start_bin=0, end_bin=None):
+        counts = self.counts_by_level[level][start_bin:end_bin]
+        timecategories = self.timecategories_by_level[level][start_bin:end_bin]
+        first_second = (self.origin // level + start_bin) * level
+        index = pd.DatetimeIndex((first_second + np.arange(len(counts), dtype=np.int64) * level) * NANOS_PER_SECOND, name='datetime')
+        return pd.DataFrame({
+            'count_messages': counts.astype(np.int64),
+            'timecategory': pd.Categorical.from_codes(timecategories, categories=TIMECATEGORIES).astype(object)
+        }, index=index)
+
+    def query(self, start, end, pixel_width=1000):
+        start_second = pd.Timestamp(start).value // NANOS_PER_SECOND
+        end_second = pd.Timestamp(end).value // NANOS_PER_SECOND
+        level = self.choose_level(start_second, end_second, pixel_width)
+        first_bin = self.origin // level
+        start_bin = max(start_second // level - first_bin, 0)
+        end_bin = max(end_second // level - first_bin + 1, 0)
+        return self.to_df(level, start_bin, end_bin)
+
+    def get_window_rates(self, start_seconds, stop_seconds):
+        # mean messages per second in [start, stop) of every window, seconds without chat count as 0
+        counts = self.counts_by_level[1]
+        cumulative = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        start_positions = np.clip(np.asarray(start_seconds) - self.origin, 0, len(counts))
+        stop_positions = np.clip(np.asarray(stop_seconds) - self.origin, 0, len(counts))
+        window_lengths = np.maximum(np.asarray(stop_seconds) - np.asarray(start_seconds), 1)
+        return (cumulative[stop_positions] - cumulative[start_positions]) / window_lengths
+
+    def to_messages_per_sec_df(self):
+        return self.to_df(1)
+
+    def get_memory_usage(self):
+        return sum(arr.nbytes for arr in self.counts_by_level.values()) + sum(arr.nbytes for arr in self.timecategories_by_level.values())
@@ -0,0 +1,75 @@
+import sys
+
+import pandas as pd
+
+
+class ChatStore:
+    categorical_columns = ['channel', 'author_name', 'matchId', 'timecategory']
+    flag_columns = ['chatbot', 'personal_msg', 'command']
+
+    def __init__(self, data_service):
+        self.data_service = data_service
+
+    @staticmethod
+    def get_partition_file(match_id):
+        return f"match_chat_{match_id}"
+
+    @staticmethod
+    def create_empty_chat_df():
+        chat_df = pd.DataFrame({col: pd.Series(dtype=object) for col in ['datetime', 'channel', 'author_name', 'text', 'matchId', 'timecategory']})
+        chat_df['datetime'] = pd.to_datetime(chat_df['datetime'])
+        for col in ChatStore.flag_columns:
+            chat_df[col] = pd.Series(dtype=bool)
+        return chat_df
+
+    @staticmethod
+    def to_typed_chat_df(chat_df):
+        typed_df = chat_df.set_index(pd.DatetimeIndex(chat_df['datetime']))
+        typed_df = typed_df.drop(columns=['datetime'])
+        for col in ChatStore.categorical_columns:
+            if col in typed_df.columns:
+                typed_df[col] = typed_df[col].astype('category')
+        for col in ChatStore.flag_columns:
+            if col in typed_df.columns:
+                typed_df[col] = typed_df[col].astype(bool)
+        return typed_df.sort_index(kind='mergesort')
+
+    @staticmethod
+    def create_partition(typed_chat_df):
+        partition = typed_chat_df.copy()
+        for col in ChatStore.categorical_columns:
+            if col in partition.columns:
+                partition[col] = partition[col].cat.remove_unused_categories()
+        return partition
+
+    def has_partition(self, player_name, match_id):
+        return self.data_service.exists_prepared_file(player_name, self.get_partition_file(match_id))
+
+    def read_partition(self, player_name, match_id):
+        return self.data_service.read_prepared_file(player_name, self.get_partition_file(match_id))
+
+    def write_partition(self, typed_chat_df, player_name, match_id):
+        partition = self.create_partition(typed_chat_df)
+        self.data_service.write_prepared_file(partition, player_name, self.get_partition_file(match_id))
+
+    def build(self, player_name):
+        chat_df = self.to_typed_chat_df(self.data_service.read_prepared_df_file(player_name, 'chat_df'))
+        match_ids = self.data_service.get_df_match_history_of_streamer(player_name)['matchId']
+
+        chats_by_match = {match_id: df for match_id, df in chat_df.groupby('matchId', observed=True, sort=False)}
+        for match_id in match_ids:
+            # matches without chat get an empty partition, so lookups never fall back to chat_df
+            self.write_partition(chats_by_match.get(match_id, chat_df.iloc[0:0]), player_name, match_id)
+        print(f"built chat store of {player_name} with {len(match_ids)} partitions")
+
+
+if __name__ == '__main__':
+    from service.DataService import DataService
+
+    data_service = DataService()
+    chat_store = ChatStore(data_service)
+    for streamer in sys.argv[1:] or data_service.get_available_streamers():
+        if data_service.exists_prepared_file(streamer, 'chat_df'):
+            chat_store.build(streamer)
+        else:
+            print(f"no chat_df found for {streamer}")
@@ -1,4 +1,5 @@
-import numpy as np
+from service.ChatRatePyramid import ChatRatePyramid
+from service.Telemetry import Telemetry
 
 class ChatTransformerUtil:
 
@@ -6,19 +7,9 @@ class ChatTransformerUtil:
         print("init ChatTransformerUtil")
 
     @staticmethod
+    @Telemetry.timed()
     def create_resampled_messages_per_sec_df(df_session_chat_messages, sample_rate=1):
-        mask = (df_session_chat_messages['chatbot'] == False) & (df_session_chat_messages['personal_msg'] == False) & (df_session_chat_messages['command'] == False)
-        sample_rate = f"{sample_rate}S"
-
-        print(df_session_chat_messages.index.min())
-        messages_per_sec = df_session_chat_messages.loc[(mask)].resample(sample_rate).size()
-        timecategories_df = df_session_chat_messages['timecategory'].loc[~df_session_chat_messages.index.duplicated(keep = 'first')]
-        timecategories_df.index = timecategories_df.index.ceil('S')
-        messages_per_sec = messages_per_sec.to_frame().join(timecategories_df)
-        messages_per_sec.columns = ['count_messages', 'timecategory']
-        messages_per_sec['timecategory'] = messages_per_sec['timecategory'].fillna(method="ffill")
-        messages_per_sec['timecategory'] = messages_per_sec['timecategory'].fillna(method="bfill")
-        return messages_per_sec[~messages_per_sec.index.duplicated(keep = 'first')]
+        return ChatRatePyramid.from_chat(df_session_chat_messages, levels=[sample_rate]).to_df(sample_rate)
 
     @staticmethod
     def get_timecategory_counts(chat_df):
@@ -36,5 +27,10 @@ class ChatTransformerUtil:
 
     @staticmethod
     def nearest_idx(items, pivot):
-        time_diff = np.abs(items - pivot)
-        return time_diff.argmin(0)
+        # items are sorted, on a tie the first item wins like with argmin
+        pos = items.searchsorted(pivot)
+        if pos == 0:
+            return 0
+        if pos == len(items):
+            return len(items) - 1
+        return pos - 1 if pivot - items[pos - 1] <= items[pos] - pivot else pos
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from service.ChatRatePyramid import ChatRatePyramid
+
+
+class ChatWindowIndex:
+
+    def __init__(self, chat_df):
+        # the chat has to be sorted by its DatetimeIndex
+        self.chat_df = chat_df
+        self.visible_positions = np.flatnonzero(ChatRatePyramid.get_visible_mask(chat_df))
+        self.visible_nanos = chat_df.index.values.astype('datetime64[ns]').view(np.int64)[self.visible_positions]
+
+    @staticmethod
+    def to_nanos(timestamps):
+        return np.asarray(pd.DatetimeIndex(timestamps).values.astype('datetime64[ns]').view(np.int64))
+
+    def get_bounds(self, start, end):
+        # [start, end) as positions into the visible messages
+        start_pos, end_pos = np.searchsorted(self.visible_nanos, self.to_nanos([start, end]), side='left')
+        return int(start_pos), int(end_pos)
+
+    def get_window(self, start, end):
+        start_pos, end_pos = self.get_bounds(start, end)
+        return self.chat_df.iloc[self.visible_positions[start_pos:end_pos]]
+
+    def get_windows(self, centers, before, after):
+        # all windows in one array: rows of window i are positions[offsets[i]:offsets[i + 1]]
+        center_nanos = self.to_nanos(centers)
+        starts = np.searchsorted(self.visible_nanos, center_nanos - pd.Timedelta(before).value, side='left')
+        ends = np.searchsorted(self.visible_nanos, center_nanos + pd.Timedelta(after).value, side='left')
+        counts = ends - starts
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        positions = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        return offsets, self.visible_positions[positions]
+
+    def get_memory_usage(self):
+        return self.visible_positions.nbytes + self.visible_nanos.nbytes
@@ -0,0 +1,154 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from service.ParticipantFrames import ParticipantFrames
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+
+TABLES = ['timeline_events', 'timeline_participants', 'participant_summaries', 'participant_frames']
+
+
+def compile_match(player_name, match_id):
+    # runs in a worker process of the build, so it creates its own DataService
+    from service.DataService import DataService
+
+    data_service = DataService()
+    timeline_dict = data_service.get_match_timeline_dict(player_name, match_id)
+    summary_array = data_service.get_raw_match_summary_array(player_name, match_id)
+    return CompiledStore.create_match_tables(match_id, timeline_dict, summary_array)
+
+
+class CompiledStore:
+    match_index_file = 'compiled_match_index'
+
+    def __init__(self, data_service, matches_per_group=10):
+        self.data_service = data_service
+        self.matches_per_group = matches_per_group
+
+    @staticmethod
+    def get_table_file(table, group):
+        return f"compiled_{table}_{group}"
+
+    @staticmethod
+    def create_match_tables(match_id, timeline_dict, summary_array):
+        events_df = TimelineTransformerUtil.flatten_timeline_events(timeline_dict)
+        events_df['type'] = events_df['type'].astype('category')
+        participants_df = pd.DataFrame(timeline_dict['info']['participants'])
+        summaries_df = pd.DataFrame(summary_array)
+        frames_df = ParticipantFrames.from_timeline(timeline_dict).to_df()
+        for df in [events_df, participants_df, summaries_df, frames_df]:
+            df.insert(0, 'matchId', match_id)
+        return {'timeline_events': events_df, 'timeline_participants': participants_df, 'participant_summaries': summaries_df,
+                'participant_frames': frames_df}
+
+    @staticmethod
+    def concat_tables(tables):
+        # columns missing in some matches would upcast ints to float, keep them as objects instead
+        common_columns = set.intersection(*[set(table.columns) for table in tables])
+        tables = [table.astype({col: object for col in table.columns if col not in common_columns}) for table in tables]
+        combined = pd.concat(tables, ignore_index=True)
+        if 'type' in combined.columns:
+            combined['type'] = combined['type'].astype('category')
+        return combined
+
+    def is_compiled(self, player_name):
+        return self.data_service.exists_prepared_file(player_name, self.match_index_file)
+
+    def read_match_index(self, player_name):
+        return self.data_service.read_prepared_file(player_name, self.match_index_file)
+
+    def contains(self, player_name, match_id):
+        return self.is_compiled(player_name) and match_id in self.read_match_index(player_name).index
+
+    def read_match_rows(self, player_name, match_id, table):
+        # only the group of the match is decrypted and sliced (predicate pushdown on matchId)
+        entry = self.read_match_index(player_name).loc[match_id]
+        table_df = self.data_service.read_prepared_file(player_name, self.get_table_file(table, entry['group']))
+        rows = table_df.iloc[entry[f'{table}_start']:entry[f'{table}_stop']]
+        return rows[entry[f'{table}_columns']].reset_index(drop=True)
+
+    def read_timeline_events(self, player_name, match_id):
+        participants = self.read_match_rows(player_name, match_id, 'timeline_participants').to_dict('records')
+        events_df = self.read_match_rows(player_name, match_id, 'timeline_events')
+        return participants, events_df
+
+    def read_match_summary_array(self, player_name, match_id):
+        return self.read_match_rows(player_name, match_id, 'participant_summaries').to_dict('records')
+
+    def has_table(self, player_name, table):
+        # stores compiled before a table was added do not have it
+        return f'{table}_start' in self.read_match_index(player_name).columns
+
+    def read_participant_frames(self, player_name, match_id, start_millis):
+        return ParticipantFrames.from_df(self.read_match_rows(player_name, match_id, 'participant_frames'), start_millis)
+
+    def build(self, player_name, workers=None):
+        history = self.data_service.get_df_match_history_of_streamer(player_name)
+        match_ids = list(history['matchId'])
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            match_tables = list(pool.map(compile_match, [player_name] * len(match_ids), match_ids))
+
+        index_rows = []
+        for group, start in enumerate(range(0, len(match_ids), self.matches_per_group)):
+            group_tables = match_tables[start:start + self.matches_per_group]
+            offsets = {table: 0 for table in TABLES}
+            for match_id, tables in zip(match_ids[start:start + self.matches_per_group], group_tables):
+                index_row = {'matchId': match_id, 'group': group}
+                for table in TABLES:
+                    # without the matchId column, which is implied by the index
+                    index_row[f'{table}_columns'] = list(tables[table].columns[1:])
+                    index_row[f'{table}_start'] = offsets[table]
+                    offsets[table] += len(tables[table])
+                    index_row[f'{table}_stop'] = offsets[table]
+                index_rows.append(index_row)
+
+            for table in TABLES:
+                table_df = self.concat_tables([tables[table] for tables in group_tables])
+                self.data_service.write_prepared_file(table_df, player_name, self.get_table_file(table, group))
+
+        match_index = pd.DataFrame(index_rows).set_index('matchId')
+        match_index = match_index.join(history.set_index('matchId')[['start_date', 'end_date']])
+        # the index is written last, a store without index is never read
+        self.data_service.write_prepared_file(match_index, player_name, self.match_index_file)
+        print(f"compiled {len(match_ids)} matches of {player_name} into {len(match_index['group'].unique())} groups")
+
+    def verify(self, player_name):
+        mismatches = []
+        for match_id in self.read_match_index(player_name).index:
+            timeline_dict = self.data_service.get_match_timeline_dict(player_name, match_id)
+            summary_array = self.data_service.get_raw_match_summary_array(player_name, match_id)
+            participants, events_df = self.read_timeline_events(player_name, match_id)
+
+            expected_events_df = TimelineTransformerUtil.flatten_timeline_events(timeline_dict)
+            events_df = events_df.astype({'type': object})
+            frames_match = not self.has_table(player_name, 'participant_frames') or np.array_equal(
+                self.read_participant_frames(player_name, match_id, 0).values, ParticipantFrames.from_timeline(timeline_dict).values)
+            if participants != timeline_dict['info']['participants'] \
+                    or not events_df.equals(expected_events_df) \
+                    or self.read_match_summary_array(player_name, match_id) != summary_array \
+                    or not frames_match:
+                mismatches.append(match_id)
+
+        print(f"verified compiled store of {player_name}: {len(mismatches)} mismatching matches {mismatches}")
+        return mismatches
+
+
+if __name__ == '__main__':
+    from service.DataService import DataService
+
+    parser = argparse.ArgumentParser(description="compiles the match files of streamers into a few columnar tables")
+    parser.add_argument('command', choices=['build', 'verify'])
+    parser.add_argument('streamers', nargs='*')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    data_service = DataService()
+    compiled_store = CompiledStore(data_service)
+    for streamer in args.streamers or data_service.get_available_streamers():
+        if args.command == 'build':
+            compiled_store.build(streamer, args.workers)
+        else:
+            compiled_store.verify(streamer)
@@ -0,0 +1,254 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# manifests written into the streamer folders by older versions, they are not data files
+CATALOG_FILE = 'catalog'
+# name of the global manifest, the one of dsc_data with the streamer folders
+GLOBAL_CATALOG = ''
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+class DataCatalog:
+    # manifests of the streamers, shared by all sessions. A folder is listed again when its mtime changed,
+    # but at most once per DSC_CATALOG_TTL seconds, and right away after a write of this process
+    ttl_seconds = float(os.environ.get('DSC_CATALOG_TTL', 5))
+    _states = {}
+    _lock = threading.RLock()
+
+    def __init__(self, data_service):
+        self.data_service = data_service
+
+    @staticmethod
+    def mark_changed(player_name):
+        with DataCatalog._lock:
+            for name in [player_name, GLOBAL_CATALOG]:
+                if name in DataCatalog._states:
+                    DataCatalog._states[name]['dir_mtime_ns'] = None
+
+    @staticmethod
+    def get_checksum(path):
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as src:
+            for chunk in iter(lambda: src.read(CHECKSUM_CHUNK_SIZE), b''):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    @staticmethod
+    def get_manifest_version(files):
+        version = hashlib.sha256()
+        for file in sorted(files):
+            version.update(f"{file}:{files[file]['checksum']}".encode())
+        return version.hexdigest()[:16]
+
+    @staticmethod
+    def index_match_files(files, match_ids):
+        # match ids contain underscores, so every suffix after an underscore is a candidate
+        match_files = {match_id: [] for match_id in match_ids}
+        for file in files:
+            positions = [idx for idx, char in enumerate(file) if char == '_']
+            for idx in positions:
+                if file[idx + 1:] in match_files:
+                    match_files[file[idx + 1:]].append(file)
+                    break
+        return match_files
+
+    def get_folder(self, player_name):
+        if player_name == GLOBAL_CATALOG:
+            return self.data_service.get_dsc_data_file_path()
+        return self.data_service.get_player_file_path(player_name)
+
+    @staticmethod
+    def get_manifest_path(player_name):
+        # the manifests are kept out of dsc_data, next to the other caches of the app
+        catalog_path = Path(os.environ.get('DSC_CATALOG_PATH', Path(os.getcwd()).joinpath('cache', 'catalog')))
+        if player_name == GLOBAL_CATALOG:
+            return catalog_path.joinpath('dsc_data.pkl.aes')
+        return catalog_path.joinpath(f'streamer_{player_name}.pkl.aes')
+
+    def read_stored_manifest(self, player_name):
+        # not read through the data cache, the versions of the cache keys come from the manifest itself
+        aes_file = self.get_manifest_path(player_name)
+        if not os.path.exists(aes_file):
+            return None
+        try:
+            return pickle.loads(self.data_service.decrypt_path(aes_file, CATALOG_FILE))
+        except Exception as e:
+            print(f'could not read the catalog of {player_name or "dsc_data"}: {e}')
+            return None
+
+    def write_manifest(self, player_name, manifest):
+        aes_file = self.get_manifest_path(player_name)
+        try:
+            os.makedirs(aes_file.parent, exist_ok=True)
+            self.data_service.write_encrypted_path(manifest, aes_file)
+        except Exception as e:
+            # without a stored manifest the catalog is kept in memory and built again on the next start
+            print(f'could not write the catalog of {player_name or "dsc_data"}: {e}')
+
+    def scan_files(self, player_name, previous_files):
+        folder = self.get_folder(player_name)
+        files = {}
+        changed = []
+        for filename in os.listdir(folder):
+            if not filename.endswith('.pkl.aes'):
+                continue
+            file = filename[:-len('.pkl.aes')]
+            if file == CATALOG_FILE:
+                continue
+            stat = os.stat(folder.joinpath(filename))
+            previous = previous_files.get(file)
+            if previous is not None and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+                files[file] = previous
+            else:
+                files[file] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'checksum': self.get_checksum(folder.joinpath(filename))}
+                changed.append(file)
+        return files, changed
+
+    def read_matches(self, player_name, version):
+        # the version is passed on, the manifest that would provide it is being built
+        match_summaries = self.data_service.load_file('prepared_file', player_name, 'match_summaries', pickle.loads, version)
+        start_dates = [summary['gameStartTimestamp_date'] for summary in match_summaries]
+        end_dates = self.data_service.calc_end_dates(pd.Series(start_dates), pd.Series([summary['gameDuration_ms'] for summary in match_summaries]))
+        return [{'matchId': summary['matchId'], 'start_date': start, 'end_date': end}
+                for summary, start, end in zip(match_summaries, start_dates, end_dates)]
+
+    def build_manifest(self, player_name, previous):
+        previous_files = previous['files'] if previous is not None else {}
+        files, changed = self.scan_files(player_name, previous_files)
+        if previous is not None and not changed and files.keys() == previous_files.keys():
+            return previous, False
+
+        matches = previous['matches'] if previous is not None else []
+        if 'match_summaries' not in files:
+            matches = []
+        elif 'match_summaries' in changed or previous is None:
+            matches = self.read_matches(player_name, (files['match_summaries']['mtime_ns'], files['match_summaries']['size']))
+        match_files = self.index_match_files(files, [match['matchId'] for match in matches])
+        manifest = {'player_name': player_name, 'version': self.get_manifest_version(files), 'files': files,
+                    'matches': matches, 'match_files': match_files}
+        print(f'catalog of {player_name}: {len(files)} files, {len(changed)} changed, {len(matches)} matches')
+        return manifest, True
+
+    def build_global_manifest(self, previous):
+        previous_streamers = previous['streamers'] if previous is not None else {}
+        dsc_path = self.get_folder(GLOBAL_CATALOG)
+        streamers = {}
+        for d in os.listdir(dsc_path):
+            if os.path.isdir(dsc_path.joinpath(d)):
+                streamers[d] = previous_streamers.get(d)
+        # streamers that were never cataloged are summarized when their manifest is built
+        for player_name, summary in streamers.items():
+            if summary is None:
+                streamers[player_name] = self.summarize(self.get_manifest(player_name, update_global=False))
+        manifest = {'streamers': streamers}
+        return manifest, previous is None or manifest != previous
+
+    @staticmethod
+    def summarize(manifest):
+        if manifest is None:
+            return {'matches': 0, 'files': 0, 'bytes': 0, 'first_start': None, 'last_start': None, 'version': None}
+        start_dates = [match['start_date'] for match in manifest['matches']]
+        return {'matches': len(manifest['matches']), 'files': len(manifest['files']),
+                'bytes': sum(file['size'] for file in manifest['files'].values()),
+                'first_start': min(start_dates) if start_dates else None, 'last_start': max(start_dates) if start_dates else None,
+                'version': manifest['version']}
+
+    def refresh(self, player_name, build):
+        folder = self.get_folder(player_name)
+        with DataCatalog._lock:
+            state = DataCatalog._states.get(player_name)
+            now = time.monotonic()
+            if state is not None and state['dir_mtime_ns'] is not None and now - state['checked_at'] < self.ttl_seconds:
+                return state['manifest'], False
+            try:
+                dir_mtime_ns = os.stat(folder).st_mtime_ns
+            except FileNotFoundError:
+                DataCatalog._states.pop(player_name, None)
+                return None, False
+            if state is not None and state['dir_mtime_ns'] == dir_mtime_ns:
+                state['checked_at'] = now
+                return state['manifest'], False
+
+            previous = state['manifest'] if state is not None else self.read_stored_manifest(player_name)
+            manifest, changed = build(previous)
+            if changed:
+                self.write_manifest(player_name, manifest)
+            DataCatalog._states[player_name] = {'manifest': manifest, 'dir_mtime_ns': os.stat(folder).st_mtime_ns, 'checked_at': now}
+            return manifest, changed
+
+    def get_manifest(self, player_name, update_global=True):
+        manifest, changed = self.refresh(player_name, lambda previous: self.build_manifest(player_name, previous))
+        if changed and update_global:
+            self.update_global_entry(player_name, manifest)
+        return manifest
+
+    def update_global_entry(self, player_name, manifest):
+        with DataCatalog._lock:
+            global_manifest = self.get_global_manifest()
+            if global_manifest is None or global_manifest['streamers'].get(player_name) == self.summarize(manifest):
+                return
+            global_manifest['streamers'][player_name] = self.summarize(manifest)
+            self.write_manifest(GLOBAL_CATALOG, global_manifest)
+
+    def get_global_manifest(self):
+        return self.refresh(GLOBAL_CATALOG, self.build_global_manifest)[0]
+
+    def get_streamers(self):
+        global_manifest = self.get_global_manifest()
+        return None if global_manifest is None else list(global_manifest['streamers'])
+
+    def get_streamer_summary(self, player_name):
+        return self.get_global_manifest()['streamers'].get(player_name)
+
+    def get_file_entry(self, player_name, file):
+        # None if the streamer folder does not exist, then callers fall back to the filesystem
+        manifest = self.get_manifest(player_name)
+        if manifest is None:
+            return None
+        return manifest['files'].get(file, False)
+
+    def get_data_version(self, player_name, file):
+        entry = self.get_file_entry(player_name, file)
+        return (entry['mtime_ns'], entry['size']) if entry else None
+
+    def get_version(self, player_name):
+        manifest = self.get_manifest(player_name)
+        return manifest['version'] if manifest is not None else None
+
+    def get_matches(self, player_name):
+        manifest = self.get_manifest(player_name)
+        return manifest['matches'] if manifest is not None else []
+
+    def get_match_files(self, player_name, match_id):
+        manifest = self.get_manifest(player_name)
+        return manifest['match_files'].get(match_id, []) if manifest is not None else []
+
+    @staticmethod
+    def page(items, query, offset, limit):
+        query = query.strip().lower()
+        found = [item for item in items if query in item.lower()] if query else list(items)
+        return found[offset:offset + limit], len(found)
+
+    def search_streamers(self, query='', offset=0, limit=100):
+        return self.page(self.get_streamers() or [], query, offset, limit)
+
+    def search_matches(self, player_name, query='', offset=0, limit=100):
+        return self.page([match['matchId'] for match in self.get_matches(player_name)], query, offset, limit)
+
+
+if __name__ == '__main__':
+    from service.DataService import DataService
+
+    # rebuilds the manifests, only files that changed since the last run are hashed
+    catalog = DataCatalog(DataService())
+    DataCatalog.ttl_seconds = 0
+    for streamer in sys.argv[1:] or catalog.get_streamers():
+        catalog.get_manifest(streamer)
+    print(f"catalog of dsc_data: {len(catalog.get_streamers())} streamers")
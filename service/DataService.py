@@ -1,16 +1,40 @@
+import io
 import os
 import pickle
-from datetime import timedelta
 from pathlib import Path
 import dotenv
+import numpy as np
 import pandas as pd
 import pyAesCrypt
 
+from service.ChatRatePyramid import ChatRatePyramid
+from service.ChatStore import ChatStore
+from service.ChatWindowIndex import ChatWindowIndex
+from service.CompiledStore import CompiledStore
+from service.DataCatalog import DataCatalog
+from service.LruCache import LruCache
+from service.MatchContext import MatchContext
+from service.MatchEventCube import MatchEventCube
+from service.ParticipantFrames import ParticipantFrames
+from service.StreamerMatchAggregates import StreamerMatchAggregates
+from service.Telemetry import Telemetry
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+
+AES_BUFFER_SIZE = 64 * 1024
+# unpickled dicts and lists take a multiple of their pickled size in memory
+PICKLE_EXPANSION = 4
+
 
 class DataService:
+    # shared by all instances and sessions, streamlit creates a new DataService on every rerun.
+    # parsed files and derived objects share one memory budget
+    data_cache = LruCache(int(os.environ.get('DSC_DATA_CACHE_MB', os.environ.get('DSC_DECRYPT_CACHE_MB', 512))) * 1024 * 1024)
 
-    def __init__(self):
+    def __init__(self, data_cache: LruCache = None):
         print("init dataService")
+        if data_cache is not None:
+            self.data_cache = data_cache
+        self.catalog = DataCatalog(self)
 
     def get_password(self):
         env_pw = os.environ.get('PICKLE_PW')
@@ -34,34 +58,89 @@ class DataService:
         aes_filename = f'{filename}.aes'
         return player_path.joinpath(filename), player_path.joinpath(aes_filename)
 
-    def read_prepared_file(self, player_name, file):
-        destination_file, aes_file = self.get_file_path(player_name, file)
+    def decrypt_file(self, player_name, file):
+        _, aes_file = self.get_file_path(player_name, file)
+        return self.decrypt_path(aes_file, file)
 
-        if not os.path.exists(destination_file):
-            pyAesCrypt.decryptFile(aes_file, destination_file, self.get_password())
+    def decrypt_path(self, aes_file, file):
+        with Telemetry.span('DataService.decrypt_file', file=file) as span:
+            # decrypt into memory, so plaintext never touches the filesystem
+            with open(aes_file, "rb") as src:
+                buffer = io.BytesIO()
+                pyAesCrypt.decryptStream(src, buffer, self.get_password(), AES_BUFFER_SIZE)
+                data = buffer.getvalue()
+            span.set(bytes_decrypted=len(data))
+        print(f'decrypted {aes_file}')
+        return data
 
-        with open(destination_file, "rb") as src:
-            obj = pickle.load(src)
-            print(f'read {destination_file}')
+    @staticmethod
+    def estimate_memory_usage(obj, raw_size):
+        if isinstance(obj, pd.DataFrame):
+            return int(obj.memory_usage(deep=True).sum())
+        return raw_size * PICKLE_EXPANSION
 
-        os.remove(destination_file)
+    def load_file(self, kind, player_name, file, parse, version=None):
+        # the file version is part of the key, a changed .aes file is a miss and drops the entries of older versions
+        if version is None:
+            version = self.get_data_version(player_name, file)
+        cache_key = (kind, player_name, file, version)
 
-        return obj
+        def load():
+            self.data_cache.invalidate(lambda key: key[:3] == cache_key[:3] and key[3] != version)
+            data = self.decrypt_file(player_name, file)
+            parsed = parse(data)
+            return parsed, self.estimate_memory_usage(parsed, len(data))
 
+        return self.data_cache.get_or_load(cache_key, load, lambda loaded: loaded[1])[0]
+
+    @Telemetry.timed()
+    def read_prepared_file(self, player_name, file):
+        # the parsed object is shared by all sessions and must not be modified by callers
+        return self.load_file('prepared_file', player_name, file, pickle.loads)
+
+    @Telemetry.timed()
     def read_prepared_df_file(self, player_name, df_file, index_col=None):
-        destination_file, aes_file = self.get_file_path(player_name, df_file)
+        return self.load_file(('prepared_df_file', index_col), player_name, df_file,
+                              lambda data: pd.read_csv(io.BytesIO(data), index_col=index_col))
 
-        if not os.path.exists(destination_file):
-            pyAesCrypt.decryptFile(aes_file, destination_file, self.get_password())
+    def get_cache_stats(self):
+        return self.data_cache.get_stats()
 
-        df = pd.read_csv(destination_file, index_col=index_col)
-        print(f'read {destination_file}')
+    def get_data_version(self, player_name, file):
+        version = self.catalog.get_data_version(player_name, file)
+        if version is not None:
+            return version
 
-        os.remove(destination_file)
+        _, aes_file = self.get_file_path(player_name, file)
+        stat = os.stat(aes_file)
+        return stat.st_mtime_ns, stat.st_size
 
-        return df
+    def exists_prepared_file(self, player_name, file):
+        entry = self.catalog.get_file_entry(player_name, file)
+        if entry is not None:
+            return bool(entry)
+
+        _, aes_file = self.get_file_path(player_name, file)
+        return os.path.exists(aes_file)
+
+    def write_prepared_file(self, obj, player_name, file, update_catalog=True):
+        _, aes_file = self.get_file_path(player_name, file)
+        self.write_encrypted_path(obj, aes_file)
+        if update_catalog:
+            DataCatalog.mark_changed(player_name)
+
+    def write_encrypted_path(self, obj, aes_file):
+        tmp_file = aes_file.with_name(f'{aes_file.name}.tmp')
+        with open(tmp_file, "wb") as dst:
+            pyAesCrypt.encryptStream(io.BytesIO(pickle.dumps(obj)), dst, self.get_password(), AES_BUFFER_SIZE)
+        os.replace(tmp_file, aes_file)
+        print(f'wrote {aes_file}')
 
     def get_available_streamers(self):
+        streamers = self.catalog.get_streamers()
+        if streamers is not None:
+            return streamers
+
         dsc_path = self.get_dsc_data_file_path()
         players = []
         for d in os.listdir(dsc_path):
@@ -70,27 +149,41 @@ class DataService:
                 players.append(d)
         return players
 
-    def add_duration(self, item):
-        start = item['start_date']
-        duration = item['gameDuration_ms']
-        if duration < 10000:
-            return start + timedelta(seconds=duration)
-        else:
-            return start + timedelta(milliseconds=duration)
+    @staticmethod
+    def calc_end_dates(start_dates, durations):
+        # gameDuration is reported in seconds by some matches and in milliseconds by others
+        durations = durations.to_numpy(dtype=np.int64)
+        duration_millis = np.where(durations < 10000, durations * 1000, durations)
+        return start_dates + pd.to_timedelta(duration_millis, unit='ms')
 
+    @Telemetry.timed()
     def get_df_match_history_of_streamer(self, player_name):
         match_summaries = self.read_prepared_file(player_name, "match_summaries")
         df = pd.DataFrame(match_summaries)
         df.rename(columns={"gameStartTimestamp_date": "start_date"}, inplace=True)
-        df['end_date'] = df[['start_date', 'gameDuration_ms']].apply(self.add_duration, axis=1)
+        df['end_date'] = self.calc_end_dates(df['start_date'], df['gameDuration_ms'])
         df['matchSelectbox'] = (df.index + 1).astype(str) + " | " + df['matchId'] + " (" + df['start_date'].dt.round('1s').astype(str) + " to " + df['end_date'].dt.round('1s').dt.time.astype(str) +")"
         return df
 
+    @Telemetry.timed()
+    def get_streamer_match_aggregates(self, player_name):
+        cache_key = ('streamer_match_aggregates', player_name, self.get_data_version(player_name, "match_summaries"))
+        return self.data_cache.get_or_load(cache_key, lambda: StreamerMatchAggregates(self.get_df_match_history_of_streamer(player_name)),
+                                           StreamerMatchAggregates.get_memory_usage)
+
     def get_df_summoners_of_streamer(self, player_name):
         summoner_mappings = self.read_prepared_df_file(player_name, "summoner_mapping")
-        return pd.DataFrame(summoner_mappings)
+        return summoner_mappings.copy()
 
+    @Telemetry.timed()
     def get_match_summary_array(self, player_name, match_id):
+        compiled_store = CompiledStore(self)
+        if compiled_store.contains(player_name, match_id):
+            return compiled_store.read_match_summary_array(player_name, match_id)
+        return self.get_raw_match_summary_array(player_name, match_id)
+
+    def get_raw_match_summary_array(self, player_name, match_id):
+        # the exported file, never the compiled store. The build and verify of the store read it
         filename = f"match_participant_summaries_{match_id}"
         return self.read_prepared_file(player_name, filename)
 
@@ -98,8 +191,106 @@ class DataService:
         filename = f"match_timeline_{match_id}"
         return self.read_prepared_file(player_name, filename)
 
+    def get_match_data_version(self, player_name, match_id):
+        if CompiledStore(self).contains(player_name, match_id):
+            return self.get_data_version(player_name, CompiledStore.match_index_file)
+        return self.get_data_version(player_name, f"match_timeline_{match_id}"), \
+            self.get_data_version(player_name, f"match_participant_summaries_{match_id}")
+
+    @Telemetry.timed()
+    def get_match_timeline_events(self, player_name, match_id):
+        compiled_store = CompiledStore(self)
+        is_compiled = compiled_store.contains(player_name, match_id)
+        version_file = CompiledStore.match_index_file if is_compiled else f"match_timeline_{match_id}"
+        cache_key = ('match_timeline_events', player_name, match_id, self.get_data_version(player_name, version_file))
+
+        def load():
+            if is_compiled:
+                return compiled_store.read_timeline_events(player_name, match_id)
+            timeline_dict = self.get_match_timeline_dict(player_name, match_id)
+            return timeline_dict['info']['participants'], TimelineTransformerUtil.flatten_timeline_events(timeline_dict)
+
+        return self.data_cache.get_or_load(cache_key, load, lambda timeline_events: int(timeline_events[1].memory_usage(deep=True).sum()))
+
+    @Telemetry.timed()
+    def get_match_timeline_df(self, player_name, match_id):
+        cache_key = ('match_timeline_df', player_name, match_id, self.get_match_data_version(player_name, match_id))
+
+        def load():
+            participants, events_df = self.get_match_timeline_events(player_name, match_id)
+            match_context = MatchContext(self.get_match_summary_array(player_name, match_id), participants)
+            return TimelineTransformerUtil.create_match_timeline_df_from_events(events_df, match_context.participant_map)
+
+        return self.data_cache.get_or_load(cache_key, load, TimelineTransformerUtil.get_memory_usage)
+
+    def get_match_event_cube(self, player_name, match_id):
+        cache_key = ('match_event_cube', player_name, match_id, self.get_match_data_version(player_name, match_id))
+        return self.data_cache.get_or_load(cache_key, lambda: MatchEventCube.from_timeline(self.get_match_timeline_df(player_name, match_id),
+                                                                                           self.get_match_summary_array(player_name, match_id)),
+                                           MatchEventCube.get_memory_usage)
+
+    @Telemetry.timed()
+    def get_match_participant_frames(self, player_name, match_id):
+        cache_key = ('match_participant_frames', player_name, match_id, self.get_match_data_version(player_name, match_id))
+
+        def load():
+            compiled_store = CompiledStore(self)
+            if compiled_store.contains(player_name, match_id) and compiled_store.has_table(player_name, 'participant_frames'):
+                _, events_df = self.get_match_timeline_events(player_name, match_id)
+                return compiled_store.read_participant_frames(player_name, match_id, ParticipantFrames.get_start_millis(events_df))
+            return ParticipantFrames.from_timeline(self.get_match_timeline_dict(player_name, match_id))
+
+        return self.data_cache.get_or_load(cache_key, load, ParticipantFrames.get_memory_usage)
+
+    def get_match_context(self, player_name, match_id):
+        cache_key = ('match_context', player_name, match_id, self.get_match_data_version(player_name, match_id),
+                     self.get_data_version(player_name, "summoner_mapping"))
+
+        def load():
+            participants, _ = self.get_match_timeline_events(player_name, match_id)
+            streamer_summoners = set(self.get_df_summoners_of_streamer(player_name)['summoner_name'])
+            return MatchContext(self.get_match_summary_array(player_name, match_id), participants, streamer_summoners)
+
+        return self.data_cache.get_or_load(cache_key, load, MatchContext.get_memory_usage)
+
+    def get_chat_data_version(self, player_name, match_id):
+        # None if no chat was collected for the streamer, the chat of its matches is empty
+        partition_file = ChatStore.get_partition_file(match_id)
+        if self.exists_prepared_file(player_name, partition_file):
+            return self.get_data_version(player_name, partition_file)
+        if self.exists_prepared_file(player_name, 'chat_df'):
+            return self.get_data_version(player_name, 'chat_df')
+        return None
+
+    @Telemetry.timed()
+    def get_chat_rate_pyramid(self, player_name, match_id, chat_of_match=None):
+        cache_key = ('chat_rate_pyramid', player_name, match_id, self.get_chat_data_version(player_name, match_id))
+
+        def load():
+            return ChatRatePyramid.from_chat(chat_of_match if chat_of_match is not None else self.get_chat_of_match_df(player_name, match_id))
+
+        return self.data_cache.get_or_load(cache_key, load, ChatRatePyramid.get_memory_usage)
+
+    @Telemetry.timed()
+    def get_chat_window_index(self, player_name, match_id, chat_of_match=None):
+        cache_key = ('chat_window_index', player_name, match_id, self.get_chat_data_version(player_name, match_id))
+
+        def load():
+            return ChatWindowIndex(chat_of_match if chat_of_match is not None else self.get_chat_of_match_df(player_name, match_id))
+
+        return self.data_cache.get_or_load(cache_key, load, ChatWindowIndex.get_memory_usage)
+
+    @Telemetry.timed()
     def get_chat_of_match_df(self, player_name, match_id):
+        chat_store = ChatStore(self)
+        if chat_store.has_partition(player_name, match_id):
+            return chat_store.read_partition(player_name, match_id)
+
+        if not self.exists_prepared_file(player_name, 'chat_df'):
+            return ChatStore.to_typed_chat_df(ChatStore.create_empty_chat_df())
+
+        # chat store of the streamer was not built yet, fall back to the whole chat_df
         chat_df = self.read_prepared_df_file(player_name, 'chat_df', None)
-        datetime_index = pd.DatetimeIndex(chat_df['datetime'])
-        chat_df.set_index(datetime_index, inplace=True)
-        return chat_df[chat_df['matchId'] == match_id]
+        chat_of_match = chat_df[chat_df['matchId'] == match_id]
+        # the cached chat_df is shared, so the index is set on the selected rows only
+        return chat_of_match.set_index(pd.DatetimeIndex(chat_of_match['datetime']))
@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from service.ChatRatePyramid import ChatRatePyramid, NANOS_PER_SECOND, TIMECATEGORIES
+from service.ChatStore import ChatStore
+from service.MatchContext import MatchContext
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+
+STAGES = ['load', 'timeline', 'chat_rate', 'stats']
+
+# DataService of a worker process, it is kept with its cache for all matches the worker analyzes
+_worker_data_service = None
+
+
+def get_worker_data_service():
+    global _worker_data_service
+    if _worker_data_service is None:
+        from service.DataService import DataService
+        _worker_data_service = DataService()
+    return _worker_data_service
+
+
+def analyze_match(player_name, match_id, streamer_summoners, window_seconds):
+    # runs in a worker process
+    data_service = get_worker_data_service()
+    timings = {}
+
+    start = time.perf_counter()
+    summary_array = data_service.get_match_summary_array(player_name, match_id)
+    participants, events_df = data_service.get_match_timeline_events(player_name, match_id)
+    chat_of_match = data_service.get_chat_of_match_df(player_name, match_id)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    match_context = MatchContext(summary_array, participants, streamer_summoners)
+    timeline_df = TimelineTransformerUtil.create_match_timeline_df_from_events(events_df, match_context.participant_map)
+    match_summoners = match_context.get_streamer_summoners_in_match()
+    timings['timeline'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pyramid = ChatRatePyramid.from_chat(chat_of_match, levels=[1])
+    timings['chat_rate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    event_stats = {}
+    if len(match_summoners) > 0 and len(pyramid.counts_by_level[1]) > 0:
+        summoner_events = TimelineTransformerUtil.get_summoner_events_df(timeline_df, match_summoners[0])
+        event_stats = EpicMomentAnalyzer.calc_event_stats(pyramid, summoner_events, window_seconds)
+    timings['stats'] = time.perf_counter() - start
+
+    return {'matchId': match_id, 'event_stats': event_stats, 'timings': timings}
+
+
+class EpicMomentStats:
+    # incrementally reduced result of all analyzed matches
+
+    def __init__(self, total_matches):
+        self.total_matches = total_matches
+        self.analyzed_matches = 0
+        self.matches_with_events = 0
+        # match id -> error of the matches that could not be analyzed
+        self.failed_matches = {}
+        self.totals = {}
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.wall_seconds = 0.0
+
+    def add(self, match_result):
+        self.analyzed_matches += 1
+        if len(match_result['event_stats']) > 0:
+            self.matches_with_events += 1
+        for event_type, (count, window_rate_sum, baseline_rate_sum) in match_result['event_stats'].items():
+            total = self.totals.setdefault(event_type, [0, 0.0, 0.0])
+            total[0] += count
+            total[1] += window_rate_sum
+            total[2] += baseline_rate_sum
+        for stage, seconds in match_result['timings'].items():
+            self.stage_seconds[stage] += seconds
+
+    def add_failure(self, match_id, error):
+        self.failed_matches[match_id] = f'{type(error).__name__}: {error}'
+
+    def get_finished_matches(self):
+        return self.analyzed_matches + len(self.failed_matches)
+
+    def is_complete(self):
+        return self.get_finished_matches() == self.total_matches
+
+    def to_df(self):
+        rows = [[event_type, count, window_rate_sum / count, baseline_rate_sum / count]
+                for event_type, (count, window_rate_sum, baseline_rate_sum) in self.totals.items()]
+        df = pd.DataFrame(rows, columns=['event_type', 'events', 'window_rate', 'baseline_rate'])
+        df['uplift_pct'] = (df['window_rate'] / df['baseline_rate'] - 1) * 100
+        return df.sort_values('uplift_pct', ascending=False).reset_index(drop=True)
+
+    def get_memory_usage(self):
+        return 200 * len(self.totals) + 1000
+
+
+class EpicMomentAnalyzer:
+    # one pool per process, its workers and their caches are reused by all analyses. Spawned workers read the data
+    # relative to the working directory they were started in, so a new working directory gets a new pool
+    _pool = None
+    _pool_key = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, data_service, workers=None, window_seconds=30):
+        self.data_service = data_service
+        self.workers = workers or os.cpu_count()
+        self.window_seconds = window_seconds
+
+    @staticmethod
+    def calc_event_stats(pyramid, summoner_events, window_seconds):
+        # chat rate in the window after each event, compared to the mean rate during the match
+        counts = pyramid.counts_by_level[1]
+        during_match = pyramid.timecategories_by_level[1] == TIMECATEGORIES.index('DURING_MATCH')
+        baseline_rate = counts[during_match].mean() if during_match.any() else counts.mean()
+        if baseline_rate == 0:
+            return {}
+
+        cumulative = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        event_positions = summoner_events.index.values.astype('datetime64[ns]').view(np.int64) // NANOS_PER_SECOND - pyramid.origin
+        # the rounded event second is the first full second after the event
+        window_start = np.clip(event_positions, 0, len(counts))
+        window_stop = np.clip(event_positions + window_seconds, 0, len(counts))
+        window_length = window_stop - window_start
+        has_window = window_length > 0
+        window_rates = (cumulative[window_stop] - cumulative[window_start])[has_window] / window_length[has_window]
+
+        event_types = summoner_events['event_types'].to_numpy()[has_window]
+        event_stats = {}
+        for event_type in np.unique(event_types):
+            rates = window_rates[event_types == event_type]
+            event_stats[event_type] = (len(rates), float(rates.sum()), float(baseline_rate) * len(rates))
+        return event_stats
+
+    def get_pool(self):
+        pool_key = (self.workers, os.getcwd())
+        with EpicMomentAnalyzer._pool_lock:
+            if EpicMomentAnalyzer._pool is None or EpicMomentAnalyzer._pool_key != pool_key:
+                if EpicMomentAnalyzer._pool is not None:
+                    EpicMomentAnalyzer._pool.shutdown(wait=False, cancel_futures=True)
+                # spawned workers do not inherit the threads of the streamlit server
+                EpicMomentAnalyzer._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                EpicMomentAnalyzer._pool_key = pool_key
+            return EpicMomentAnalyzer._pool
+
+    @staticmethod
+    def discard_pool(pool):
+        # a killed worker breaks the pool, the next analysis starts a new one
+        with EpicMomentAnalyzer._pool_lock:
+            if EpicMomentAnalyzer._pool is pool:
+                EpicMomentAnalyzer._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def has_chat(self, player_name):
+        # chat ingested from the raw logs only exists as chat store partitions
+        if self.data_service.exists_prepared_file(player_name, 'chat_df'):
+            return True
+        match_ids = self.data_service.get_streamer_match_aggregates(player_name).history['matchId']
+        return any(ChatStore(self.data_service).has_partition(player_name, match_id) for match_id in match_ids)
+
+    def get_streamer_summoners(self, player_name):
+        return set(self.data_service.get_df_summoners_of_streamer(player_name)['summoner_name'])
+
+    def get_streamer_data_version(self, player_name):
+        # the catalog version changes with any file of the streamer
+        version = self.data_service.catalog.get_version(player_name)
+        if version is not None:
+            return version
+
+        files = ['match_summaries', 'chat_df', 'compiled_match_index']
+        match_ids = self.data_service.get_streamer_match_aggregates(player_name).history['matchId']
+        files += [ChatStore.get_partition_file(match_id) for match_id in match_ids]
+        return tuple(self.data_service.get_data_version(player_name, file) for file in files
+                     if self.data_service.exists_prepared_file(player_name, file))
+
+    def iter_stats(self, player_name):
+        # yields the reduced statistics after every finished match, so callers can show partial results
+        cache_key = ('epic_moment_stats', player_name, self.window_seconds, self.get_streamer_data_version(player_name))
+        stats = self.data_service.data_cache.get(cache_key)
+        if stats is not None:
+            yield stats
+            return
+
+        match_ids = list(self.data_service.get_streamer_match_aggregates(player_name).history['matchId'])
+        streamer_summoners = self.get_streamer_summoners(player_name)
+        stats = EpicMomentStats(len(match_ids))
+        yield stats
+
+        start = time.perf_counter()
+        pool = self.get_pool()
+        futures = {pool.submit(analyze_match, player_name, match_id, streamer_summoners, self.window_seconds): match_id for match_id in match_ids}
+        try:
+            for future in as_completed(futures):
+                # a match that fails is reported in the stats, the other matches are still analyzed
+                try:
+                    stats.add(future.result())
+                except BrokenProcessPool as e:
+                    stats.add_failure(futures[future], e)
+                    self.discard_pool(pool)
+                except Exception as e:
+                    stats.add_failure(futures[future], e)
+                stats.wall_seconds = time.perf_counter() - start
+                yield stats
+        finally:
+            # a closed session stops its queued matches, the pool is kept for the next analysis
+            for future in futures:
+                future.cancel()
+
+        print(f'analyzed {stats.analyzed_matches} matches of {player_name} in {stats.wall_seconds:.1f}s, {len(stats.failed_matches)} failed')
+        # failed matches are analyzed again on the next run
+        if len(stats.failed_matches) == 0:
+            self.data_service.data_cache.put(cache_key, stats, stats.get_memory_usage())
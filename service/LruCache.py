@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LruCache:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.load_seconds = 0.0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_or_load(self, key, load, size_of):
+        # single flight: concurrent misses of the same key wait for the first caller instead of loading again
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            loading = self._loading.get(key)
+            is_loader = loading is None
+            if is_loader:
+                self.misses += 1
+                loading = self._loading[key] = Future()
+            else:
+                self.coalesced += 1
+        if not is_loader:
+            return loading.result()
+
+        start = time.perf_counter()
+        try:
+            value = load()
+            self.put(key, value, size_of(value))
+        except BaseException as e:
+            # the waiting callers get the error, the next call loads again
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+        loading.set_result(value)
+        return value
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            # objects bigger than the whole budget are never cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        with self._lock:
+            stale_keys = [key for key in self._entries if predicate(key)]
+            for key in stale_keys:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self.invalidations += len(stale_keys)
+        return len(stale_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loads': self.loads,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._loading),
+                'invalidations': self.invalidations,
+                'load_seconds': self.load_seconds
+            }
@@ -0,0 +1,52 @@
+import numpy as np
+
+SUMMARY_METRICS = ['physicalDamageDealt', 'magicDamageDealt', 'physicalDamageDealtToChampions', 'magicDamageDealtToChampions',
+                   'physicalDamageTaken', 'magicDamageTaken']
+
+
+class MatchContext:
+    # participant lookups of a match, indexed once per load instead of scanning the summary array per lookup
+    __slots__ = ('summary_array', 'summoner_names', 'by_puuid', 'by_participant_id', 'by_summoner_name', 'participant_map',
+                 'streamer_summoners', 'metric_columns', 'metric_values', 'metric_match_totals', 'metric_team_totals', 'team_ids')
+
+    def __init__(self, summary_array, participants=None, streamer_summoners=()):
+        self.summary_array = summary_array
+        self.summoner_names = [summary['summonerName'] for summary in summary_array]
+        self.by_puuid = {summary['puuid']: summary for summary in summary_array}
+        self.by_summoner_name = {summary['summonerName']: summary for summary in summary_array}
+
+        # the timeline knows the participant ids, older summaries do not have them
+        if participants is None:
+            participants = [{'participantId': summary['participantId'], 'puuid': summary['puuid']} for summary in summary_array]
+        self.by_participant_id = {int(p['participantId']): self.by_puuid[p['puuid']] for p in participants}
+        self.participant_map = {'0': {'puuid': '-', 'name': 'Minions'}}
+        for p in participants:
+            self.participant_map[str(p['participantId'])] = {'puuid': p['puuid'], 'name': self.by_puuid[p['puuid']]['summonerName']}
+
+        self.streamer_summoners = {name for name in self.summoner_names if name in streamer_summoners}
+
+        self.metric_columns = {metric: column for column, metric in enumerate(SUMMARY_METRICS)}
+        self.metric_values = np.array([[summary.get(metric, 0) for metric in SUMMARY_METRICS] for summary in summary_array], dtype=np.int64)
+        self.metric_match_totals = self.metric_values.sum(axis=0)
+        self.team_ids = np.array([summary.get('teamId', 0) for summary in summary_array])
+        self.metric_team_totals = {int(team_id): self.metric_values[self.team_ids == team_id].sum(axis=0) for team_id in np.unique(self.team_ids)}
+
+    def get_summary(self, summoner_name):
+        return self.by_summoner_name[summoner_name]
+
+    def is_streamer_summoner(self, summoner_name):
+        return summoner_name in self.streamer_summoners
+
+    def get_streamer_summoners_in_match(self):
+        return [name for name in self.summoner_names if name in self.streamer_summoners]
+
+    def get_metric_value_pct(self, summoner_name, metric, of_team=False):
+        # share of the summoner in the whole match (or in its team), formatted like MakeNice4UIMapper.calc_metric_value_pct
+        summary = self.by_summoner_name[summoner_name]
+        value = summary[metric]
+        totals = self.metric_team_totals[int(summary.get('teamId', 0))] if of_team else self.metric_match_totals
+        delta = round((value / int(totals[self.metric_columns[metric]])) * 100)
+        return value, f"{delta} %"
+
+    def get_memory_usage(self):
+        return self.metric_values.nbytes + 500 * len(self.summary_array)
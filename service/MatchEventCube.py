@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+BLACKLISTED_TYPES = ['PAUSE_END', 'GAME_END']
+
+
+class MatchEventCube:
+    # (summoner x event type) counts of a match, computed once when the timeline is built
+
+    def __init__(self, summoners, event_types, counts, first_seen, wins):
+        # the last row of counts and first_seen collects events without a summoner
+        self.summoners = summoners
+        self.event_types = event_types
+        self.counts = counts
+        self.first_seen = first_seen
+        self.wins = wins
+
+    @staticmethod
+    def from_timeline(timeline_df, summary_array):
+        summoners = timeline_df['event_summoner'].cat.categories.to_numpy(dtype=object)
+        event_types = timeline_df['event_types'].cat.categories.to_numpy(dtype=object)
+        summoner_codes = timeline_df['event_summoner'].cat.codes.to_numpy().astype(np.int64)
+        summoner_codes[summoner_codes < 0] = len(summoners)
+        type_codes = timeline_df['event_types'].cat.codes.to_numpy().astype(np.int64)
+
+        cells = summoner_codes * len(event_types) + type_codes
+        shape = (len(summoners) + 1, len(event_types))
+        counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape).astype(np.int32)
+        # row of the first occurrence, so type lists keep the order of the timeline
+        first_seen = np.full(shape[0] * shape[1], len(timeline_df), dtype=np.int64)
+        np.minimum.at(first_seen, cells, np.arange(len(timeline_df)))
+
+        wins = {summary['summonerName']: summary['win'] for summary in summary_array}
+        return MatchEventCube(summoners, event_types, counts, first_seen.reshape(shape), wins)
+
+    def get_type_column(self, event_type):
+        matches = np.flatnonzero(self.event_types == event_type)
+        return matches[0] if len(matches) > 0 else None
+
+    def get_summoner_counts(self, event_type=None):
+        if event_type is None:
+            return self.counts[:-1].sum(axis=1)
+        column = self.get_type_column(event_type)
+        return self.counts[:-1, column] if column is not None else np.zeros(len(self.summoners), dtype=np.int32)
+
+    def get_events_by_player_desc_df(self, event_type=None):
+        # same rows, order and index as TimelineTransformerUtil.get_events_by_player_desc_df
+        order = np.argsort(self.summoners, kind='stable')
+        events_by_player_desc = pd.DataFrame({'event_summoner': self.summoners[order],
+                                              'count': self.get_summoner_counts(event_type)[order].astype(np.int64)})
+        events_by_player_desc = events_by_player_desc[events_by_player_desc['count'] > 0].reset_index(drop=True)
+        events_by_player_desc = events_by_player_desc.sort_values('count', ascending=True)
+
+        events_by_player_desc = events_by_player_desc[events_by_player_desc['event_summoner'].isin(self.wins)].reset_index(drop=True)
+        events_by_player_desc['win'] = events_by_player_desc['event_summoner'].map(self.wins).astype(bool)
+        events_by_player_desc.sort_values(['win', 'count'], inplace=True, ascending=[True, False])
+        return events_by_player_desc
+
+    def get_team_counts_df(self, event_type=None):
+        counts = self.get_summoner_counts(event_type)
+        team_counts = {}
+        for summoner, count in zip(self.summoners, counts):
+            if count > 0 and summoner in self.wins:
+                team_counts[self.wins[summoner]] = team_counts.get(self.wins[summoner], 0) + int(count)
+        wins = sorted(team_counts)
+        return pd.DataFrame({'win': wins, 'count': [team_counts[win] for win in wins]})
+
+    def get_ordered_types(self, rows):
+        present = self.counts[rows].sum(axis=0) > 0
+        first_seen = self.first_seen[rows].min(axis=0)
+        columns = [column for column in np.argsort(first_seen, kind='stable') if present[column]]
+        return [self.event_types[column] for column in columns if self.event_types[column] not in BLACKLISTED_TYPES]
+
+    def get_event_types(self, add_whitelist=True):
+        event_types = self.get_ordered_types(slice(None))
+        if add_whitelist:
+            event_types.insert(0, 'ALL')
+        return event_types
+
+    def get_event_types_for_summoner(self, summoner_name):
+        rows = np.flatnonzero(self.summoners == summoner_name)
+        return self.get_ordered_types(rows) if len(rows) > 0 else []
+
+    def get_memory_usage(self):
+        return self.counts.nbytes + self.first_seen.nbytes + 100 * (len(self.summoners) + len(self.event_types))
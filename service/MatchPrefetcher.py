@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from service.CompiledStore import TABLES, CompiledStore
+from service.DataService import PICKLE_EXPANSION
+
+
+class MatchPrefetcher:
+    # one prefetcher per process, it fills the caches of DataService that are shared by all sessions.
+    # A new selection cancels only the prefetches of its own session
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, data_service, max_matches=None, max_bytes=None, workers=2):
+        self.data_service = data_service
+        self.max_matches = max_matches or int(os.environ.get('DSC_PREFETCH_MATCHES', 6))
+        # never prefetch more than half of the data cache, otherwise prefetching evicts the selected match
+        max_bytes = max_bytes or int(os.environ.get('DSC_PREFETCH_MB', 64)) * 1024 * 1024
+        self.max_bytes = min(max_bytes, data_service.data_cache.max_bytes // 2)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="match-prefetch")
+        self._lock = threading.Lock()
+        # session id -> generation, player_name, futures and budget_bytes of its last selection
+        self.sessions = {}
+
+    @staticmethod
+    def get(data_service):
+        with MatchPrefetcher._instance_lock:
+            if MatchPrefetcher._instance is None:
+                MatchPrefetcher._instance = MatchPrefetcher(data_service)
+            return MatchPrefetcher._instance
+
+    @staticmethod
+    def get_neighbour_order(match_ids, selected_idx, max_matches):
+        # next, previous, second next, second previous, ...
+        ordered = []
+        for distance in range(1, len(match_ids)):
+            for idx in [selected_idx + distance, selected_idx - distance]:
+                if 0 <= idx < len(match_ids):
+                    ordered.append(match_ids[idx])
+            if len(ordered) >= max_matches:
+                break
+        return ordered[:max_matches]
+
+    def get_match_files(self, player_name, match_id):
+        compiled_store = CompiledStore(self.data_service)
+        if compiled_store.contains(player_name, match_id):
+            # the whole group of the match is decrypted, the groups of several neighbours are counted once
+            group = compiled_store.read_match_index(player_name).loc[match_id, 'group']
+            return [CompiledStore.get_table_file(table, group) for table in TABLES]
+        return [f"match_participant_summaries_{match_id}", f"match_timeline_{match_id}"]
+
+    def get_match_size(self, player_name, match_id, counted_files=None):
+        # estimated like the parsed files in the data cache
+        files = [file for file in self.get_match_files(player_name, match_id) if counted_files is None or file not in counted_files]
+        if counted_files is not None:
+            counted_files.update(files)
+        return PICKLE_EXPANSION * sum(self.data_service.get_data_version(player_name, file)[1] for file in files
+                                      if self.data_service.exists_prepared_file(player_name, file))
+
+    def prefetch(self, player_name, match_ids, selected_idx, session_id=None):
+        # neighbours within the memory budget, matches that are already cached only cost a cache lookup
+        neighbours = []
+        budget_bytes = 0
+        counted_files = set()
+        for match_id in self.get_neighbour_order(list(match_ids), selected_idx, self.max_matches):
+            match_size = self.get_match_size(player_name, match_id, counted_files)
+            if budget_bytes + match_size > self.max_bytes:
+                break
+            budget_bytes += match_size
+            neighbours.append(match_id)
+
+        with self._lock:
+            # queued work of the previous selection of the session is dropped, running tasks stop at their next generation check
+            session = self.sessions.get(session_id)
+            generation = 1
+            if session is not None:
+                generation = session['generation'] + 1
+                for future in session['futures']:
+                    future.cancel()
+            # sessions without pending work are forgotten, closed sessions never prefetch again
+            self.sessions = {sid: other for sid, other in self.sessions.items() if any(not future.done() for future in other['futures'])}
+            self.sessions[session_id] = {'generation': generation, 'player_name': player_name, 'budget_bytes': budget_bytes, 'futures': []}
+            self.sessions[session_id]['futures'] = [self.pool.submit(self.prefetch_match, session_id, generation, player_name, match_id)
+                                                    for match_id in neighbours]
+
+    def is_current(self, session_id, generation):
+        session = self.sessions.get(session_id)
+        return session is not None and session['generation'] == generation
+
+    def prefetch_match(self, session_id, generation, player_name, match_id):
+        try:
+            if not self.is_current(session_id, generation):
+                return
+            self.data_service.get_match_summary_array(player_name, match_id)
+            if not self.is_current(session_id, generation):
+                return
+            # the timeline frame and its event counts are what the dashboard reads
+            self.data_service.get_match_event_cube(player_name, match_id)
+            self.data_service.get_match_context(player_name, match_id)
+            self.data_service.get_match_participant_frames(player_name, match_id)
+        except Exception as e:
+            # a failed prefetch is retried by the dashboard when the match is selected
+            print(f'prefetch of {match_id} failed: {e}')
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self.sessions),
+                'queued': sum(1 for session in self.sessions.values() for future in session['futures'] if not future.done()),
+                'budget_bytes': sum(session['budget_bytes'] for session in self.sessions.values()),
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# stat -> path in a participant frame of the timeline
+FRAME_STATS = {
+    'currentGold': ('currentGold',),
+    'totalGold': ('totalGold',),
+    'xp': ('xp',),
+    'level': ('level',),
+    'minionsKilled': ('minionsKilled',),
+    'jungleMinionsKilled': ('jungleMinionsKilled',),
+    'totalDamageDone': ('damageStats', 'totalDamageDone'),
+    'totalDamageDoneToChampions': ('damageStats', 'totalDamageDoneToChampions'),
+    'totalDamageTaken': ('damageStats', 'totalDamageTaken'),
+    'positionX': ('position', 'x'),
+    'positionY': ('position', 'y')
+}
+
+
+class ParticipantFrames:
+    # per minute stats of all participants as one (frames x participants x stats) array
+
+    def __init__(self, timestamps, participant_ids, values, start_millis):
+        self.timestamps = timestamps
+        self.participant_ids = participant_ids
+        self.values = values
+        self.start_millis = start_millis
+        self.stat_columns = {stat: column for column, stat in enumerate(FRAME_STATS)}
+
+    @staticmethod
+    def get_frame_stat(participant_frame, path):
+        value = participant_frame
+        for key in path:
+            value = value.get(key)
+            if value is None:
+                return 0
+        return value
+
+    @staticmethod
+    def from_timeline(timeline_dict):
+        frames = timeline_dict['info']['frames']
+        participant_keys = sorted(frames[0]['participantFrames'], key=int) if len(frames) > 0 else []
+        # the dicts are walked once per match, every stat is read into a flat array and reshaped
+        participant_frames = [frame['participantFrames'].get(key, {}) for frame in frames for key in participant_keys]
+        values = np.empty((len(frames), len(participant_keys), len(FRAME_STATS)), dtype=np.int32)
+        for column, path in enumerate(FRAME_STATS.values()):
+            stat_values = np.fromiter((ParticipantFrames.get_frame_stat(frame, path) for frame in participant_frames),
+                                      dtype=np.float64, count=len(participant_frames))
+            values[:, :, column] = stat_values.reshape(len(frames), len(participant_keys))
+
+        # frame timestamps are relative to the first event with a real timestamp, like the events of the timeline
+        start_millis = next((event['realTimestamp'] for frame in frames for event in frame['events'] if 'realTimestamp' in event), 0)
+        timestamps = np.array([frame['timestamp'] for frame in frames], dtype=np.int64)
+        return ParticipantFrames(timestamps, np.array([int(key) for key in participant_keys], dtype=np.int8), values, start_millis)
+
+    @staticmethod
+    def get_start_millis(events_df):
+        real_timestamps = events_df['realTimestamp'].to_numpy()
+        return int(real_timestamps[real_timestamps >= 0][0]) if (real_timestamps >= 0).any() else 0
+
+    def to_df(self):
+        # long format with one row per frame and participant, used as table of the compiled store
+        frames, participants, _ = self.values.shape
+        df = pd.DataFrame(self.values.reshape(frames * participants, len(FRAME_STATS)), columns=list(FRAME_STATS))
+        df.insert(0, 'participantId', np.tile(self.participant_ids, frames))
+        df.insert(0, 'frameTimestamp', np.repeat(self.timestamps, participants))
+        return df
+
+    @staticmethod
+    def from_df(df, start_millis):
+        participant_ids = pd.unique(df['participantId']).astype(np.int8)
+        frames = len(df) // max(len(participant_ids), 1)
+        values = df[list(FRAME_STATS)].to_numpy(dtype=np.int32).reshape(frames, len(participant_ids), len(FRAME_STATS))
+        timestamps = df['frameTimestamp'].to_numpy(dtype=np.int64)[::max(len(participant_ids), 1)]
+        return ParticipantFrames(timestamps, participant_ids, values, start_millis)
+
+    def get_datetimes(self):
+        return pd.to_datetime(self.start_millis + self.timestamps, unit='ms')
+
+    def get_stat(self, stat):
+        # (frames x participants)
+        return self.values[:, :, self.stat_columns[stat]]
+
+    def get_team_diff(self, stat, team_mask):
+        # stat of the participants in team_mask minus the stat of the others, per frame
+        stat_values = self.get_stat(stat).astype(np.int64)
+        return stat_values[:, team_mask].sum(axis=1) - stat_values[:, ~team_mask].sum(axis=1)
+
+    def get_memory_usage(self):
+        return self.values.nbytes + self.timestamps.nbytes + self.participant_ids.nbytes
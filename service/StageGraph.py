@@ -0,0 +1,69 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from service.Telemetry import Telemetry
+
+# plotly and matplotlib figures are not measured, they are counted with a typical size
+DEFAULT_VALUE_SIZE = 64 * 1024
+
+
+def estimate_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if value is None or isinstance(value, (int, float)):
+        return 8
+    return DEFAULT_VALUE_SIZE
+
+
+class StageGraph:
+    # memoized stages of a dashboard. A stage is keyed by the selections it reads and by the keys of its upstream
+    # stages, so a changed widget only recomputes the stages downstream of it. The keys of the last results live in the
+    # state dict, which lives in the session state of streamlit across reruns. The results themselves are kept in the
+    # process-wide cache under the session id, so all sessions share its memory budget
+
+    def __init__(self, cache, session_id, state=None):
+        self.cache = cache
+        self.session_id = session_id
+        self.state = state if state is not None else {}
+        self.memo = self.state.setdefault('memo', {})
+        self.executions = self.state.setdefault('executions', Counter())
+        self.stages = {}
+
+    def add(self, name, compute, selections=(), upstream=(), size_of=estimate_size):
+        # compute gets the upstream values as positional and the selections as keyword arguments.
+        # Stages that only hold objects of the data cache pass a size_of that does not count them again
+        self.stages[name] = (compute, tuple(selections), tuple(upstream), size_of)
+
+    def get(self, name, selections):
+        compute, stage_selections, upstream, size_of = self.stages[name]
+        upstream_values = [self.get(upstream_name, selections) for upstream_name in upstream]
+        stage_values = {selection: selections[selection] for selection in stage_selections}
+        key = (tuple(stage_values.values()), tuple(self.memo[upstream_name] for upstream_name in upstream))
+
+        # evicted results are computed again
+        cache_key = ('stage', self.session_id, name)
+        if self.memo.get(name) == key:
+            cached = self.cache.get(cache_key)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        self.executions[name] += 1
+        with Telemetry.span(f'stage.{name}'):
+            value = compute(*upstream_values, **stage_values)
+        self.memo[name] = key
+        self.cache.put(cache_key, (key, value), size_of(value))
+        return value
+
+    def get_executions(self):
+        return dict(self.executions)
@@ -0,0 +1,37 @@
+import pandas as pd
+
+
+class StreamerMatchAggregates:
+
+    def __init__(self, history_df):
+        self.history: pd.DataFrame = history_df
+        self.matches_per_day: pd.DataFrame = self.create_matches_per_day(history_df)
+        self.matches_by_weekday: pd.DataFrame = self.create_matches_by_weekday(self.matches_per_day)
+        self.mean_matches = self.matches_by_weekday['count'].mean()
+
+    @staticmethod
+    def create_matches_per_day(history_df):
+        day_range = pd.date_range(history_df['start_date'].dt.date.min(), history_df['start_date'].dt.date.max())
+
+        matches_per_day = history_df['start_date'] \
+            .dt.floor('d') \
+            .value_counts()
+
+        matches_per_day.index = pd.DatetimeIndex(matches_per_day.index)
+        matches_per_day = matches_per_day.reindex(day_range, fill_value=0)
+        matches_per_day = matches_per_day.reset_index()
+        matches_per_day.rename(columns={"index": "date", "start_date": "count"}, inplace=True)
+        return matches_per_day
+
+    @staticmethod
+    def create_matches_by_weekday(matches_per_day):
+        # only days with at least one match count for the average
+        played_days = matches_per_day[matches_per_day['count'] > 0]
+        return played_days.groupby(played_days['date'].dt.day_name())['count'] \
+            .mean() \
+            .rename_axis('dayname') \
+            .reset_index()
+
+    def get_memory_usage(self):
+        return int(self.history.memory_usage(deep=True).sum() + self.matches_per_day.memory_usage(deep=True).sum()
+                   + self.matches_by_weekday.memory_usage(deep=True).sum())
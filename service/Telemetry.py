@@ -0,0 +1,148 @@
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOW = 500
+
+
+class NoopSpan:
+    # returned while telemetry is off, so instrumented code never allocates or measures anything
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    __slots__ = ('name', 'attributes', 'depth', 'start', 'duration')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.depth = 0
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = Telemetry.get_stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        Telemetry.get_stack().pop()
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        Telemetry.record(self)
+        return False
+
+
+class Telemetry:
+    # decided once at startup: with DSC_TELEMETRY unset, timed() returns the undecorated function
+    enabled = os.environ.get('DSC_TELEMETRY', '0') == '1'
+    log_path = os.environ.get('DSC_TELEMETRY_LOG')
+    _local = threading.local()
+    _lock = threading.Lock()
+    _rerun_ids = itertools.count(1)
+    _durations = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+    _log_file = None
+
+    @staticmethod
+    def span(name, **attributes):
+        if not Telemetry.enabled:
+            return NOOP_SPAN
+        return Span(name, attributes)
+
+    @staticmethod
+    def timed(name=None):
+        def decorator(func):
+            if not Telemetry.enabled:
+                return func
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with Span(span_name, {}) as span:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, pd.DataFrame):
+                        span.set(rows=len(result))
+                    return result
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def current_span():
+        if not Telemetry.enabled:
+            return NOOP_SPAN
+        stack = Telemetry.get_stack()
+        return stack[-1] if stack else NOOP_SPAN
+
+    @staticmethod
+    def get_stack():
+        stack = getattr(Telemetry._local, 'stack', None)
+        if stack is None:
+            stack = Telemetry._local.stack = []
+        return stack
+
+    @staticmethod
+    def start_rerun():
+        # streamlit runs every rerun of a session in its own script thread
+        Telemetry._local.rerun_id = next(Telemetry._rerun_ids)
+        Telemetry._local.rerun_spans = []
+
+    @staticmethod
+    def get_rerun_spans():
+        return getattr(Telemetry._local, 'rerun_spans', [])
+
+    @staticmethod
+    def record(span):
+        rerun_id = getattr(Telemetry._local, 'rerun_id', None)
+        if rerun_id is not None:
+            Telemetry._local.rerun_spans.append(span)
+        with Telemetry._lock:
+            Telemetry._durations[span.name].append(span.duration)
+
+        entry = {'ts': time.time(), 'span': span.name, 'ms': round(span.duration * 1000, 3), 'depth': span.depth,
+                 'rerun': rerun_id, 'thread': threading.current_thread().name, **span.attributes}
+        line = json.dumps(entry, default=str)
+        if Telemetry.log_path is None:
+            print(line, file=sys.stderr)
+            return
+        with Telemetry._lock:
+            if Telemetry._log_file is None:
+                Telemetry._log_file = open(Telemetry.log_path, 'a', buffering=1)
+            Telemetry._log_file.write(line + '\n')
+
+    @staticmethod
+    def get_rerun_df():
+        return pd.DataFrame([{'span': '  ' * span.depth + span.name, 'ms': span.duration * 1000, **span.attributes}
+                             for span in sorted(Telemetry.get_rerun_spans(), key=lambda span: span.start)])
+
+    @staticmethod
+    def get_rolling_stats_df():
+        with Telemetry._lock:
+            durations = {name: np.array(values) * 1000 for name, values in Telemetry._durations.items()}
+        rows = [{'span': name, 'count': len(values), 'p50_ms': np.percentile(values, 50), 'p95_ms': np.percentile(values, 95)}
+                for name, values in durations.items()]
+        return pd.DataFrame(rows, columns=['span', 'count', 'p50_ms', 'p95_ms']).sort_values('p95_ms', ascending=False)
@@ -1,7 +1,26 @@
+import numpy as np
 import pandas as pd
 
 from datetime import timedelta, datetime
 
+from service.MatchContext import MatchContext
+from service.Telemetry import Telemetry
+
+EVENT_PLAYER_KEYS = {
+    **dict.fromkeys(["ITEM_PURCHASED", "ITEM_DESTROYED", "ITEM_UNDO", "ITEM_SOLD", "SKILL_LEVEL_UP", "LEVEL_UP", "CHAMPION_TRANSFORM"], "participantId"),
+    **dict.fromkeys(["CHAMPION_KILL", "CHAMPION_SPECIAL_KILL", "WARD_KILL", "ELITE_MONSTER_KILL", "BUILDING_KILL", "TURRET_PLATE_DESTROYED"], "killerId"),
+    "WARD_PLACED": "creatorId",
+    "PAUSE_END": None,
+    "GAME_END": None
+}
+
+EVENT_OPPONENT_KEYS = {
+    "CHAMPION_KILL": "victimId",
+    **dict.fromkeys(["WARD_PLACED", "BUILDING_KILL", "CHAMPION_SPECIAL_KILL", "CHAMPION_TRANSFORM", "TURRET_PLATE_DESTROYED", "ELITE_MONSTER_KILL", "WARD_KILL", "ITEM_DESTROYED", "ITEM_UNDO", "ITEM_PURCHASED", "ITEM_SOLD", "GAME_END", "PAUSE_END", "SKILL_LEVEL_UP", "LEVEL_UP"], None)
+}
+
+EVENTS_FOR_EVERY_PLAYER = frozenset(["PAUSE_END", "GAME_END"])
+
 
 class TimelineTransformerUtil:
 
@@ -10,14 +29,11 @@ class TimelineTransformerUtil:
 
     @staticmethod
     def create_match_summoner_dict(timeline_dict, match_summary_array):
-        participant_map = {'0': {'puuid': '-', 'name': 'Minions'}}
-        for p in timeline_dict['info']['participants']:
+        return TimelineTransformerUtil.create_participant_map(timeline_dict['info']['participants'], match_summary_array)
 
-            participant_map[str(p['participantId'])] = {
-                'puuid': p['puuid'],
-                'name': [summ['summonerName'] for summ in match_summary_array if summ['puuid'] == p['puuid']][0]
-            }
-        return participant_map
+    @staticmethod
+    def create_participant_map(participants, match_summary_array):
+        return MatchContext(match_summary_array, participants).participant_map
 
     @staticmethod
     def calc_datetime(start_dt, delta_event):
@@ -25,31 +41,21 @@ class TimelineTransformerUtil:
 
     @staticmethod
     def get_key_event_player(event_type):
-        if event_type in ["ITEM_PURCHASED", "ITEM_DESTROYED", "ITEM_UNDO", "ITEM_SOLD", "SKILL_LEVEL_UP", "LEVEL_UP", "CHAMPION_TRANSFORM"]:
-            return "participantId"
-        elif event_type in ["CHAMPION_KILL", "CHAMPION_SPECIAL_KILL", "WARD_KILL", "ELITE_MONSTER_KILL", "BUILDING_KILL", "TURRET_PLATE_DESTROYED"]:
-            return "killerId"
-        elif event_type in ["WARD_PLACED"]:
-            return "creatorId"
-        elif event_type in ["PAUSE_END", "GAME_END"]:
-            return None
-        else:
-            print(f"could not find player key for event: {event_type}")
-            return None
+        if event_type in EVENT_PLAYER_KEYS:
+            return EVENT_PLAYER_KEYS[event_type]
+        print(f"could not find player key for event: {event_type}")
+        return None
 
     @staticmethod
     def get_key_event_opponent(event_type):
-        if event_type in ["CHAMPION_KILL"]:
-            return "victimId"
-        elif event_type in ["WARD_PLACED", "BUILDING_KILL", "CHAMPION_SPECIAL_KILL", "CHAMPION_TRANSFORM", "TURRET_PLATE_DESTROYED", "ELITE_MONSTER_KILL", "WARD_KILL", "ITEM_DESTROYED", "ITEM_UNDO",  "ITEM_PURCHASED", "ITEM_SOLD", "GAME_END", "PAUSE_END", "SKILL_LEVEL_UP", "LEVEL_UP"]:
-            return None
-        else:
-            print(f"could not find opponent key for event: {event_type}")
-            return None
+        if event_type in EVENT_OPPONENT_KEYS:
+            return EVENT_OPPONENT_KEYS[event_type]
+        print(f"could not find opponent key for event: {event_type}")
+        return None
 
     @staticmethod
     def is_event_for_every_player(event_type):
-        return event_type in ["PAUSE_END", "GAME_END"]
+        return event_type in EVENTS_FOR_EVERY_PLAYER
 
     @staticmethod
     def get_player_name(participant_map, player_num):
@@ -60,75 +66,136 @@ class TimelineTransformerUtil:
         return datetime.utcfromtimestamp(ts / 1000)
 
     @staticmethod
-    def create_match_timeline_df(timeline_dict, match_summary_array):
-        datetimes = []
+    @Telemetry.timed()
+    def flatten_timeline_events(timeline_dict):
         event_types = []
-        event_players = []
-        event_opponents = []
-        event_assistings = []
-
-        participant_summary = TimelineTransformerUtil.create_match_summoner_dict(timeline_dict, match_summary_array)
-
-        match_timeline_start = None
-        match_timeline_end = None
+        timestamps = []
+        real_timestamps = []
+        player_ids = []
+        opponent_ids = []
+        assisting_ids = []
+
+        # keys are resolved once per event type instead of once per event
+        player_keys = {}
+        opponent_keys = {}
         for frame in timeline_dict['info']['frames']:
             for event in frame['events']:
-                dt = None
-                event_delta = event['timestamp']
                 event_type = event['type']
-                event_assisting = None
-                event_player = None
-                player_key = TimelineTransformerUtil.get_key_event_player(event_type)
-                if player_key is not None:
-                    event_player = TimelineTransformerUtil.get_player_name(participant_summary, event[player_key])
-
-                event_opponent=None
-                opponent_key = TimelineTransformerUtil.get_key_event_opponent(event_type)
-                if opponent_key is not None:
-                    event_opponent = TimelineTransformerUtil.get_player_name(participant_summary, event[opponent_key])
-
-                if 'realTimestamp' in event:
-                    if match_timeline_start is None:
-                        match_timeline_start = TimelineTransformerUtil.utc_datetime_from_ts_millis(event['realTimestamp'])
-                        dt = match_timeline_start
-                    else:
-                        match_timeline_end = TimelineTransformerUtil.utc_datetime_from_ts_millis(event['realTimestamp'])
-                        dt = match_timeline_end
-                else:
-                    dt = TimelineTransformerUtil.calc_datetime(match_timeline_start, event_delta)
-
-                if 'assistingParticipantIds' in event:
-                    event_assisting = []
-                    for id in event['assistingParticipantIds']:
-                        ass = TimelineTransformerUtil.get_player_name(participant_summary, id)
-                        event_assisting.append(ass)
-
-                if TimelineTransformerUtil.is_event_for_every_player(event_type):
-                    for i in range(1, 11):
-                        datetimes.append(dt)
-                        event_types.append(event_type)
-                        event_players.append(TimelineTransformerUtil.get_player_name(participant_summary, i))
-                        event_opponents.append(event_opponent)
-                        event_assistings.append(event_assisting)
-                else:
-                    datetimes.append(dt)
-                    event_types.append(event_type)
-                    event_players.append(event_player)
-                    event_opponents.append(event_opponent)
-                    event_assistings.append(event_assisting)
+                if event_type not in player_keys:
+                    player_keys[event_type] = TimelineTransformerUtil.get_key_event_player(event_type)
+                    opponent_keys[event_type] = TimelineTransformerUtil.get_key_event_opponent(event_type)
+                player_key = player_keys[event_type]
+                opponent_key = opponent_keys[event_type]
+
+                event_types.append(event_type)
+                timestamps.append(event['timestamp'])
+                real_timestamps.append(event.get('realTimestamp', -1))
+                player_ids.append(-1 if player_key is None else event[player_key])
+                opponent_ids.append(-1 if opponent_key is None else event[opponent_key])
+                assisting_ids.append(event.get('assistingParticipantIds'))
+
+        assisting_ids_array = np.empty(len(assisting_ids), dtype=object)
+        assisting_ids_array[:] = assisting_ids
+        return pd.DataFrame({
+            'type': np.array(event_types, dtype=object),
+            'timestamp': np.array(timestamps, dtype=np.int64),
+            'realTimestamp': np.array(real_timestamps, dtype=np.int64),
+            'playerId': np.array(player_ids, dtype=np.int64),
+            'opponentId': np.array(opponent_ids, dtype=np.int64),
+            'assistingParticipantIds': assisting_ids_array
+        })
+
+    @staticmethod
+    def create_participant_name_table(participant_map):
+        # participant id -> summoner name, the last slot maps the id -1 (no participant) to None
+        names = np.empty(max(int(key) for key in participant_map) + 2, dtype=object)
+        for key, participant in participant_map.items():
+            names[int(key)] = participant['name']
+        return names
+
+    @staticmethod
+    def create_participant_categories(names):
+        # categories of a summoner column, the category code is the participant id
+        return [str(participant_id) if name is None else name for participant_id, name in enumerate(names[:-1])]
+
+    @staticmethod
+    def create_assist_arrays(assisting_participant_ids):
+        # ragged assists as one flat id array, the assists of event i are ids[offsets[i]:offsets[i + 1]]
+        has_assists = np.array([ids is not None for ids in assisting_participant_ids], dtype=bool)
+        counts = np.array([0 if ids is None else len(ids) for ids in assisting_participant_ids], dtype=np.int32)
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int32)])
+        ids = np.fromiter((participant_id for ids in assisting_participant_ids if ids is not None for participant_id in ids),
+                          dtype=np.int8, count=int(offsets[-1]))
+        return ids, offsets, has_assists
+
+    @staticmethod
+    def create_match_timeline_df(timeline_dict, match_summary_array):
+        participant_summary = TimelineTransformerUtil.create_match_summoner_dict(timeline_dict, match_summary_array)
+        events_df = TimelineTransformerUtil.flatten_timeline_events(timeline_dict)
+        return TimelineTransformerUtil.create_match_timeline_df_from_events(events_df, participant_summary)
 
+    @staticmethod
+    @Telemetry.timed()
+    def create_match_timeline_df_from_events(events_df, participant_summary):
+        names = TimelineTransformerUtil.create_participant_name_table(participant_summary)
+        event_types = events_df['type'].to_numpy()
+
+        # events with a realTimestamp use it, all other events are relative to the first one
+        real_timestamps = events_df['realTimestamp'].to_numpy()
+        has_real_timestamp = real_timestamps >= 0
+        match_timeline_start = real_timestamps[has_real_timestamp][0] if has_real_timestamp.any() else 0
+        event_millis = np.where(has_real_timestamp, real_timestamps, match_timeline_start + events_df['timestamp'].to_numpy())
+        datetimes = pd.to_datetime(event_millis, unit='ms')
+
+        # events for every player are fanned out to one row per participant
+        for_every_player = np.isin(event_types, list(EVENTS_FOR_EVERY_PLAYER))
+        repeats = np.where(for_every_player, 10, 1)
+        rows = np.repeat(np.arange(len(events_df), dtype=np.int32), repeats)
+        player_ids = events_df['playerId'].to_numpy()[rows]
+        player_ids[np.repeat(for_every_player, repeats)] = np.tile(np.arange(1, 11), int(for_every_player.sum()))
+
+        # strings are stored once as categories, rows only hold small integer codes
+        type_codes, type_categories = pd.factorize(event_types, sort=True)
+        participant_categories = TimelineTransformerUtil.create_participant_categories(names)
         match_timeline_df = pd.DataFrame({
-            'datetime': datetimes,
-            'event_types': event_types,
-            'event_summoner': event_players,
-            'event_opponents': event_opponents,
-            'event_assistings': event_assistings
+            'datetime': datetimes[rows],
+            'event_types': pd.Categorical.from_codes(type_codes[rows], categories=type_categories),
+            'event_summoner': pd.Categorical.from_codes(player_ids, categories=participant_categories),
+            'event_opponents': pd.Categorical.from_codes(events_df['opponentId'].to_numpy()[rows], categories=participant_categories),
+            'event_idx': rows
         })
         match_timeline_df = match_timeline_df.set_index('datetime')
         match_timeline_df['rounded'] = match_timeline_df.index.ceil('S')
         match_timeline_df.sort_index(inplace=True)
+
+        assist_ids, assist_offsets, has_assists = TimelineTransformerUtil.create_assist_arrays(events_df['assistingParticipantIds'])
+        match_timeline_df.attrs.update(assist_ids=assist_ids, assist_offsets=assist_offsets, has_assists=has_assists)
         return match_timeline_df
 
+    @staticmethod
+    def get_event_assistings(timeline_df):
+        # summoner names of the assists per row, like the former event_assistings column of lists
+        attrs = timeline_df.attrs
+        names = timeline_df['event_summoner'].cat.categories.to_numpy()
+        offsets = attrs['assist_offsets']
+        assistings = np.empty(len(timeline_df), dtype=object)
+        assistings[:] = [list(names[attrs['assist_ids'][offsets[idx]:offsets[idx + 1]]]) if attrs['has_assists'][idx] else None
+                         for idx in timeline_df['event_idx'].to_numpy()]
+        return assistings
+
+    @staticmethod
+    def to_object_timeline_df(timeline_df):
+        # plain object columns like before the compact representation, for display and comparisons
+        object_df = timeline_df[['event_types', 'event_summoner', 'event_opponents']].astype(object)
+        object_df = object_df.where(object_df.notna(), None)
+        object_df['event_assistings'] = TimelineTransformerUtil.get_event_assistings(timeline_df)
+        object_df['rounded'] = timeline_df['rounded']
+        return object_df
+
+    @staticmethod
+    def get_memory_usage(timeline_df):
+        return int(timeline_df.memory_usage(deep=True).sum()) + sum(value.nbytes for value in timeline_df.attrs.values())
+
     @staticmethod
     def get_event_types_of_timeline(timeline_df, add_whitelist=True):
         blacklisted_types = ['PAUSE_END', 'GAME_END']
@@ -146,13 +213,31 @@ class TimelineTransformerUtil:
         return TimelineTransformerUtil.get_event_types_of_timeline(filtered_df, False)
 
     @staticmethod
+    @Telemetry.timed()
+    def get_summoner_events_df(df_timeline, summoner_name):
+        # events the summoner did actively and events that happened to the summoner (suffixed with _PASSIVE)
+        active_summoner = df_timeline.loc[df_timeline['event_summoner'] == summoner_name][['event_types', 'rounded']]
+        active_summoner['event_types'] = active_summoner['event_types'].astype(object)
+        passive_filter = df_timeline['event_opponents'] == summoner_name
+        passive_summoner = df_timeline.loc[passive_filter][['rounded']]
+        passive_summoner['event_types'] = df_timeline.loc[passive_filter]['event_types'].astype(object) + '_PASSIVE'
+
+        timeline_summoner = pd.concat([active_summoner, passive_summoner])
+        timeline_summoner.set_index('rounded', inplace=True)
+        return timeline_summoner.sort_values('rounded')
+
+    @staticmethod
+    @Telemetry.timed()
     def get_events_by_player_desc_df(df_timeline, summary_array, event_type=None):
         filtered_df = df_timeline
         if event_type is not None:
             filtered_df = df_timeline[df_timeline['event_types'] == event_type]
-        events_by_player_desc = filtered_df.groupby(['event_summoner']) \
+        # grouped by the category codes, then ordered by name like a group by on strings
+        events_by_player_desc = filtered_df.groupby(['event_summoner'], observed=True) \
             .size() \
-            .reset_index(name='count') \
+            .reset_index(name='count')
+        events_by_player_desc['event_summoner'] = events_by_player_desc['event_summoner'].astype(object)
+        events_by_player_desc = events_by_player_desc.sort_values('event_summoner').reset_index(drop=True) \
             .sort_values('count', ascending=True)
 
         summary_df = pd.DataFrame(summary_array)
@@ -0,0 +1,26 @@
+import pytest
+
+from benchmark.synthetic_data import write_streamer
+from service.DataCatalog import DataCatalog
+from service.DataService import DataService
+
+PLAYER_NAME = 'synthetic_streamer'
+
+
+@pytest.fixture
+def data_service(tmp_path, monkeypatch):
+    # a small generated dsc_data in a temporary working directory, the shared caches start empty
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PICKLE_PW', 'synthetic')
+    DataService.data_cache.clear()
+    DataCatalog._states.clear()
+    data_service = DataService()
+    write_streamer(data_service, PLAYER_NAME, matches=3, frames=8, events_per_frame=20, messages_per_sec=0.5)
+    yield data_service
+    DataService.data_cache.clear()
+    DataCatalog._states.clear()
+
+
+@pytest.fixture
+def match_ids(data_service):
+    return list(data_service.get_df_match_history_of_streamer(PLAYER_NAME)['matchId'])
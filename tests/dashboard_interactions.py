@@ -0,0 +1,83 @@
+# simulated reruns of the match dashboard, shared by the stage tests and benchmark.bench_dashboard_stages
+import time
+
+import pandas as pd
+
+# the stages one rerun of the match dashboard reads, in drawing order
+RERUN_STAGES = ['history', 'streamer_figures', 'match', 'match_event_figures', 'summoner_events', 'summoner_view', 'chat',
+                'chat_resample', 'event_graph', 'gold_lead_figure', 'chat_window']
+
+
+def rerun(dashboard, interact):
+    # what refresh() asks of the stages, without drawing the widgets. The interaction already reads some stages,
+    # like the dashboard that reads the events of the summoner before it draws the chat slider
+    before = dashboard.stages.get_executions()
+    start = time.perf_counter()
+    interact()
+    for name in RERUN_STAGES:
+        dashboard.get_stage(name)
+    elapsed = time.perf_counter() - start
+    after = dashboard.stages.get_executions()
+    return {name: after[name] - before.get(name, 0) for name in after if after[name] != before.get(name, 0)}, elapsed
+
+
+def select_match(dashboard, data_service, match_id):
+    context = data_service.get_match_context(dashboard.selections['streamer'], match_id)
+    summoner = context.summoner_names[0]
+    dashboard.selections.update(match_id=match_id, match_event_type=None)
+    select_summoner(dashboard, data_service, summoner)
+
+
+def select_summoner(dashboard, data_service, summoner, event_types=None):
+    if event_types is None:
+        event_cube = data_service.get_match_event_cube(dashboard.selections['streamer'], dashboard.selections['match_id'])
+        event_types = [evt for evt in event_cube.get_event_types_for_summoner(summoner) if 'KILL' in evt and 'WARD' not in evt]
+    dashboard.selections.update(summoner=summoner, summoner_event_types=tuple(event_types))
+    select_first_event(dashboard)
+
+
+def select_first_event(dashboard, seconds=15):
+    # the chat slider starts at the first event of the summoner, like the dashboard does
+    evt_df = dashboard.get_stage('summoner_view')['event_select_df']
+    chat_start = evt_df.index[0]
+    dashboard.selections.update(chat_start=chat_start, chat_end=chat_start + pd.to_timedelta(seconds, unit='S'))
+
+
+def get_interactions(dashboard, data_service, player_name, match_ids):
+    # interaction -> the stages that have to run again, everything else is read from the memo
+    context = data_service.get_match_context(player_name, match_ids[0])
+
+    def open_dashboard():
+        dashboard.selections.update(streamer=player_name, data_version=data_service.catalog.get_version(player_name))
+        select_match(dashboard, data_service, match_ids[0])
+
+    def change_chat_window():
+        select_first_event(dashboard, seconds=60)
+
+    def change_summoner_event_types():
+        dashboard.selections.update(summoner_event_types=())
+        select_first_event(dashboard)
+
+    def change_match_event_type():
+        dashboard.selections.update(match_event_type=data_service.get_match_event_cube(player_name, match_ids[0]).get_event_types()[1])
+
+    def change_summoner():
+        select_summoner(dashboard, data_service, context.summoner_names[1])
+
+    def change_match():
+        select_match(dashboard, data_service, match_ids[1])
+
+    def rewrite_streamer_files():
+        data_service.write_prepared_file(data_service.read_prepared_file(player_name, 'match_summaries'), player_name, 'match_summaries')
+        dashboard.selections.update(data_version=data_service.catalog.get_version(player_name))
+
+    return [
+        ('initial', open_dashboard, set(RERUN_STAGES)),
+        ('nothing changed', lambda: None, set()),
+        ('chat window', change_chat_window, {'chat_window'}),
+        ('summoner event types', change_summoner_event_types, {'summoner_view', 'event_graph', 'chat_window'}),
+        ('match event type', change_match_event_type, {'match_event_figures'}),
+        ('summoner', change_summoner, {'summoner_events', 'summoner_view', 'chat_resample', 'event_graph', 'gold_lead_figure', 'chat_window'}),
+        ('match', change_match, set(RERUN_STAGES) - {'history', 'streamer_figures'}),
+        ('rewritten files', rewrite_streamer_files, set(RERUN_STAGES))
+    ]
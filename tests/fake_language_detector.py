@@ -0,0 +1,47 @@
+# a simulated language model and a server in a thread, for the client tests and benchmark.bench_inference_server
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from ml.InferenceServer import InferenceServer
+
+
+class SimulatedLanguageDetector:
+    # without a downloaded model the forward pass is simulated: a fixed cost per batch plus a cost per text,
+    # sleeping releases the GIL like torch does
+    labels = ['English', 'German', 'French', 'Spanish']
+    model_revision = 'simulated'
+    mode = 'simulated'
+    max_length = 128
+    model_max_length = 512
+    prediction_cache = None
+
+    def __init__(self, batch_ms=4.0, text_ms=0.25):
+        self.batch_ms = batch_ms
+        self.text_ms = text_ms
+
+    def predict_probabilities(self, texts, batch_size=None, max_length=None):
+        time.sleep((self.batch_ms + self.text_ms * len(texts)) / 1000)
+        probabilities = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        probabilities[:, 0] = 1
+        return probabilities
+
+
+def start_server(language_detector, address, max_batch_size, max_wait_ms):
+    # the server runs in its own thread and event loop, like the separate process it is in production
+    inference_server = InferenceServer(language_detector, max_batch_size, max_wait_ms)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def run():
+        server, batches = await inference_server.start(address)
+        started.set()
+        async with server:
+            await asyncio.Event().wait()
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True)
+    thread.start()
+    started.wait()
+    return inference_server
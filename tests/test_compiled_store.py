@@ -0,0 +1,36 @@
+from service.CompiledStore import CompiledStore
+from tests.conftest import PLAYER_NAME
+
+
+def rewrite_kills(data_service, match_id, kills):
+    file = f"match_participant_summaries_{match_id}"
+    summary_array = data_service.read_prepared_file(PLAYER_NAME, file)
+    summary_array[0] = {**summary_array[0], 'kills': kills}
+    data_service.write_prepared_file(summary_array, PLAYER_NAME, file)
+
+
+def test_build_matches_raw_files(data_service, match_ids):
+    compiled_store = CompiledStore(data_service)
+    compiled_store.build(PLAYER_NAME, workers=1)
+
+    assert compiled_store.verify(PLAYER_NAME) == []
+    for match_id in match_ids:
+        assert data_service.get_match_summary_array(PLAYER_NAME, match_id) == data_service.get_raw_match_summary_array(PLAYER_NAME, match_id)
+
+
+def test_verify_flags_changed_raw_summary(data_service, match_ids):
+    compiled_store = CompiledStore(data_service)
+    compiled_store.build(PLAYER_NAME, workers=1)
+    rewrite_kills(data_service, match_ids[1], 999)
+
+    assert compiled_store.verify(PLAYER_NAME) == [match_ids[1]]
+
+
+def test_rebuild_reads_raw_summaries(data_service, match_ids):
+    compiled_store = CompiledStore(data_service)
+    compiled_store.build(PLAYER_NAME, workers=1)
+    rewrite_kills(data_service, match_ids[1], 999)
+    compiled_store.build(PLAYER_NAME, workers=1)
+
+    assert data_service.get_match_summary_array(PLAYER_NAME, match_ids[1])[0]['kills'] == 999
+    assert compiled_store.verify(PLAYER_NAME) == []
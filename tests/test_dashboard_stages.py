@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from DashboardMatch import DashboardMatch
+from service.DataCatalog import DataCatalog
+from service.LruCache import LruCache
+from tests.conftest import PLAYER_NAME
+from tests.dashboard_interactions import RERUN_STAGES, get_interactions, rerun
+
+
+def test_interactions_recompute_only_downstream_stages(data_service, match_ids):
+    dashboard = DashboardMatch(data_service, stage_state={})
+    for label, interact, expected in get_interactions(dashboard, data_service, PLAYER_NAME, match_ids):
+        executions, _ = rerun(dashboard, interact)
+        assert set(executions) == expected, label
+        assert all(count == 1 for count in executions.values()), label
+
+
+def test_sessions_keep_their_own_results(data_service, match_ids):
+    first = DashboardMatch(data_service, stage_state={})
+    second = DashboardMatch(data_service, stage_state={})
+    first_interactions = {label: interact for label, interact, _ in get_interactions(first, data_service, PLAYER_NAME, match_ids)}
+    second_interactions = {label: interact for label, interact, _ in get_interactions(second, data_service, PLAYER_NAME, match_ids)}
+    rerun(first, first_interactions['initial'])
+    rerun(second, second_interactions['initial'])
+    rerun(second, second_interactions['match'])
+
+    # the selections of the second session do not touch the results of the first
+    executions, _ = rerun(first, lambda: None)
+    assert executions == {}
+
+
+@pytest.mark.parametrize('max_bytes', [0, 512 * 1024])
+def test_evicted_results_are_computed_again(data_service, match_ids, max_bytes):
+    # the stage results count against the budget of the shared cache
+    data_service.data_cache = LruCache(max_bytes)
+    dashboard = DashboardMatch(data_service, stage_state={})
+    initial = get_interactions(dashboard, data_service, PLAYER_NAME, match_ids)[0][1]
+    rerun(dashboard, initial)
+    executions, _ = rerun(dashboard, lambda: None)
+
+    assert data_service.data_cache.current_bytes <= max_bytes
+    assert set(executions) <= set(RERUN_STAGES)
+    if max_bytes == 0:
+        assert set(executions) == set(RERUN_STAGES)
+
+
+def test_event_graph_is_rendered_again_for_rewritten_files(data_service, match_ids):
+    DashboardMatch.event_graph_cache.clear()
+    dashboard = DashboardMatch(data_service, stage_state={})
+    rerun(dashboard, get_interactions(dashboard, data_service, PLAYER_NAME, match_ids)[0][1])
+    match_id = match_ids[0]
+    assert DashboardMatch.event_graph_cache.get_stats()['entries'] == 1
+
+    # a re-export of the match writes its timeline again, the cached figure of the old file is not used
+    timeline_file = f"match_timeline_{match_id}"
+    data_service.write_prepared_file(data_service.read_prepared_file(PLAYER_NAME, timeline_file), PLAYER_NAME, timeline_file)
+    executions, _ = rerun(dashboard, lambda: dashboard.selections.update(data_version=data_service.catalog.get_version(PLAYER_NAME)))
+
+    assert 'event_graph' in executions
+    assert DashboardMatch.event_graph_cache.get_stats()['entries'] == 2
+
+
+def test_streamer_without_chat_gets_an_empty_chat(data_service, match_ids):
+    os.remove(data_service.get_player_file_path(PLAYER_NAME).joinpath('chat_df.pkl.aes'))
+    DataCatalog.mark_changed(PLAYER_NAME)
+    dashboard = DashboardMatch(data_service, stage_state={})
+    get_interactions(dashboard, data_service, PLAYER_NAME, match_ids)[0][1]()
+
+    # the stages the dashboard draws without chat
+    for name in ['history', 'streamer_figures', 'match', 'match_event_figures', 'summoner_events', 'summoner_view']:
+        dashboard.get_stage(name)
+    assert data_service.get_chat_data_version(PLAYER_NAME, match_ids[0]) is None
+    assert len(dashboard.get_stage('chat')['chat_of_match']) == 0
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+from service.DataCatalog import DataCatalog
+from tests.conftest import PLAYER_NAME
+
+
+def list_data_files(data_service):
+    return sorted(os.path.relpath(os.path.join(root, file), data_service.get_dsc_data_file_path())
+                  for root, _, files in os.walk(data_service.get_dsc_data_file_path()) for file in files)
+
+
+def test_manifests_are_not_written_into_dsc_data(data_service, match_ids):
+    data_files = list_data_files(data_service)
+    assert data_service.catalog.get_streamers() == [PLAYER_NAME]
+    assert [match['matchId'] for match in data_service.catalog.get_matches(PLAYER_NAME)] == match_ids
+
+    assert list_data_files(data_service) == data_files
+    assert DataCatalog.get_manifest_path(PLAYER_NAME).exists()
+    assert DataCatalog.get_manifest_path('').exists()
+
+
+def test_stored_manifest_is_read_on_restart(data_service, match_ids):
+    version = data_service.catalog.get_version(PLAYER_NAME)
+    DataCatalog._states.clear()
+
+    assert data_service.catalog.read_stored_manifest(PLAYER_NAME)['version'] == version
+    assert data_service.catalog.get_version(PLAYER_NAME) == version
+
+
+def test_failing_manifest_write_keeps_catalog_in_memory(data_service, match_ids, monkeypatch):
+    def fail(obj, aes_file):
+        raise ValueError('not picklable')
+
+    # a first start without stored manifests
+    shutil.rmtree(DataCatalog.get_manifest_path(PLAYER_NAME).parent)
+    DataCatalog._states.clear()
+    monkeypatch.setattr(data_service, 'write_encrypted_path', fail)
+
+    assert [match['matchId'] for match in data_service.catalog.get_matches(PLAYER_NAME)] == match_ids
+    assert not DataCatalog.get_manifest_path(PLAYER_NAME).exists()
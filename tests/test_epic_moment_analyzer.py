@@ -0,0 +1,19 @@
+import os
+
+from service.EpicMomentAnalyzer import EpicMomentAnalyzer
+from tests.conftest import PLAYER_NAME
+
+
+def test_failed_matches_are_reported_in_the_stats(data_service, match_ids):
+    os.remove(data_service.get_player_file_path(PLAYER_NAME).joinpath(f"match_timeline_{match_ids[0]}.pkl.aes"))
+    analyzer = EpicMomentAnalyzer(data_service, workers=2)
+
+    stats = list(analyzer.iter_stats(PLAYER_NAME))[-1]
+
+    assert stats.is_complete()
+    assert list(stats.failed_matches) == [match_ids[0]]
+    assert stats.analyzed_matches == len(match_ids) - 1
+    # results with failed matches are not cached, the next run analyzes them again in the same pool
+    pool = analyzer.get_pool()
+    assert list(analyzer.iter_stats(PLAYER_NAME))[-1] is not stats
+    assert analyzer.get_pool() is pool
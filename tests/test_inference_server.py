@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ml.LanguageDetectorClient import LanguageDetectorClient
+from tests.fake_language_detector import SimulatedLanguageDetector, start_server
+
+MAX_WAIT_MS = 200
+
+
+def test_idle_connections_are_not_waited_for(tmp_path):
+    address = f"unix:{tmp_path.joinpath('server.sock')}"
+    start_server(SimulatedLanguageDetector(batch_ms=0, text_ms=0), address, 32, MAX_WAIT_MS)
+    client = LanguageDetectorClient(address)
+    # idle connections, like the pooled connections of other dashboard processes
+    idle_connections = [client.connect() for _ in range(3)]
+
+    start = time.perf_counter()
+    for idx in range(5):
+        client.predict_probabilities([f'text {idx}'])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert elapsed_ms < MAX_WAIT_MS
+    for connection in idle_connections:
+        connection.close()
+    client.close()
+
+
+def test_concurrent_requests_are_batched(tmp_path):
+    address = f"unix:{tmp_path.joinpath('server.sock')}"
+    inference_server = start_server(SimulatedLanguageDetector(batch_ms=2, text_ms=0), address, 32, 20)
+    client = LanguageDetectorClient(address)
+    ready = threading.Barrier(8)
+
+    def run_client(client_idx):
+        ready.wait()
+        for idx in range(10):
+            client.predict_probabilities([f'text {client_idx} {idx}'])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(run_client, range(8)))
+
+    assert inference_server.requests == 80
+    assert inference_server.batches < 40
+    client.close()
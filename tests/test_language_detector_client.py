@@ -0,0 +1,43 @@
+import threading
+import time
+
+import pytest
+
+from ml.LanguageDetectorBase import LanguageDetectorBase
+from ml.LanguageDetectorClient import LanguageDetectorClient
+from tests.fake_language_detector import SimulatedLanguageDetector, start_server
+
+
+def wait_for_connections(inference_server, connections, timeout=5):
+    deadline = time.monotonic() + timeout
+    while inference_server.connections != connections and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return inference_server.connections
+
+
+def test_connections_are_reused_by_new_threads(tmp_path):
+    inference_server = start_server(SimulatedLanguageDetector(batch_ms=0, text_ms=0), f"unix:{tmp_path.joinpath('server.sock')}", 32, 1)
+    client = LanguageDetectorClient(f"unix:{tmp_path.joinpath('server.sock')}", max_idle_connections=2)
+    assert wait_for_connections(inference_server, 0) == 0
+
+    # every streamlit rerun runs in a new thread, the threads end but their connections are not leaked
+    for rerun in range(20):
+        threads = [threading.Thread(target=client.predict_probabilities, args=([f'text {rerun} {idx}'],)) for idx in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert client.get_idle_connections() <= 2
+    assert wait_for_connections(inference_server, client.get_idle_connections()) <= 2
+
+    client.close()
+    assert client.get_idle_connections() == 0
+    assert wait_for_connections(inference_server, 0) == 0
+
+
+def test_language_detectors_implement_predict_probabilities():
+    class IncompleteDetector(LanguageDetectorBase):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteDetector()
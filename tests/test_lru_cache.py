@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from service.LruCache import LruCache
+
+
+def test_failing_size_of_does_not_block_the_key():
+    cache = LruCache(1024)
+
+    def failing_size_of(value):
+        raise ValueError('size unknown')
+
+    with pytest.raises(ValueError):
+        cache.get_or_load('key', lambda: 'value', failing_size_of)
+
+    # the key is not left loading, the next call loads it again instead of waiting forever
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(cache.get_or_load, 'key', lambda: 'value', len).result(timeout=5) == 'value'
+    assert cache.get('key') == 'value'
+
+
+def test_waiting_callers_get_the_error_of_the_loader():
+    cache = LruCache(1024)
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return 'value'
+
+    def failing_size_of(value):
+        raise ValueError('size unknown')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        loader = pool.submit(cache.get_or_load, 'key', slow_load, failing_size_of)
+        loading.wait(5)
+        waiter = pool.submit(cache.get_or_load, 'key', slow_load, len)
+        release.set()
+        with pytest.raises(ValueError):
+            loader.result(timeout=5)
+        with pytest.raises(ValueError):
+            waiter.result(timeout=5)
@@ -0,0 +1,42 @@
+import os
+import threading
+
+from service.CompiledStore import CompiledStore
+from service.MatchPrefetcher import MatchPrefetcher
+from tests.conftest import PLAYER_NAME
+
+
+def test_selection_cancels_only_own_session(data_service, match_ids):
+    prefetcher = MatchPrefetcher(data_service, max_matches=2, workers=1)
+    release = threading.Event()
+    # keeps the only worker busy, all prefetches stay queued
+    blocker = prefetcher.pool.submit(release.wait)
+    try:
+        prefetcher.prefetch(PLAYER_NAME, match_ids, 0, session_id='a')
+        futures_a = prefetcher.sessions['a']['futures']
+        prefetcher.prefetch(PLAYER_NAME, match_ids, 1, session_id='b')
+        assert len(futures_a) > 0 and not any(future.cancelled() for future in futures_a)
+
+        prefetcher.prefetch(PLAYER_NAME, match_ids, 2, session_id='a')
+        assert all(future.cancelled() for future in futures_a)
+        assert not any(future.cancelled() for future in prefetcher.sessions['b']['futures'])
+        assert prefetcher.get_stats()['sessions'] == 2
+    finally:
+        release.set()
+        blocker.result()
+        prefetcher.pool.shutdown(wait=True)
+
+
+def test_match_size_of_compiled_only_store(data_service, match_ids):
+    CompiledStore(data_service).build(PLAYER_NAME, workers=1)
+    for match_id in match_ids:
+        for file in [f"match_participant_summaries_{match_id}", f"match_timeline_{match_id}"]:
+            os.remove(data_service.get_file_path(PLAYER_NAME, file)[1])
+
+    prefetcher = MatchPrefetcher(data_service)
+    assert prefetcher.get_match_size(PLAYER_NAME, match_ids[0]) > 0
+    # all matches are in one group, it is counted once
+    counted_files = set()
+    assert prefetcher.get_match_size(PLAYER_NAME, match_ids[0], counted_files) > 0
+    assert prefetcher.get_match_size(PLAYER_NAME, match_ids[1], counted_files) == 0
+    prefetcher.pool.shutdown()
@@ -0,0 +1,41 @@
+from PagedSelectbox import PagedSelectbox
+
+
+class FakeContainer:
+    # answers the widgets like streamlit, the inputs are given as widget values
+    def __init__(self, query='', page=1):
+        self.query = query
+        self.page = page
+        self.number_input_keys = []
+
+    def text_input(self, label, key):
+        return self.query
+
+    def number_input(self, label, min_value, max_value, value, key):
+        self.number_input_keys.append(key)
+        return min(self.page, max_value)
+
+    def selectbox(self, label, options):
+        return options[0] if len(options) > 0 else None
+
+
+OPTIONS = [f'match {idx}' for idx in range(250)]
+
+
+def test_nothing_to_select_returns_none():
+    assert PagedSelectbox().select(FakeContainer(), 'Select', options=[]) is None
+    assert PagedSelectbox().select(FakeContainer(query='no such match'), 'Select', options=OPTIONS) is None
+
+
+def test_pages_of_a_search():
+    assert PagedSelectbox().select(FakeContainer(page=3), 'Select', options=OPTIONS) == 'match 200'
+    assert PagedSelectbox().select(FakeContainer(query='match 1'), 'Select', options=OPTIONS) == 'match 1'
+
+
+def test_every_query_has_its_own_page_input():
+    # the page of a previous query could be beyond the last page of a narrower one
+    container = FakeContainer(query='')
+    PagedSelectbox().select(container, 'Select', options=OPTIONS)
+    container.query = 'match 1'
+    PagedSelectbox().select(container, 'Select', options=OPTIONS)
+    assert container.number_input_keys == ['Select_page_', 'Select_page_match 1']
@@ -0,0 +1,27 @@
+import numpy as np
+
+from ml.PredictionCache import PredictionCache
+
+
+def test_keys_put_twice_are_counted_once(tmp_path):
+    cache = PredictionCache(tmp_path.joinpath('predictions.sqlite'), max_entries=100)
+    predictions = {PredictionCache.create_key(f'text {idx}', 'rev'): np.full(4, idx, dtype=np.float32) for idx in range(10)}
+
+    # two threads that missed the same texts both put them
+    cache.put_many(predictions)
+    cache.put_many(predictions)
+
+    assert cache.get_stats()['entries'] == 10
+    assert PredictionCache(tmp_path.joinpath('predictions.sqlite')).get_stats()['entries'] == 10
+    assert list(cache.get_many(list(predictions))[PredictionCache.create_key('text 3', 'rev')]) == [3, 3, 3, 3]
+
+
+def test_eviction_keeps_the_recently_used_entries(tmp_path):
+    cache = PredictionCache(tmp_path.joinpath('predictions.sqlite'), max_entries=10)
+    keys = [PredictionCache.create_key(f'text {idx}', 'rev') for idx in range(11)]
+    cache.put_many({key: np.zeros(4) for key in keys[:10]})
+    cache.get_many(keys[:1])
+    cache.put_many({keys[10]: np.zeros(4)})
+
+    assert cache.get_stats()['entries'] == 9
+    assert set(cache.get_many(keys[:1] + keys[10:])) == {keys[0], keys[10]}
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from benchmark.synthetic_data import create_synthetic_match
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+from tests.timeline_reference import (assert_context_equivalent, assert_cube_equivalent, assert_equivalent, assert_frames_equivalent,
+                                      legacy_create_match_timeline_df)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_timeline_df_equals_row_by_row_implementation(seed):
+    _, timeline_dict, summary_array = create_synthetic_match(seed, frames=10, events_per_frame=40)
+    expected = legacy_create_match_timeline_df(timeline_dict, summary_array)
+    actual = TimelineTransformerUtil.create_match_timeline_df(timeline_dict, summary_array)
+
+    pd.testing.assert_frame_equal(TimelineTransformerUtil.to_object_timeline_df(actual), expected, check_index_type=False)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_consumers_of_compact_timeline_df(seed):
+    _, timeline_dict, summary_array = create_synthetic_match(seed, frames=10, events_per_frame=40)
+    _, actual = assert_equivalent(timeline_dict, summary_array)
+    assert_cube_equivalent(actual, summary_array)
+    assert_context_equivalent(timeline_dict, summary_array)
+    assert_frames_equivalent(timeline_dict)
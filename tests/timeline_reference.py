@@ -0,0 +1,171 @@
+# the row-by-row implementations the transformations replaced, the tests and benchmark.bench_timeline compare with them
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from service.MakeNice4UIMapper import MakeNice4UIMapper
+from service.MatchContext import MatchContext, SUMMARY_METRICS
+from service.MatchEventCube import MatchEventCube
+from service.ParticipantFrames import ParticipantFrames
+from service.TimelineTransformerUtil import TimelineTransformerUtil
+
+
+def legacy_create_participant_map(participants, match_summary_array):
+    # list scan per participant before the lookups were indexed by MatchContext, kept as reference
+    participant_map = {'0': {'puuid': '-', 'name': 'Minions'}}
+    for p in participants:
+        participant_map[str(p['participantId'])] = {
+            'puuid': p['puuid'],
+            'name': [summ['summonerName'] for summ in match_summary_array if summ['puuid'] == p['puuid']][0]
+        }
+    return participant_map
+
+
+def legacy_create_match_timeline_df(timeline_dict, match_summary_array):
+    # row-by-row implementation of create_match_timeline_df before it was vectorized, kept as reference
+    datetimes = []
+    event_types = []
+    event_players = []
+    event_opponents = []
+    event_assistings = []
+
+    participant_summary = legacy_create_participant_map(timeline_dict['info']['participants'], match_summary_array)
+
+    match_timeline_start = None
+    for frame in timeline_dict['info']['frames']:
+        for event in frame['events']:
+            event_type = event['type']
+            event_assisting = None
+            event_player = None
+            player_key = TimelineTransformerUtil.get_key_event_player(event_type)
+            if player_key is not None:
+                event_player = TimelineTransformerUtil.get_player_name(participant_summary, event[player_key])
+
+            event_opponent = None
+            opponent_key = TimelineTransformerUtil.get_key_event_opponent(event_type)
+            if opponent_key is not None:
+                event_opponent = TimelineTransformerUtil.get_player_name(participant_summary, event[opponent_key])
+
+            if 'realTimestamp' in event:
+                dt = datetime.utcfromtimestamp(event['realTimestamp'] / 1000)
+                if match_timeline_start is None:
+                    match_timeline_start = dt
+            else:
+                dt = match_timeline_start + timedelta(milliseconds=event['timestamp'])
+
+            if 'assistingParticipantIds' in event:
+                event_assisting = [TimelineTransformerUtil.get_player_name(participant_summary, id) for id in event['assistingParticipantIds']]
+
+            if TimelineTransformerUtil.is_event_for_every_player(event_type):
+                for i in range(1, 11):
+                    datetimes.append(dt)
+                    event_types.append(event_type)
+                    event_players.append(TimelineTransformerUtil.get_player_name(participant_summary, i))
+                    event_opponents.append(event_opponent)
+                    event_assistings.append(event_assisting)
+            else:
+                datetimes.append(dt)
+                event_types.append(event_type)
+                event_players.append(event_player)
+                event_opponents.append(event_opponent)
+                event_assistings.append(event_assisting)
+
+    match_timeline_df = pd.DataFrame({
+        'datetime': datetimes,
+        'event_types': event_types,
+        'event_summoner': event_players,
+        'event_opponents': event_opponents,
+        'event_assistings': event_assistings
+    })
+    match_timeline_df = match_timeline_df.set_index('datetime')
+    match_timeline_df['rounded'] = match_timeline_df.index.ceil('S')
+    match_timeline_df.sort_index(inplace=True)
+    return match_timeline_df
+
+
+def legacy_get_events_by_player_desc_df(df_timeline, summary_array, event_type=None):
+    # get_events_by_player_desc_df on object columns, kept as reference
+    filtered_df = df_timeline
+    if event_type is not None:
+        filtered_df = df_timeline[df_timeline['event_types'] == event_type]
+    events_by_player_desc = filtered_df.groupby(['event_summoner']).size().reset_index(name='count').sort_values('count', ascending=True)
+
+    summary_df = pd.DataFrame(summary_array)
+    events_by_player_desc = events_by_player_desc.merge(summary_df[['summonerName', 'win']], how='inner', left_on='event_summoner', right_on='summonerName')
+    events_by_player_desc.drop(columns=['summonerName'], inplace=True)
+    events_by_player_desc.sort_values(['win', 'count'], inplace=True, ascending=[True, False])
+    return events_by_player_desc
+
+
+def legacy_get_summoner_events_df(df_timeline, summoner_name):
+    active_summoner = df_timeline.loc[df_timeline['event_summoner'] == summoner_name][['event_types', 'rounded']]
+    passive_summoner = df_timeline.loc[df_timeline['event_opponents'] == summoner_name][['rounded']]
+    passive_summoner['event_types'] = df_timeline.loc[df_timeline['event_opponents'] == summoner_name]['event_types'] + '_PASSIVE'
+
+    timeline_summoner = pd.concat([active_summoner, passive_summoner])
+    timeline_summoner.set_index('rounded', inplace=True)
+    return timeline_summoner.sort_values('rounded')
+
+
+def assert_equivalent(timeline_dict, match_summary_array):
+    expected = legacy_create_match_timeline_df(timeline_dict, match_summary_array)
+    actual = TimelineTransformerUtil.create_match_timeline_df(timeline_dict, match_summary_array)
+    pd.testing.assert_frame_equal(TimelineTransformerUtil.to_object_timeline_df(actual), expected, check_index_type=False)
+
+    # consumers of the compact frame have to produce the same results as before
+    for event_type in [None, 'CHAMPION_KILL']:
+        pd.testing.assert_frame_equal(TimelineTransformerUtil.get_events_by_player_desc_df(actual, match_summary_array, event_type),
+                                      legacy_get_events_by_player_desc_df(expected, match_summary_array, event_type))
+    for summoner in [summary['summonerName'] for summary in match_summary_array]:
+        assert TimelineTransformerUtil.get_event_types_of_timeline_for_summoner(actual, summoner) == \
+               TimelineTransformerUtil.get_event_types_of_timeline_for_summoner(expected, summoner)
+        pd.testing.assert_frame_equal(TimelineTransformerUtil.get_summoner_events_df(actual, summoner),
+                                      legacy_get_summoner_events_df(expected, summoner))
+    return expected, actual
+
+
+def assert_context_equivalent(timeline_dict, match_summary_array):
+    participants = timeline_dict['info']['participants']
+    match_context = MatchContext(match_summary_array, participants)
+    assert match_context.participant_map == legacy_create_participant_map(participants, match_summary_array)
+    for summary in match_summary_array:
+        assert match_context.get_summary(summary['summonerName']) is summary
+        for metric in SUMMARY_METRICS:
+            assert match_context.get_metric_value_pct(summary['summonerName'], metric) == \
+                   MakeNice4UIMapper.calc_metric_value_pct(summary, match_summary_array, metric)
+
+
+def legacy_get_gold_diff(timeline_dict, team_participant_ids):
+    # per frame dict walk the participant frames would otherwise need on every rerun, kept as reference
+    gold_diff = []
+    for frame in timeline_dict['info']['frames']:
+        diff = 0
+        for participant_id, participant_frame in frame['participantFrames'].items():
+            diff += participant_frame['totalGold'] if int(participant_id) in team_participant_ids else -participant_frame['totalGold']
+        gold_diff.append(diff)
+    return gold_diff
+
+
+def assert_frames_equivalent(timeline_dict):
+    participant_frames = ParticipantFrames.from_timeline(timeline_dict)
+    team_mask = participant_frames.participant_ids <= 5
+    assert list(participant_frames.get_team_diff('totalGold', team_mask)) == legacy_get_gold_diff(timeline_dict, set(range(1, 6)))
+    for frame_idx, frame in enumerate(timeline_dict['info']['frames']):
+        for participant_idx, participant_id in enumerate(participant_frames.participant_ids):
+            participant_frame = frame['participantFrames'][str(participant_id)]
+            assert participant_frames.get_stat('xp')[frame_idx, participant_idx] == participant_frame['xp']
+            assert participant_frames.get_stat('totalDamageDoneToChampions')[frame_idx, participant_idx] == \
+                   participant_frame['damageStats']['totalDamageDoneToChampions']
+    roundtrip = ParticipantFrames.from_df(participant_frames.to_df(), participant_frames.start_millis)
+    assert (roundtrip.values == participant_frames.values).all() and (roundtrip.timestamps == participant_frames.timestamps).all()
+
+
+def assert_cube_equivalent(timeline_df, match_summary_array):
+    event_cube = MatchEventCube.from_timeline(timeline_df, match_summary_array)
+    assert event_cube.get_event_types() == TimelineTransformerUtil.get_event_types_of_timeline(timeline_df)
+    for event_type in [None] + event_cube.get_event_types(False):
+        events_by_team = TimelineTransformerUtil.get_events_by_player_desc_df(timeline_df, match_summary_array, event_type)
+        pd.testing.assert_frame_equal(event_cube.get_events_by_player_desc_df(event_type), events_by_team)
+        pd.testing.assert_frame_equal(event_cube.get_team_counts_df(event_type), events_by_team.groupby(['win']).sum('count').reset_index())
+    for summoner in [summary['summonerName'] for summary in match_summary_array]:
+        assert event_cube.get_event_types_for_summoner(summoner) == TimelineTransformerUtil.get_event_types_of_timeline_for_summoner(timeline_df, summoner)